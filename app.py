@@ -1,13 +1,16 @@
 import streamlit as st
 import os
 import config
-import json
 from datetime import datetime, timedelta
 from ui.dashboard import render_dashboard
 from ui.task_panel import render_task_panel
 from ui.notes_panel import render_notes_panel
 from ui.calendar_view import render_calendar_view
 from backend.scheduler import TaskScheduler
+from backend.leader import LeaderElection
+from backend.shards import shards, is_known_user, normalize_user_id, user_data_dir
+from backend.write_behind import saver
+from backend.data_transfer import export_bytes, import_stream
 from utils.notifier import notifier
 import logging
 
@@ -54,47 +57,46 @@ st.markdown(
 )
 
 
-def load_data(file_path):
-    """Load data from JSON file"""
-    try:
-        with open(file_path, "r") as file:
-            return json.load(file)
-    except Exception as e:
-        logger.error(f"Error loading data: {e}")
-        return None
-
+@st.cache_resource
+def start_background_services():
+    """
+    Create this process's scheduler and start the notifier, once per process
 
-def save_data(data, file_path):
-    """Save data to JSON file"""
-    try:
-        with open(file_path, "w") as file:
-            json.dump(data, file, indent=4)
-        return True
-    except Exception as e:
-        logger.error(f"Error saving data: {e}")
-        return False
+    Every worker process keeps its stored reminders in step with the tasks
+    it changes, but only the process elected leader runs the scheduler, so
+    each reminder and summary is sent once per deployment.
+    """
+    scheduler = TaskScheduler()
+    election = LeaderElection(on_elected=scheduler.start)
+    election.start()
+    notifier.start()
+    return scheduler, election
 
 
 def init_session_state():
     """Initialize session state variables"""
-    if "tasks" not in st.session_state:
-        task_data = load_data(config.TASKS_FILE)
-        st.session_state.tasks = task_data.get("tasks", []) if task_data else []
-
-    if "notes" not in st.session_state:
-        notes_data = load_data(config.NOTES_FILE)
-        st.session_state.notes = notes_data.get("notes", []) if notes_data else []
+    # Each user's data lives in its own shard, chosen once per session
+    # (e.g. ?user=alice); without one the default user's data is used
+    if "user_id" not in st.session_state:
+        user_id = normalize_user_id(st.query_params.get("user"))
+        if not is_known_user(user_id):
+            st.error(f"Unknown user '{user_id}'")
+            st.stop()
+        st.session_state.user_id = user_id
+
+    # Shared, process-wide collections; re-fetched each run so changes made
+    # by another worker process are picked up and evicted shards reload
+    shard = shards.get(st.session_state.user_id)
+    st.session_state.tasks = shard.tasks
+    st.session_state.notes = shard.notes
 
     if "active_tab" not in st.session_state:
         st.session_state.active_tab = "Dashboard"
 
-    if "scheduler" not in st.session_state:
-        st.session_state.scheduler = TaskScheduler()
-        st.session_state.scheduler.start()
-
-    if "notifier" not in st.session_state:
-        st.session_state.notifier = notifier
-        st.session_state.notifier.start()
+    scheduler, election = start_background_services()
+    st.session_state.scheduler = scheduler
+    st.session_state.scheduler_election = election
+    st.session_state.notifier = notifier
 
 
 def render_settings_page():
@@ -210,6 +212,7 @@ def render_notification_settings():
                 "🧠 Test Notification",
                 "This is a test desktop notification from NikAssistant!",
                 desktop=True,
+                dedup=False,
             )
             st.success("Test notification sent!")
 
@@ -220,6 +223,7 @@ def render_notification_settings():
                     "📧 Test Email",
                     "This is a test email notification from NikAssistant!",
                     email=True,
+                    dedup=False,
                 )
                 st.success("Test email queued!")
             else:
@@ -283,6 +287,8 @@ def render_email_settings():
                 success = email_service.send_email(
                     subject="NikAssistant Test Email",
                     body="<h2>🧠 NikAssistant Test</h2><p>If you receive this email, your email configuration is working correctly!</p>",
+                    # Every click should send, however recent the last test was
+                    dedup=False,
                 )
                 if success:
                     st.success("Test email sent successfully!")
@@ -309,7 +315,9 @@ def render_advanced_settings():
             export_data()
 
     with col2:
-        uploaded_file = st.file_uploader("Import Data", type=["json"])
+        uploaded_file = st.file_uploader(
+            "Import Data", type=["ndjson", "jsonl", "json"]
+        )
         if uploaded_file and st.button("Import"):
             import_data(uploaded_file)
 
@@ -317,9 +325,10 @@ def render_advanced_settings():
     st.write("**System Information**")
 
     info_data = {
+        "User": st.session_state.user_id,
         "Tasks": len(st.session_state.tasks),
         "Notes": len(st.session_state.notes),
-        "Data Directory": str(config.DATA_DIR),
+        "Data Directory": str(user_data_dir(st.session_state.user_id)),
         "Logs Directory": str(config.LOGS_DIR),
         "Email Configured": "Yes" if config.EMAIL_USER else "No",
         "Calendar Configured": "Yes" if config.GOOGLE_API_KEY else "No",
@@ -352,68 +361,79 @@ def render_advanced_settings():
                     "APP_PORT": config.APP_PORT,
                     "DATA_DIR": str(config.DATA_DIR),
                 },
+                "Write-Behind Saver": saver.get_stats(),
+                "Shards": shards.get_stats(),
+                "Scheduler": {
+                    "Leader": st.session_state.scheduler_election.is_leader,
+                    "Held by": st.session_state.scheduler_election.holder(),
+                    "Reminders": st.session_state.scheduler.reminder_pump.stats,
+                    "Dispatch shards": (
+                        st.session_state.scheduler.dispatcher.get_stats()
+                        if st.session_state.scheduler.dispatcher else []
+                    ),
+                },
+                "Notifier": st.session_state.notifier.get_stats(),
             }
         )
 
 
 def export_data():
-    """Export all application data"""
-    import json
-    from datetime import datetime
-
-    export_data = {
-        "export_date": datetime.now().isoformat(),
-        "tasks": st.session_state.tasks,
-        "notes": st.session_state.notes,
-        "version": "1.0",
-    }
-
-    export_json = json.dumps(export_data, indent=2)
+    """Export all application data as NDJSON"""
     st.download_button(
         label="Download Data",
-        data=export_json,
-        file_name=f"nikassistant_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-        mime="application/json",
+        data=export_bytes(st.session_state.tasks, st.session_state.notes),
+        file_name=f"nikassistant_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson",
+        mime="application/x-ndjson",
     )
     st.success("Data export ready for download!")
 
 
 def import_data(uploaded_file):
-    """Import application data"""
-    try:
-        import json
-
-        data = json.load(uploaded_file)
+    """Import application data, upserting records by id"""
+    progress_bar = st.progress(0.0, text="Importing...")
 
-        if "tasks" in data:
-            st.session_state.tasks = data["tasks"]
-
-        if "notes" in data:
-            st.session_state.notes = data["notes"]
-
-        st.success("Data imported successfully!")
-        st.rerun()
+    def report(fraction, result):
+        imported = sum(result.imported.values())
+        progress_bar.progress(fraction, text=f"Imported {imported} records...")
 
+    try:
+        result = import_stream(
+            uploaded_file,
+            st.session_state.tasks,
+            st.session_state.notes,
+            progress=report,
+        )
     except Exception as e:
         st.error(f"Import failed: {e}")
+        return
+
+    progress_bar.progress(1.0, text="Import complete")
+    st.success(
+        f"Imported {result.imported['task']} tasks and "
+        f"{result.imported['note']} notes!"
+    )
+    if result.skipped:
+        st.warning(f"Skipped {result.skipped} invalid records")
+        for error in result.errors:
+            st.caption(error)
+    else:
+        st.rerun()
 
 
 def clear_completed_tasks():
     """Clear all completed tasks"""
-    before_count = len(st.session_state.tasks)
-    st.session_state.tasks = [
-        task for task in st.session_state.tasks if not task.get("completed", False)
-    ]
-    after_count = len(st.session_state.tasks)
+    removed = st.session_state.tasks.remove_where(
+        lambda task: task.get("completed", False)
+    )
 
-    st.success(f"Cleared {before_count - after_count} completed tasks!")
+    st.success(f"Cleared {removed} completed tasks!")
     st.rerun()
 
 
 def reset_all_data():
     """Reset all application data"""
-    st.session_state.tasks = []
-    st.session_state.notes = []
+    st.session_state.tasks.replace_all([])
+    st.session_state.notes.replace_all([])
     st.success("All data has been reset!")
     st.rerun()
 
@@ -451,10 +471,6 @@ def main():
 
         render_widgets_panel()
 
-    # Save data on app state change
-    save_data({"tasks": st.session_state.tasks}, config.TASKS_FILE)
-    save_data({"notes": st.session_state.notes}, config.NOTES_FILE)
-
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,153 @@
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from backend.recurrence import is_recurring
+from backend.task_index import is_open_task
+
+
+def _bump(counter, key, delta):
+    """Add ``delta`` to ``counter[key]``, dropping the key when it hits zero"""
+    value = counter[key] + delta
+    if value:
+        counter[key] = value
+    else:
+        del counter[key]
+
+
+def _days(start, end):
+    """ISO days from ``start`` up to but not including ``end``"""
+    day = date.fromisoformat(start)
+    stop = date.fromisoformat(end)
+    while day < stop:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+class TaskAggregates:
+    """
+    Task counts for the dashboard and daily summary, kept up to date on
+    every mutation.
+
+    Besides the totals it keeps per-day counters of tasks due (all and
+    open only) and a running count of open tasks due before ``today``.
+    When the date moves on, ``roll`` adds the open counters of the days
+    that passed to the overdue count instead of rescanning the tasks.
+    Queries roll forward lazily, so the first one after midnight pays for
+    the boundary.
+
+    Attach it to a collection with ``RecordCollection.subscribe``.
+    """
+
+    def __init__(self, today=None):
+        self.today = today or date.today().isoformat()
+        self._lock = threading.Lock()
+        self.on_reload([])
+
+    def on_reload(self, records):
+        with self._lock:
+            self.total = 0
+            self.completed = 0
+            self.overdue = 0
+            self.due_per_day = Counter()
+            self.open_per_day = Counter()
+            for task in records:
+                self._apply(task, 1)
+
+    def on_change(self, old, new):
+        with self._lock:
+            if old is not None:
+                self._apply(old, -1)
+            if new is not None:
+                self._apply(new, 1)
+
+    def _apply(self, task, sign):
+        self.total += sign
+        is_open = is_open_task(task)
+        if not is_open:
+            self.completed += sign
+        due_date = task.get("due_date")
+        # Occurrences of recurring tasks are counted per query instead
+        if not due_date or is_recurring(task):
+            return
+        day = due_date[:10]
+        _bump(self.due_per_day, day, sign)
+        if is_open:
+            _bump(self.open_per_day, day, sign)
+            if day < self.today:
+                self.overdue += sign
+
+    def roll(self, today):
+        """Move ``today`` to a new day (YYYY-MM-DD), adjusting the overdue count"""
+        with self._lock:
+            if today == self.today:
+                return
+            start, end, sign = (self.today, today, 1) if today > self.today else (today, self.today, -1)
+            if (date.fromisoformat(end) - date.fromisoformat(start)).days <= len(self.open_per_day):
+                passed = sum(self.open_per_day.get(day, 0) for day in _days(start, end))
+            else:
+                # A long gap: cheaper to walk the days that have open tasks
+                passed = sum(n for day, n in self.open_per_day.items() if start <= day < end)
+            self.overdue += sign * passed
+            self.today = today
+
+    def due_on(self, day, include_completed=False):
+        """Number of tasks due on ``day`` (YYYY-MM-DD)"""
+        counts = self.due_per_day if include_completed else self.open_per_day
+        return counts.get(day, 0)
+
+    def overdue_on(self, today):
+        """Number of open tasks due before ``today`` (YYYY-MM-DD)"""
+        self.roll(today)
+        return self.overdue
+
+    def summary(self, today=None):
+        """
+        All task counts as of ``today``
+
+        Returns:
+            dict: total, completed, open, due_today, due_tomorrow and overdue
+        """
+        today = today or date.today().isoformat()
+        tomorrow = (date.fromisoformat(today) + timedelta(days=1)).isoformat()
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "open": self.total - self.completed,
+            "due_today": self.due_on(today),
+            "due_tomorrow": self.due_on(tomorrow),
+            "overdue": self.overdue_on(today),
+        }
+
+
+class NoteAggregates:
+    """Note counts (total, private, per category) kept up to date on every mutation"""
+
+    def __init__(self):
+        self.on_reload([])
+
+    def on_reload(self, records):
+        self.total = 0
+        self.private = 0
+        self.categories = Counter()
+        for note in records:
+            self._apply(note, 1)
+
+    def on_change(self, old, new):
+        if old is not None:
+            self._apply(old, -1)
+        if new is not None:
+            self._apply(new, 1)
+
+    def _apply(self, note, sign):
+        self.total += sign
+        if note.get("is_private", False):
+            self.private += sign
+        _bump(self.categories, note.get("category", "General"), sign)
+
+    def summary(self):
+        return {
+            "total": self.total,
+            "categories": len(self.categories),
+            "private": self.private,
+            "public": self.total - self.private,
+        }
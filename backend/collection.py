@@ -0,0 +1,472 @@
+import calendar
+import logging
+import threading
+from datetime import date, timedelta
+from itertools import islice
+import config
+from backend.aggregates import NoteAggregates, TaskAggregates
+from backend.records import PackedRecords, TaskTable
+from backend.recurrence import expand, first_occurrence_from
+from backend.storage import DuplicateIdError, highest_int_id
+from backend.task_index import TaskIndex, is_open_task
+
+logger = logging.getLogger("nikassistant.collection")
+
+
+class ChangeBatch:
+    """Changes drained from a collection for one flush"""
+
+    def __init__(self, reset, keys, inserts, upserts, deletes, version, mutations):
+        self.reset = reset
+        self.keys = keys
+        self.inserts = inserts
+        self.upserts = upserts
+        self.deletes = deletes
+        self.version = version
+        self.mutations = mutations
+
+
+class IdAllocator:
+    """
+    Hands out integer ids that are never reused, across processes.
+
+    Each id is claimed from the store (``SQLiteStore.allocate_id``), so two
+    worker processes sharing the data never get the same one. Integer ids
+    this process holds but may not have flushed yet (e.g. from an import)
+    are passed along as a floor. Records created with older schemes (uuid
+    strings, ``len() + 1``) keep their ids.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._floor = 1
+
+    def reset(self, records):
+        with self._lock:
+            self._floor = highest_int_id(records) + 1
+
+    def observe(self, record_id):
+        """Move past an id that was assigned elsewhere (e.g. an import)"""
+        if isinstance(record_id, int) and not isinstance(record_id, bool):
+            with self._lock:
+                self._floor = max(self._floor, record_id + 1)
+
+    def allocate(self):
+        with self._lock:
+            floor = self._floor
+        value = self.store.allocate_id(floor)
+        self.observe(value)
+        return value
+
+
+class RecordCollection:
+    """
+    In-memory records with a versioned mutation API.
+
+    Every mutation goes through ``add``, ``update``, ``remove`` or
+    ``replace_all``. Each one bumps ``version`` and marks the record dirty,
+    so a saver can tell whether anything changed since the last flush and
+    write only the records that did. Iterating yields the records in
+    insertion order; treat them as read-only and mutate through the API.
+
+    Listeners registered with ``subscribe`` see every change as
+    ``on_change(old, new)`` (``old`` is None for inserts, ``new`` is None for
+    deletes) and ``on_reload(records)`` when the whole set is replaced.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        # Held across draining and applying a flush, so two threads flushing
+        # the same collection write their batches in order
+        self.flush_lock = threading.Lock()
+        self._records = {}
+        self._changed = {}  # ordered set of keys, so new records flush in order
+        self._new_ids = set()  # keys from next_id that were not flushed yet
+        self._reset = False
+        self.version = 0
+        self.flushed_version = 0
+        self._store_token = None
+        self._listeners = []
+        self.ids = IdAllocator(store)
+        self.reload()
+
+    @staticmethod
+    def _key(record_id):
+        return str(record_id)
+
+    def reload(self):
+        """Replace the in-memory records with the store's contents"""
+        with self._lock:
+            self._store_token = self.store.change_token()
+            self._records = self._new_records(self.store.all())
+            self.ids.reset(self._records.values())
+            self._changed.clear()
+            self._new_ids.clear()
+            self._reset = False
+            self.flushed_version = self.version
+            self._notify_reload()
+
+    def _new_records(self, records):
+        """Build the key -> record mapping the collection keeps"""
+        return {self._key(r["id"]): r for r in records}
+
+    def subscribe(self, listener):
+        """Register a listener and bring it up to date with current records"""
+        with self._lock:
+            self._listeners.append(listener)
+            listener.on_reload(list(self._records.values()))
+        return listener
+
+    def unsubscribe(self, listener):
+        """Stop sending changes to a listener"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, old, new):
+        for listener in self._listeners:
+            listener.on_change(old, new)
+
+    def _notify_reload(self):
+        records = list(self._records.values())
+        for listener in self._listeners:
+            listener.on_reload(records)
+
+    def refresh_if_stale(self):
+        """
+        Reload if the store was changed by someone else since we last synced
+
+        Collections with unflushed changes are left alone; they are checked
+        again on the next call, after the saver has flushed them. The
+        store's token ignores our own writes, so a flush never hides an
+        external change made before it.
+        """
+        with self._lock:
+            if self.dirty or self.store.change_token() == self._store_token:
+                return False
+            logger.info(f"Reloading {type(self.store).__name__}, changed externally")
+            self.reload()
+        return True
+
+    @property
+    def dirty(self):
+        return self.version != self.flushed_version
+
+    def next_id(self):
+        """
+        Allocate an id for a new record; never repeats, even after deletes
+        or in another process
+
+        The record added with it is inserted, never written over a stored
+        one (see ``SQLiteStore.apply``).
+        """
+        record_id = self.ids.allocate()
+        with self._lock:
+            self._new_ids.add(self._key(record_id))
+        return record_id
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._records.values()))
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, record_id):
+        return self._key(record_id) in self._records
+
+    def get(self, record_id, default=None):
+        """Return the record with this id, or ``default``"""
+        return self._records.get(self._key(record_id), default)
+
+    def _touch(self, key):
+        self._changed[key] = None
+        self.version += 1
+
+    def add(self, record):
+        """
+        Add a new record (or overwrite one with the same id)
+
+        Raises:
+            DuplicateIdError: If the id came from ``next_id`` and is already taken
+        """
+        with self._lock:
+            key = self._key(record["id"])
+            old = self._records.get(key)
+            if old is not None and key in self._new_ids:
+                raise DuplicateIdError(f"Id {record['id']} from next_id is already in use")
+            self.ids.observe(record["id"])
+            self._records[key] = record
+            self._touch(key)
+            self._notify(old, record)
+        return record
+
+    def upsert_many(self, records):
+        """Add or overwrite several records by id under one lock"""
+        with self._lock:
+            for record in records:
+                self.add(record)
+        return len(records)
+
+    def update(self, record_id, **fields):
+        """Update fields of an existing record; returns it, or None if missing"""
+        with self._lock:
+            key = self._key(record_id)
+            record = self._records.get(key)
+            if record is None:
+                return None
+            old = dict(record)
+            record.update(fields)
+            # Stored back: the mapping may hold it packed (see TaskCollection)
+            self._records[key] = record
+            self._touch(key)
+            self._notify(old, record)
+        return record
+
+    def remove(self, record_id):
+        """Remove a record; returns whether it existed"""
+        with self._lock:
+            key = self._key(record_id)
+            old = self._records.pop(key, None)
+            if old is None:
+                return False
+            self._touch(key)
+            self._notify(old, None)
+        return True
+
+    def remove_where(self, predicate):
+        """Remove every record matching ``predicate``; returns how many"""
+        with self._lock:
+            keys = [key for key, record in self._records.items() if predicate(record)]
+            for key in keys:
+                old = self._records.pop(key)
+                self._touch(key)
+                self._notify(old, None)
+        return len(keys)
+
+    def replace_all(self, records):
+        """Replace the whole collection, e.g. after an import or reset"""
+        with self._lock:
+            self._records = self._new_records(records)
+            for record in records:
+                self.ids.observe(record["id"])
+            self._changed = dict.fromkeys(self._records)
+            self._reset = True
+            self.version += 1
+            self._notify_reload()
+
+    def drain_changes(self):
+        """
+        Take the pending changes for a flush
+
+        Returns:
+            ChangeBatch: The changes, or None if nothing changed
+        """
+        with self._lock:
+            if not self.dirty:
+                return None
+            inserts = []
+            upserts = []
+            deletes = []
+            for key in self._changed:
+                record = self._records.get(key)
+                if record is None:
+                    deletes.append(key)
+                elif key in self._new_ids:
+                    inserts.append(dict(record))
+                else:
+                    # Copy so the flush serializes a stable value
+                    upserts.append(dict(record))
+            self._new_ids.difference_update(self._changed)
+            batch = ChangeBatch(
+                self._reset,
+                dict(self._changed),
+                inserts,
+                upserts,
+                deletes,
+                self.version,
+                self.version - self.flushed_version,
+            )
+            self._changed.clear()
+            self._reset = False
+            self.flushed_version = self.version
+        return batch
+
+    def restore(self, batch):
+        """Put a batch back after a failed flush so it is retried"""
+        with self._lock:
+            self._changed = {**batch.keys, **self._changed}
+            self._reset = self._reset or batch.reset
+            self.flushed_version -= batch.mutations
+            self._new_ids.update(self._key(record["id"]) for record in batch.inserts)
+
+
+class TaskCollection(RecordCollection):
+    """
+    Task records plus the queries the scheduler and UI run against them.
+
+    Queries are answered from a ``TaskIndex`` and counts from
+    ``TaskAggregates``, both kept up to date on every mutation instead of
+    scanning all tasks.
+
+    With config.PACK_COMPLETED_TASKS, completed tasks are kept as rows of
+    a columnar ``TaskTable`` instead of dicts (see ``PackedRecords``), so
+    a large archive takes a fraction of the memory; reading one builds a
+    new dict each time.
+    """
+
+    is_open = staticmethod(is_open_task)
+
+    def __init__(self, store):
+        self.index = TaskIndex()
+        self.aggregates = TaskAggregates()
+        super().__init__(store)
+        self.subscribe(self.index)
+        self.subscribe(self.aggregates)
+
+    def _new_records(self, records):
+        if not config.PACK_COMPLETED_TASKS:
+            return super()._new_records(records)
+        return PackedRecords(
+            TaskTable,
+            lambda task: not is_open_task(task),
+            ((self._key(r["id"]), r) for r in records),
+        )
+
+    def _tasks(self, keys):
+        return [self._records[key] for key in keys]
+
+    def open_count(self):
+        return len(self.index.open)
+
+    def completed_count(self):
+        return self.aggregates.completed
+
+    def _occurrences(self, start_day, end_day):
+        """Occurrences of the open recurring tasks within the window"""
+        occurrences = []
+        for key in list(self.index.recurring):
+            task = self._records.get(key)
+            if task is not None:
+                occurrences += expand(task, start_day, end_day)
+        return occurrences
+
+    def count_due_on(self, day, include_completed=False):
+        """Number of tasks due on ``day`` (YYYY-MM-DD)"""
+        count = self.aggregates.due_on(day, include_completed)
+        if self.index.recurring:
+            count += len(self._occurrences(day, day))
+        return count
+
+    def count_overdue(self, today):
+        """Number of open tasks due before ``today`` (YYYY-MM-DD)"""
+        return self.aggregates.overdue_on(today)
+
+    def summary(self, today=None):
+        """Task counts as of ``today``; see ``TaskAggregates.summary``"""
+        today = today or date.today().isoformat()
+        summary = self.aggregates.summary(today)
+        if self.index.recurring:
+            tomorrow = (date.fromisoformat(today) + timedelta(days=1)).isoformat()
+            for occurrence in self._occurrences(today, tomorrow):
+                day = occurrence["due_date"][:10]
+                summary["due_today" if day == today else "due_tomorrow"] += 1
+        return summary
+
+    def open_tasks(self):
+        return self._tasks(self.index.open)
+
+    def completed_tasks(self):
+        return [t for key, t in self._records.items() if key not in self.index.open]
+
+    def open_by_priority(self, priority):
+        return self._tasks(self.index.open_by_priority.get(priority, ()))
+
+    def by_category(self, category):
+        return self._tasks(self.index.by_category.get(category, ()))
+
+    def due_between(self, start_day, end_day, include_completed=False):
+        """
+        Tasks due from ``start_day`` to ``end_day`` inclusive, by due date
+
+        Recurring tasks appear once per occurrence in the window, expanded
+        on demand (see ``backend.recurrence.expand``).
+        """
+        tasks = self._tasks(self.index.keys_between(start_day, end_day, include_completed))
+        if self.index.recurring:
+            tasks += self._occurrences(start_day, end_day)
+            tasks.sort(key=lambda task: task["due_date"])
+        return tasks
+
+    def due_on(self, day, include_completed=False):
+        return self.due_between(day, day, include_completed)
+
+    def in_month(self, year, month):
+        """All tasks (open or not) due in the given month"""
+        start = f"{year}-{month:02d}-01"
+        end = f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+        return self.due_between(start, end, include_completed=True)
+
+    def open_tasks_with_due_date(self):
+        """Return tasks that are not completed and have a due date, by due date"""
+        return self._tasks(key for _, key in self.index.open_due)
+
+    def next_open_tasks(self, limit, today=None):
+        """
+        The first ``limit`` open tasks by due date; undated tasks last
+
+        A recurring task is listed once, as its next occurrence due on or
+        after ``today`` (YYYY-MM-DD, default today).
+        """
+        tasks = self._tasks(key for _, key in self.index.open_due[:limit])
+        if self.index.recurring:
+            today = today or date.today().isoformat()
+            for key in list(self.index.recurring):
+                task = self._records.get(key)
+                occurrence = task and first_occurrence_from(task, today)
+                if occurrence:
+                    tasks.append(occurrence)
+            tasks.sort(key=lambda task: task["due_date"])
+            del tasks[limit:]
+        if len(tasks) < limit:
+            undated = (
+                k for k in self.index.open
+                if k not in self.index.due_of and k not in self.index.recurring
+            )
+            tasks += self._tasks(islice(undated, limit - len(tasks)))
+        return tasks
+
+
+class NoteCollection(RecordCollection):
+    """Note records with their counts kept in ``NoteAggregates``"""
+
+    def __init__(self, store):
+        self.aggregates = NoteAggregates()
+        super().__init__(store)
+        self.subscribe(self.aggregates)
+
+    def summary(self):
+        """Total, private, public and category counts"""
+        return self.aggregates.summary()
+
+
+def get_task_collection(user_id=None):
+    """
+    Return a user's task collection (default user if not given)
+
+    Every session of that user, the scheduler and the notifier share this
+    one parsed copy, so memory grows with the data rather than with the
+    number of sessions.
+    """
+    from backend.shards import shards
+
+    return shards.get(user_id).tasks
+
+
+def get_note_collection(user_id=None):
+    """Return a user's note collection (default user if not given)"""
+    from backend.shards import shards
+
+    return shards.get(user_id).notes
@@ -0,0 +1,230 @@
+import io
+import json
+import logging
+from datetime import datetime
+from backend.recurrence import validate_rrule
+
+logger = logging.getLogger("nikassistant.data_transfer")
+
+EXPORT_VERSION = "2.0"
+IMPORT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 20
+
+# NDJSON export layout: one header line, then one line per record
+#   {"type": "header", "version": "2.0", "export_date": "..."}
+#   {"type": "task", "record": {...}}
+#   {"type": "note", "record": {...}}
+
+
+def iter_export_lines(tasks, notes):
+    """
+    Yield an NDJSON export of tasks and notes, one encoded line at a time
+
+    Args:
+        tasks: Iterable of task records
+        notes: Iterable of note records
+
+    Returns:
+        Generator of UTF-8 encoded lines
+    """
+    header = {
+        "type": "header",
+        "version": EXPORT_VERSION,
+        "export_date": datetime.now().isoformat(),
+    }
+    yield (json.dumps(header) + "\n").encode("utf-8")
+    for kind, records in (("task", tasks), ("note", notes)):
+        for record in records:
+            line = json.dumps({"type": kind, "record": record}, ensure_ascii=False)
+            yield (line + "\n").encode("utf-8")
+
+
+def export_bytes(tasks, notes):
+    """
+    The NDJSON export as one bytes object, for st.download_button
+
+    Streamlit keeps the download's data in memory and seeks in it, so it
+    is built in full here; the lines are joined once rather than
+    concatenated one by one.
+    """
+    return b"".join(iter_export_lines(tasks, notes))
+
+
+def _valid_id(value):
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, str) and value.strip() != "")
+
+
+def _valid_date(value):
+    if value in (None, ""):
+        return True
+    if not isinstance(value, str):
+        return False
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def validate_task(record):
+    """
+    Check a task record from an import
+
+    Returns:
+        str: Why the record is rejected, or None if it is valid
+    """
+    if not isinstance(record, dict):
+        return "record is not an object"
+    if not _valid_id(record.get("id")):
+        return "missing or invalid id"
+    if not isinstance(record.get("title"), str) or not record["title"].strip():
+        return "missing title"
+    for field in ("due_date", "created_at", "completed_at"):
+        if not _valid_date(record.get(field)):
+            return f"invalid {field}"
+    if not isinstance(record.get("completed", False), bool):
+        return "completed must be true or false"
+    if record.get("rrule"):
+        return validate_rrule(record["rrule"], record.get("due_date"))
+    return None
+
+
+def validate_note(record):
+    """
+    Check a note record from an import
+
+    Returns:
+        str: Why the record is rejected, or None if it is valid
+    """
+    if not isinstance(record, dict):
+        return "record is not an object"
+    if not _valid_id(record.get("id")):
+        return "missing or invalid id"
+    if not isinstance(record.get("content", record.get("title")), str):
+        return "missing content"
+    for field in ("created_at", "updated_at"):
+        if not _valid_date(record.get(field)):
+            return f"invalid {field}"
+    return None
+
+
+VALIDATORS = {"task": validate_task, "note": validate_note}
+
+
+class ImportResult:
+    """Counters from one import"""
+
+    def __init__(self):
+        self.imported = {"task": 0, "note": 0}
+        self.skipped = 0
+        self.errors = []
+
+    def reject(self, where, reason):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{where}: {reason}")
+
+
+def _legacy_entries(text_file):
+    """Entries from the old single-document ``{"tasks": [...], "notes": [...]}`` export"""
+    data = json.load(text_file)
+    if not isinstance(data, dict):
+        raise ValueError("Unrecognized export format")
+    for kind, key in (("task", "tasks"), ("note", "notes")):
+        for i, record in enumerate(data.get(key, [])):
+            yield f"{key}[{i}]", kind, record
+
+
+def _is_ndjson_entry(line):
+    try:
+        entry = json.loads(line)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(entry, dict) and "type" in entry
+
+
+def _ndjson_entries(text_file, first_line, result):
+    lines = iter(text_file)
+    line_number = 1
+    line = first_line
+    while line is not None:
+        if line.strip():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                result.reject(f"line {line_number}", f"not valid JSON ({e.msg})")
+                entry = None
+            if isinstance(entry, dict) and entry.get("type") in VALIDATORS:
+                yield f"line {line_number}", entry["type"], entry.get("record")
+            elif entry is not None and not (
+                isinstance(entry, dict) and entry.get("type") == "header"
+            ):
+                result.reject(f"line {line_number}", "unknown entry type")
+        line = next(lines, None)
+        line_number += 1
+
+
+def import_stream(file, tasks, notes, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Validate and upsert records from an export file, a chunk at a time
+
+    Reads NDJSON exports line by line, so only one chunk of parsed records
+    is held at once. Older single-document JSON exports are still accepted.
+    Records are upserted by id; existing records not in the file are kept.
+
+    Args:
+        file: Binary file object (e.g. a Streamlit UploadedFile)
+        tasks: Task collection to upsert into
+        notes: Note collection to upsert into
+        chunk_size: Records validated and applied per batch
+        progress: Optional callback ``progress(fraction, result)``
+
+    Returns:
+        ImportResult: Imported and skipped counts, plus the first errors
+    """
+    total = getattr(file, "size", None)
+    text_file = io.TextIOWrapper(file, encoding="utf-8")
+    result = ImportResult()
+    targets = {"task": tasks, "note": notes}
+    pending = {"task": [], "note": []}
+
+    def flush():
+        for kind, records in pending.items():
+            if records:
+                targets[kind].upsert_many(records)
+                result.imported[kind] += len(records)
+                records.clear()
+        if progress and total:
+            progress(min(file.tell() / total, 1.0), result)
+
+    try:
+        first_line = text_file.readline()
+        if _is_ndjson_entry(first_line):
+            entries = _ndjson_entries(text_file, first_line, result)
+        else:
+            text_file.seek(0)
+            entries = _legacy_entries(text_file)
+
+        queued = 0
+        for where, kind, record in entries:
+            reason = VALIDATORS[kind](record)
+            if reason:
+                result.reject(where, f"{kind} {reason}")
+                continue
+            pending[kind].append(record)
+            queued += 1
+            if queued >= chunk_size:
+                flush()
+                queued = 0
+        flush()
+    finally:
+        # Leave the caller's file open
+        text_file.detach()
+
+    logger.info(
+        f"Imported {result.imported['task']} tasks and {result.imported['note']} notes, "
+        f"skipped {result.skipped}"
+    )
+    return result
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import config
+
+# Returned instead of True by a send skipped as a repeat; still truthy,
+# since there is nothing left to retry
+SUPPRESSED = "suppressed"
+
+
+class DedupCache:
+    """
+    Recently sent notifications, to drop identical repeats.
+
+    Keys are hashes of (channel, title, message, recipient). A send claims
+    its key before going out, which checks for and reserves it in one
+    step, so of two identical sends at the same moment only one goes out.
+    A failed send releases its claim so it can be retried. A claim
+    suppresses identical sends for ``ttl`` seconds (repeats don't extend
+    that). At most ``max_entries`` keys are kept; the least recently used
+    go first.
+
+    Meant for automated sends; a send the user asked for explicitly (a
+    test button) passes ``dedup=False`` and skips the cache.
+    """
+
+    def __init__(self, ttl=None, max_entries=None, clock=time.monotonic):
+        """
+        Args:
+            ttl: Seconds a send suppresses repeats (default:
+                config.NOTIFY_DEDUP_TTL_SECONDS; 0 disables the cache)
+            max_entries: Most keys kept (default: config.NOTIFY_DEDUP_MAX_ENTRIES)
+            clock: Callable returning seconds
+        """
+        self.ttl = config.NOTIFY_DEDUP_TTL_SECONDS if ttl is None else ttl
+        self.max_entries = max_entries or config.NOTIFY_DEDUP_MAX_ENTRIES
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._expires = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(channel, title, message, recipient=None):
+        """Hash of a notification's content, as a dict key"""
+        content = "\x1f".join((channel, str(title), str(message), str(recipient or "")))
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
+    def claim(self, key):
+        """
+        Reserve ``key`` for a send unless it was claimed within the TTL
+
+        Counts a hit or a miss. Call ``release`` if the send then fails.
+
+        Returns:
+            bool: True if the caller should send, False for a repeat
+        """
+        if not self.ttl:
+            return True
+        with self._lock:
+            now = self.clock()
+            expires = self._expires.get(key)
+            if expires is not None and expires > now:
+                self._expires.move_to_end(key)
+                self.stats["hits"] += 1
+                return False
+            self.stats["misses"] += 1
+            self._expires[key] = now + self.ttl
+            self._expires.move_to_end(key)
+            while len(self._expires) > self.max_entries:
+                self._expires.popitem(last=False)
+                self.stats["evictions"] += 1
+            return True
+
+    def release(self, key):
+        """Drop the claim of a send that failed, so it can be retried"""
+        if not self.ttl:
+            return
+        with self._lock:
+            self._expires.pop(key, None)
+
+    def clear(self):
+        """Forget every recorded send (stats are kept)"""
+        with self._lock:
+            self._expires.clear()
+
+    def get_stats(self):
+        """Hit, miss and eviction counts, current size and hit rate"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._expires),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Global cache shared by the notification and email services of this process
+dedup_cache = DedupCache()
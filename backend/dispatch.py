@@ -0,0 +1,337 @@
+import itertools
+import logging
+import multiprocessing
+from multiprocessing import connection
+import queue
+import threading
+import time
+import zlib
+import config
+
+logger = logging.getLogger("nikassistant.dispatch")
+
+# How long a put into a full shard queue waits before checking the worker is alive
+WORKER_CHECK_SECONDS = 1.0
+
+
+def default_sender():
+    """
+    Build the reminder sender used inside a worker process
+
+    Each worker gets its own NotificationService and EmailService, so the
+    blocking desktop and SMTP calls of different shards run in parallel.
+    """
+    from backend.email_service import EmailService
+    from backend.notification_service import NotificationService
+    from backend.scheduler import deliver_task_reminder
+
+    notification_service = NotificationService()
+    email_service = EmailService()
+    return lambda task: deliver_task_reminder(task, notification_service, email_service)
+
+
+def shard_for(user_id, shards):
+    """Stable shard of a tenant; every reminder of a user goes to the same worker"""
+    return zlib.crc32(str(user_id).encode("utf-8")) % shards
+
+
+def _worker(shard, jobs, results, sender_factory):
+    """Worker process: send every reminder of every batch until told to stop"""
+    # A spawned process starts with whatever logging its imports set up;
+    # set it up again so its records are there and name the worker
+    config.setup_logging(
+        format="%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+    send = sender_factory()
+    while True:
+        batch = jobs.get()
+        if batch is None:
+            return
+        for seq, enqueued_at, task in batch:
+            try:
+                ok = send(task) is not False
+            except Exception as e:
+                logger.error(f"Dispatch shard {shard} failed to send a reminder: {e}")
+                ok = False
+            # Reported one by one, so a crash mid-batch loses as little as possible
+            results.send((seq, ok, time.time() - enqueued_at))
+
+
+class ReminderDispatcher:
+    """
+    Sends reminders from a pool of worker processes, one per shard.
+
+    ``submit`` routes each reminder by its tenant (user id) hash to a shard
+    and batches them; batches go through a bounded queue per shard. When a
+    shard's queue is full, ``submit`` blocks until the worker catches up,
+    so a 9:00 burst holds the reminder thread back instead of piling up in
+    memory. Reminders of one user stay in order on one worker.
+
+    Each worker reports every reminder back over its own pipe once it was
+    sent or failed; a thread in this process reads the reports and passes
+    them to ``on_done`` with the ``token`` the reminder was submitted
+    with, so the caller only forgets a reminder once it is finished.
+
+    A worker that exits (killed, or a crash in its sender) is replaced by a
+    new one on a new queue the next time its shard gets a batch, or within
+    ``WORKER_CHECK_SECONDS`` while ``submit`` waits on it. The reminders it
+    had not reported are counted as lost and passed to ``on_done`` with
+    ``ok`` None.
+
+    Workers are started with the ``spawn`` method: the app process runs
+    threads and holds SQLite connections that must not be forked.
+    """
+
+    def __init__(self, workers=None, queue_batches=None, batch_size=None,
+                 sender_factory=default_sender, on_done=None):
+        """
+        Args:
+            workers: Number of worker processes (default: config.DISPATCH_WORKERS)
+            queue_batches: Batches each shard may have waiting before
+                ``submit`` blocks (default: config.DISPATCH_QUEUE_BATCHES)
+            batch_size: Reminders per batch (default: config.DISPATCH_BATCH_SIZE)
+            sender_factory: Picklable callable run once in each worker that
+                returns ``send(task)``; ``send`` returning False counts as failed
+            on_done: Called as ``on_done([(token, ok), ...])`` from the
+                result thread, for reminders submitted with a token; ``ok``
+                is True if sent, False if sending failed and None if lost
+        """
+        self.workers = workers or config.DISPATCH_WORKERS
+        self.queue_batches = queue_batches or config.DISPATCH_QUEUE_BATCHES
+        self.batch_size = batch_size or config.DISPATCH_BATCH_SIZE
+        self.sender_factory = sender_factory
+        self.on_done = on_done
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        # Guards the result pipes and the unfinished reminders; taken after _lock
+        self._results_lock = threading.Lock()
+        self._seq = itertools.count()
+        self._processes = []
+        self._queues = []
+        self._results = []
+        self._pending = [[] for _ in range(self.workers)]
+        # Per shard: seq -> token of every reminder not reported yet
+        self._unfinished = [{} for _ in range(self.workers)]
+        self._collector = None
+        self.submitted = [0] * self.workers
+        self.blocked_seconds = [0.0] * self.workers
+        self.sent = [0] * self.workers
+        self.failed = [0] * self.workers
+        self.lost = [0] * self.workers
+        self.restarts = [0] * self.workers
+        self.latency_sum = [0.0] * self.workers
+        self.latency_max = [0.0] * self.workers
+
+    @property
+    def running(self):
+        return bool(self._processes)
+
+    def start(self):
+        with self._lock:
+            if self._processes:
+                return
+            for shard in range(self.workers):
+                jobs, results, process = self._spawn(shard)
+                self._queues.append(jobs)
+                self._results.append(results)
+                self._processes.append(process)
+            self._collector = threading.Thread(target=self._collect_loop, daemon=True)
+            self._collector.start()
+        logger.info(f"Reminder dispatcher started with {self.workers} worker processes")
+
+    def _spawn(self, shard):
+        jobs = self._context.Queue(self.queue_batches)
+        results, results_sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker,
+            args=(shard, jobs, results_sender, self.sender_factory),
+            name=f"reminder-dispatch-{shard}",
+            daemon=True,
+        )
+        process.start()
+        # Only the worker writes to the pipe: it reads as closed once the worker exits
+        results_sender.close()
+        return jobs, results, process
+
+    def _collect_loop(self):
+        while self._collector is not None:
+            with self._results_lock:
+                pipes = [pipe for pipe in self._results if not pipe.closed]
+            try:
+                ready = connection.wait(pipes, timeout=WORKER_CHECK_SECONDS) if pipes else []
+            except OSError:
+                # A pipe was replaced while we waited on it
+                continue
+            if not pipes:
+                time.sleep(WORKER_CHECK_SECONDS)
+            for pipe in ready:
+                self._collect(pipe)
+
+    def _collect(self, pipe):
+        """Read every report waiting in a worker's pipe and pass them on"""
+        done = []
+        reports = []
+        with self._results_lock:
+            shard = next((i for i, p in enumerate(self._results) if p is pipe), None)
+            if shard is None:
+                return
+            try:
+                while not pipe.closed and pipe.poll():
+                    seq, ok, latency = pipe.recv()
+                    reports.append((ok, latency))
+                    token = self._unfinished[shard].pop(seq, None)
+                    if token is not None:
+                        done.append((token, ok))
+            except (EOFError, OSError):
+                # The worker exited; _ensure_alive accounts for the rest
+                pipe.close()
+        self._report(done)
+        # Counted only once on_done has them, so drain() returning means
+        # the caller has seen every result
+        with self._results_lock:
+            for ok, latency in reports:
+                if ok:
+                    self.sent[shard] += 1
+                else:
+                    self.failed[shard] += 1
+                self.latency_sum[shard] += latency
+                self.latency_max[shard] = max(self.latency_max[shard], latency)
+
+    def _report(self, done):
+        if done and self.on_done:
+            try:
+                self.on_done(done)
+            except Exception as e:
+                logger.error(f"Error handling dispatched reminder results: {e}")
+
+    def _ensure_alive(self, shard, in_hand):
+        """
+        Replace a shard's worker if it exited
+
+        The new worker gets a new queue: the dead one may have held the old
+        queue's lock. Whatever the old worker had not reported is counted
+        in ``lost``; the ``in_hand`` batch is being put and is not.
+        """
+        process = self._processes[shard]
+        if process.is_alive():
+            return
+        pipe = self._results[shard]
+        self._collect(pipe)
+        waiting = {seq for seq, _, _ in self._pending[shard]}
+        waiting.update(seq for seq, _, _ in in_hand)
+        with self._results_lock:
+            unfinished = self._unfinished[shard]
+            lost = [seq for seq in unfinished if seq not in waiting]
+            tokens = [unfinished.pop(seq) for seq in lost]
+            pipe.close()
+            self.restarts[shard] += 1
+            self._queues[shard].cancel_join_thread()
+            self._queues[shard], self._results[shard], self._processes[shard] = self._spawn(shard)
+        logger.error(
+            f"Dispatch shard {shard} worker exited with code {process.exitcode}, "
+            f"restarting it; {len(lost)} queued reminders were lost"
+        )
+        self._report([(token, None) for token in tokens if token is not None])
+        with self._results_lock:
+            self.lost[shard] += len(lost)
+
+    def submit(self, user_id, task, token=None):
+        """
+        Queue a reminder on its tenant's shard, blocking while that shard is full
+
+        Args:
+            token: Passed back to ``on_done`` once the reminder is finished
+        """
+        shard = shard_for(user_id, self.workers)
+        with self._lock:
+            seq = next(self._seq)
+            with self._results_lock:
+                self._unfinished[shard][seq] = token
+            self._pending[shard].append((seq, time.time(), task))
+            self.submitted[shard] += 1
+            if len(self._pending[shard]) >= self.batch_size:
+                self._put(shard)
+
+    def flush(self):
+        """Hand every partly filled batch to its worker"""
+        with self._lock:
+            for shard in range(self.workers):
+                if self._pending[shard]:
+                    self._put(shard)
+
+    def _put(self, shard):
+        batch, self._pending[shard] = self._pending[shard], []
+        self._put_job(shard, batch, batch)
+
+    def _put_job(self, shard, job, in_hand):
+        self._ensure_alive(shard, in_hand)
+        try:
+            self._queues[shard].put_nowait(job)
+            return
+        except queue.Full:
+            pass
+        # Backpressure: wait for the worker instead of buffering more, but
+        # keep checking on it so a dead worker can't block us forever
+        start = time.perf_counter()
+        while True:
+            try:
+                self._queues[shard].put(job, timeout=WORKER_CHECK_SECONDS)
+                break
+            except queue.Full:
+                self._ensure_alive(shard, in_hand)
+        self.blocked_seconds[shard] += time.perf_counter() - start
+
+    def drain(self, timeout=None):
+        """Wait until every submitted reminder was sent, failed or lost; returns whether it was"""
+        self.flush()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while sum(self.sent) + sum(self.failed) + sum(self.lost) < sum(self.submitted):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            with self._lock:
+                # Nothing else notices a worker that died with its queue empty
+                for shard in range(len(self._processes)):
+                    self._ensure_alive(shard, ())
+            time.sleep(0.005)
+        return True
+
+    def stop(self):
+        """Send what is queued, then stop the workers"""
+        with self._lock:
+            for shard in range(len(self._queues)):
+                if self._pending[shard]:
+                    self._put(shard)
+                self._put_job(shard, None, ())
+            processes, self._processes, self._queues = self._processes, [], []
+            collector, self._collector = self._collector, None
+        for process in processes:
+            process.join()
+        if collector:
+            collector.join()
+        # Reports the workers wrote just before exiting
+        for pipe in list(self._results):
+            self._collect(pipe)
+            pipe.close()
+        self._results = []
+        if processes:
+            logger.info("Reminder dispatcher stopped")
+
+    def get_stats(self):
+        """Per-shard counters: submitted, sent, failed, lost, backlog, latency and backpressure"""
+        shards = []
+        for shard in range(self.workers):
+            done = self.sent[shard] + self.failed[shard]
+            shards.append({
+                "shard": shard,
+                "submitted": self.submitted[shard],
+                "sent": self.sent[shard],
+                "failed": self.failed[shard],
+                "lost": self.lost[shard],
+                "restarts": self.restarts[shard],
+                "backlog": self.submitted[shard] - done - self.lost[shard],
+                "avg_latency_ms": round(self.latency_sum[shard] / done * 1000, 2) if done else 0.0,
+                "max_latency_ms": round(self.latency_max[shard] * 1000, 2),
+                "blocked_seconds": round(self.blocked_seconds[shard], 3),
+            })
+        return shards
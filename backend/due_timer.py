@@ -0,0 +1,153 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger("nikassistant.due_timer")
+
+_REMOVED = object()
+
+
+def due_timestamp(due_date):
+    """
+    Epoch seconds at which a ``due_date`` string is passed
+
+    Date-only values are due at midnight. A key fires once the clock is
+    past this, matching the old hourly check's
+    ``datetime.fromisoformat(due_date) < now``.
+    """
+    return datetime.fromisoformat(due_date).timestamp()
+
+
+class DueTimer:
+    """
+    Min-heap of deadlines with a thread that sleeps until the earliest one.
+
+    ``schedule`` and ``cancel`` cost O(log n) and O(1); cancelled entries
+    are dropped lazily when they reach the top of the heap, and the heap
+    is rebuilt once they make up half of it. When deadlines pass, the
+    thread wakes and hands every due key to ``callback`` in one batch.
+
+    With a ``window``, the thread waits that many seconds past the
+    earliest deadline before firing, so deadlines a few seconds apart
+    arrive in the same batch instead of one wakeup each.
+    """
+
+    def __init__(self, callback, clock=time.time, window=0.0):
+        self.callback = callback
+        self.clock = clock
+        self.window = window
+        self._heap = []
+        self._entries = {}
+        self._removed = 0
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self.thread = None
+        self.stats = {"scheduled": 0, "cancelled": 0, "fired": 0, "wakeups": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def schedule(self, key, due):
+        """Fire ``key`` at epoch second ``due``, replacing any earlier deadline"""
+        with self._cond:
+            self._cancel(key)
+            entry = [due, next(self._counter), key]
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            self.stats["scheduled"] += 1
+            if self._heap[0] is entry:
+                # New earliest deadline: wake the thread to shorten its sleep
+                self._cond.notify()
+
+    def cancel(self, key):
+        with self._cond:
+            if self._cancel(key):
+                self.stats["cancelled"] += 1
+
+    def _cancel(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[2] = _REMOVED
+        self._removed += 1
+        if self._removed > len(self._heap) // 2 and self._removed > 1024:
+            self._heap = [e for e in self._heap if e[2] is not _REMOVED]
+            heapq.heapify(self._heap)
+            self._removed = 0
+        return True
+
+    def clear(self, predicate):
+        """Cancel every key matching ``predicate``"""
+        with self._cond:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._cancel(key)
+
+    def _drop_removed(self):
+        while self._heap and self._heap[0][2] is _REMOVED:
+            heapq.heappop(self._heap)
+            self._removed -= 1
+
+    def next_due(self):
+        """When the next batch fires (earliest deadline plus the window), or None"""
+        with self._cond:
+            self._drop_removed()
+            return self._heap[0][0] + self.window if self._heap else None
+
+    def pop_due(self, now=None):
+        """
+        Remove and return every key whose deadline is before ``now``
+
+        Returns nothing until the earliest deadline is ``window`` seconds old.
+        """
+        now = self.clock() if now is None else now
+        due = []
+        with self._cond:
+            self._drop_removed()
+            if not self._heap or self._heap[0][0] + self.window > now:
+                return due
+            while self._heap and self._heap[0][0] < now:
+                _, _, key = heapq.heappop(self._heap)
+                if key is not _REMOVED:
+                    del self._entries[key]
+                    due.append(key)
+                else:
+                    self._removed -= 1
+        self.stats["fired"] += len(due)
+        return due
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                self._drop_removed()
+                delay = self._heap[0][0] + self.window - self.clock() if self._heap else None
+                if delay is None or delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            self.stats["wakeups"] += 1
+            due = self.pop_due()
+            if due:
+                try:
+                    self.callback(due)
+                except Exception as e:
+                    logger.error(f"Due timer callback failed: {e}")
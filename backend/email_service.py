@@ -1,4 +1,3 @@
-import smtplib
 import logging
 import json
 from email.mime.text import MIMEText
@@ -6,6 +5,8 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import config
 import time
+from backend.dedup import SUPPRESSED, dedup_cache
+from backend.smtp_pool import smtp_pool
 
 logger = logging.getLogger("nikassistant.email")
 
@@ -15,8 +16,11 @@ class EmailService:
         self.password = config.EMAIL_PASS
         self.smtp_server = "smtp.gmail.com"
         self.smtp_port = 587
+        # Shared with every other EmailService of this process
+        self.smtp_pool = smtp_pool(self.smtp_server, self.smtp_port, self.email, self.password)
         
-    def send_email(self, to_email=None, subject="Notification from NikAssistant", body=""):
+    def send_email(self, to_email=None, subject="Notification from NikAssistant", body="",
+                   dedup=True):
         """
         Send an email notification
         
@@ -24,15 +28,21 @@ class EmailService:
             to_email (str): Recipient email. If None, sends to the configured email
             subject (str): Email subject
             body (str): Email body (HTML format supported)
+            dedup (bool): Skip the email if an identical one was sent within
+                config.NOTIFY_DEDUP_TTL_SECONDS; pass False for explicit sends
         
         Returns:
-            bool: Success status
+            bool: Success status, or SUPPRESSED if skipped as a repeat
         """
         if not self.email or not self.password:
             logger.warning("Email service not configured. Set EMAIL_USER and EMAIL_PASS in .env")
             return False
             
         recipient = to_email if to_email else self.email
+        key = dedup_cache.key("email", subject, body, recipient)
+        if dedup and not dedup_cache.claim(key):
+            logger.debug(f"Duplicate email to {recipient} skipped: {subject}")
+            return SUPPRESSED
         
         try:
             # Create message
@@ -44,16 +54,15 @@ class EmailService:
             # Attach HTML body
             message.attach(MIMEText(body, "html"))
             
-            # Connect to server
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email, self.password)
-                server.send_message(message)
+            # Send on a pooled, already logged-in session
+            self.smtp_pool.send_message(message)
                 
             logger.info(f"Email sent to {recipient}")
             return True
             
         except Exception as e:
+            if dedup:
+                dedup_cache.release(key)
             logger.error(f"Failed to send email: {e}")
             return False
     
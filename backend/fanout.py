@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import config
+
+logger = logging.getLogger("nikassistant.fanout")
+
+
+class ChannelPool:
+    """
+    Bounded thread pools that send on several channels at once.
+
+    Each channel (desktop, email, mobile) has its own pool and timeout, so
+    a notification's channels are sent concurrently and take as long as
+    the slowest one rather than the sum of all. A channel that hangs only
+    ties up its own workers; callers stop waiting for it after its
+    timeout and treat the send as failed.
+    """
+
+    def __init__(self, workers=None, timeouts=None):
+        """
+        Args:
+            workers: Threads per channel (default: config.NOTIFY_CHANNEL_WORKERS)
+            timeouts: Seconds to wait per channel (default: config.NOTIFY_CHANNEL_TIMEOUTS)
+        """
+        self.workers = workers or config.NOTIFY_CHANNEL_WORKERS
+        self.timeouts = timeouts or config.NOTIFY_CHANNEL_TIMEOUTS
+        self._lock = threading.Lock()
+        self._executors = {}
+        self.stats = {
+            channel: {"sent": 0, "failed": 0, "timed_out": 0} for channel in self.workers
+        }
+
+    def _executor(self, channel):
+        with self._lock:
+            executor = self._executors.get(channel)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.workers.get(channel, 1),
+                    thread_name_prefix=f"notify-{channel}",
+                )
+                self._executors[channel] = executor
+                self.stats.setdefault(channel, {"sent": 0, "failed": 0, "timed_out": 0})
+            return executor
+
+    def submit(self, channel, fn, *args, **kwargs):
+        """Start ``fn(*args, **kwargs)`` on the channel's pool; returns its Future"""
+        return self._executor(channel).submit(fn, *args, **kwargs)
+
+    def result(self, channel, future, started):
+        """
+        Wait for a send started at ``started`` (time.monotonic) within the channel's timeout
+
+        Returns:
+            The send's result, or False if it raised or timed out
+        """
+        remaining = started + self.timeouts.get(channel, 30) - time.monotonic()
+        try:
+            result = future.result(timeout=max(0, remaining))
+        except TimeoutError:
+            logger.warning(f"{channel} notification timed out after {self.timeouts.get(channel, 30)}s")
+            self._count(channel, "timed_out")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to send {channel} notification: {e}")
+            self._count(channel, "failed")
+            return False
+        self._count(channel, "failed" if result is False else "sent")
+        return result
+
+    def run(self, calls):
+        """
+        Send on several channels concurrently
+
+        Args:
+            calls: Mapping of channel to a callable that sends on it
+
+        Returns:
+            dict: Channel to the callable's result (False on error or timeout)
+        """
+        started = time.monotonic()
+        futures = {channel: self.submit(channel, fn) for channel, fn in calls.items()}
+        return {channel: self.result(channel, future, started) for channel, future in futures.items()}
+
+    def _count(self, channel, key):
+        with self._lock:
+            self.stats[channel][key] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {channel: dict(counts) for channel, counts in self.stats.items()}
+
+    def shutdown(self):
+        with self._lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=False)
+
+
+# Global pool shared by the notification services of this process
+channel_pool = ChannelPool()
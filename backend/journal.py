@@ -0,0 +1,501 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+import config
+from backend.storage import DuplicateIdError, highest_int_id, reassign_duplicate_ids
+from backend.snapshot import binary_snapshot_path, read_snapshot, write_snapshot
+
+logger = logging.getLogger("nikassistant.journal")
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so there is only ever one process
+    fcntl = None
+
+
+def atomic_write_json(path, data):
+    """
+    Write JSON to a temp file and rename it over ``path``
+
+    Readers see either the old file or the new one, never a partial write.
+
+    Returns:
+        int: Number of bytes written
+    """
+    payload = json.dumps(data, indent=4)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(payload)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    return len(payload)
+
+
+class MemoryStore:
+    """
+    Records held in memory and persisted to JSON files.
+
+    Mutations are expressed as journal entries (upsert, delete, reset, meta)
+    and handed to ``_persist``; subclasses decide how they reach disk.
+    Exposes the same methods as ``backend.storage.SQLiteStore``.
+
+    Other worker processes may have the same files open. Every write takes
+    an exclusive ``flock`` on ``<snapshot>.lock`` and first reloads the
+    files if they changed on disk since this store last read or wrote
+    them, so one process's writes never overwrite another's. The lock
+    file also holds the next id ``allocate_id`` hands out.
+    """
+
+    legacy_key = None
+
+    @property
+    def id_counter_key(self):
+        """Meta key holding the stored records' id counter"""
+        return f"{self.legacy_key}_next_id"
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = str(snapshot_path)
+        self.binary_path = binary_snapshot_path(snapshot_path)
+        self._lock = threading.RLock()
+        self._lock_file = open(self.snapshot_path + ".lock", "a+")
+        self._lock_depth = 0
+        self._records = {}
+        self._meta = {}
+        # Bumped whenever the files are reloaded because another process changed them
+        self.external_version = 0
+        with self._locked():
+            self._load()
+            self._disk_token = self._disk_state()
+
+    @staticmethod
+    def _key(record_id):
+        return str(record_id)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the store's thread lock and, across processes, its file lock"""
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _files(self):
+        """Files whose contents make up the store"""
+        return [self.snapshot_path]
+
+    def _disk_state(self):
+        """Inode, mtime and size of each of the store's files (None if missing)"""
+        state = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                state.append(None)
+                continue
+            state.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        return tuple(state)
+
+    def _load(self):
+        """Read the store's files into memory"""
+        self._records = {}
+        self._meta = {}
+        self._load_snapshot()
+
+    def _catch_up(self):
+        """Reload if another process changed the files; call with ``_locked`` held"""
+        state = self._disk_state()
+        if state == self._disk_token:
+            return False
+        logger.info(f"{self.snapshot_path} changed on disk, reloading")
+        self._load()
+        self._disk_token = self._disk_state()
+        self.external_version += 1
+        return True
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        loaded = None
+        if config.BINARY_SNAPSHOTS:
+            loaded = read_snapshot(self.binary_path, self.snapshot_path)
+        if loaded is not None:
+            # Written from an already de-duplicated store
+            records, self._meta = loaded
+        else:
+            with open(self.snapshot_path, "r") as file:
+                data = json.load(file)
+            records = reassign_duplicate_ids(data.get(self.legacy_key, []), self.snapshot_path)
+            self._meta = data.get("meta", {})
+        for record in records:
+            self._records[self._key(record["id"])] = record
+        self._bump_id_counter(highest_int_id(records))
+        if loaded is None and config.BINARY_SNAPSHOTS:
+            self._write_binary(records, self._meta)
+
+    def _write_binary(self, records, meta):
+        """Refresh the binary copy of the JSON snapshot; failures only cost speed"""
+        try:
+            return write_snapshot(self.binary_path, records, meta, self.snapshot_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write binary snapshot {self.binary_path}: {e}")
+            return 0
+
+    def _write_snapshot(self, data):
+        """
+        Atomically rewrite the JSON snapshot and its binary copy
+
+        Returns:
+            int: Number of bytes written
+        """
+        written = atomic_write_json(self.snapshot_path, data)
+        if config.BINARY_SNAPSHOTS:
+            written += self._write_binary(data[self.legacy_key], data.get("meta", {}))
+        return written
+
+    def _snapshot(self):
+        data = {self.legacy_key: list(self._records.values())}
+        if self._meta:
+            data["meta"] = dict(self._meta)
+        return data
+
+    def _bump_id_counter(self, record_id):
+        """Move the id counter in the metadata past an id that is stored"""
+        if isinstance(record_id, int) and not isinstance(record_id, bool):
+            if record_id >= int(self._meta.get(self.id_counter_key, 1)):
+                self._meta[self.id_counter_key] = str(record_id + 1)
+
+    def _apply(self, entry):
+        op = entry["op"]
+        if op == "upsert":
+            record = entry["record"]
+            self._records[self._key(record["id"])] = record
+            self._bump_id_counter(record["id"])
+        elif op == "delete":
+            self._records.pop(self._key(entry["id"]), None)
+        elif op == "reset":
+            self._records.clear()
+        elif op == "meta":
+            self._meta[entry["key"]] = entry["value"]
+
+    def _append(self, entries):
+        """Apply entries on top of the current files and persist them"""
+        with self._locked():
+            self._catch_up()
+            for entry in entries:
+                self._apply(entry)
+            written = self._persist(entries)
+            self._disk_token = self._disk_state()
+            return written
+
+    def _persist(self, entries):
+        raise NotImplementedError
+
+    def change_token(self):
+        """
+        Value that changes whenever another process writes the files
+
+        Compares the files' inode, mtime and size with what this store last
+        read or wrote, reloading them if they differ. Our own writes do not
+        change it, matching ``SQLiteStore.change_token``.
+        """
+        with self._lock:
+            if self._disk_state() != self._disk_token:
+                with self._locked():
+                    self._catch_up()
+            return self.external_version
+
+    def allocate_id(self, floor=1):
+        """
+        Claim an integer id for a new record
+
+        The next id is read from the lock file and bumped under its
+        ``flock``, so processes sharing the files never get the same id,
+        without rewriting the snapshot for every new record. It never goes
+        below the stored records' counter, so ids are not reused.
+
+        Args:
+            floor: Lowest acceptable id, past ids the caller holds unflushed
+
+        Returns:
+            int: The id
+        """
+        with self._locked():
+            self._catch_up()
+            self._lock_file.seek(0)
+            stored = self._lock_file.read().strip()
+            value = max(int(stored or 1), int(self._meta.get(self.id_counter_key, 1)), floor)
+            self._lock_file.truncate(0)
+            self._lock_file.write(str(value + 1))
+            self._lock_file.flush()
+        return value
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            return self._meta.get(key, default)
+
+    def set_meta(self, key, value):
+        self._append([{"op": "meta", "key": key, "value": str(value)}])
+
+    def all(self):
+        """Return every record in insertion order"""
+        with self._lock:
+            return [dict(record) for record in self._records.values()]
+
+    def get(self, record_id):
+        """Return a single record by id, or None"""
+        with self._lock:
+            record = self._records.get(self._key(record_id))
+        return dict(record) if record else None
+
+    def count(self):
+        with self._lock:
+            return len(self._records)
+
+    def upsert(self, record):
+        """Insert a record, or replace the stored copy if its id exists"""
+        self.upsert_many([record])
+
+    def upsert_many(self, records):
+        self._append([{"op": "upsert", "record": dict(record)} for record in records])
+
+    def delete(self, record_id):
+        """Delete a record by id"""
+        self.delete_many([record_id])
+
+    def delete_many(self, record_ids):
+        self._append([{"op": "delete", "id": record_id} for record_id in record_ids])
+
+    def replace_all(self, records):
+        """Replace the whole collection, e.g. after an import or reset"""
+        self.apply(records, [], reset=True)
+
+    def apply(self, upserts, deletes, reset=False, inserts=()):
+        """
+        Persist a batch of changes at once
+
+        ``inserts`` are new records with ids from ``allocate_id``; unlike
+        ``upserts`` they never replace a stored record.
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            DuplicateIdError: If an insert's id is already stored; nothing
+                of the batch is written
+        """
+        inserts = list(inserts)
+        entries = [{"op": "reset"}] if reset else []
+        entries += [{"op": "delete", "id": record_id} for record_id in deletes]
+        entries += [{"op": "upsert", "record": dict(record)} for record in inserts + list(upserts)]
+        with self._locked():
+            self._catch_up()
+            taken = [] if reset else [
+                str(r["id"]) for r in inserts if self._key(r["id"]) in self._records
+            ]
+            if taken:
+                raise DuplicateIdError(f"{self.snapshot_path} already has ids {', '.join(taken)}")
+            return self._append(entries)
+
+    def close(self):
+        with self._lock:
+            self._lock_file.close()
+
+
+class JournalStore(MemoryStore):
+    """
+    JSON snapshot plus an append-only journal of mutations.
+
+    The snapshot is the familiar ``{"tasks": [...]}`` file. Every upsert or
+    delete is appended to ``<snapshot>.journal`` as one JSON line, so a write
+    costs one record instead of the whole collection. Once the journal grows
+    past ``compact_bytes`` a background thread folds it into a new snapshot.
+    Startup loads the snapshot and replays the journal on top of it.
+
+    Compaction holds the file lock throughout, so a rotated journal left
+    on disk always means a process stopped mid-compaction.
+    """
+
+    def __init__(self, snapshot_path, compact_bytes=None):
+        self.journal_path = str(snapshot_path) + ".journal"
+        self.rotated_path = self.journal_path + ".1"
+        self.compact_bytes = compact_bytes or config.JOURNAL_COMPACT_BYTES
+        self._compact_lock = threading.Lock()
+        self._journal = None
+        super().__init__(snapshot_path)
+        if os.path.exists(self.rotated_path):
+            self.compact()
+
+        self._compact_requested = threading.Event()
+        self._running = True
+        self._compactor = threading.Thread(target=self._compact_loop, daemon=True)
+        self._compactor.start()
+
+    def _files(self):
+        return [self.snapshot_path, self.journal_path, self.rotated_path]
+
+    def _load(self):
+        super()._load()
+        self._replay()
+        self._truncate_torn_tail()
+        # Another process may have rotated the journal we were appending to
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "a")
+        self._journal_size = os.path.getsize(self.journal_path)
+
+    def _replay(self):
+        """Apply the journal files on top of the loaded snapshot"""
+        replayed = 0
+        # A rotated journal is left behind if the process stopped mid-compaction
+        for path in (self.rotated_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-append
+                        logger.warning(f"Skipping corrupt journal entry in {path}")
+                        continue
+                    self._apply(entry)
+                    replayed += 1
+        if replayed:
+            logger.info(f"Replayed {replayed} journal entries for {self.snapshot_path}")
+
+    def _truncate_torn_tail(self, chunk_size=4096):
+        """
+        Cut a torn final line off the journal; call with ``_locked`` held
+
+        Otherwise the next append would be glued onto the fragment and
+        skipped as corrupt on the following replay.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb+") as file:
+            end = file.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - chunk_size)
+                file.seek(start)
+                newline = file.read(position - start).rfind(b"\n")
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                logger.warning(
+                    f"Dropping {end - position} bytes of torn journal entry in {self.journal_path}"
+                )
+                file.truncate(position)
+
+    def _persist(self, entries):
+        lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+        self._journal.write(lines)
+        self._journal.flush()
+        self._journal_size += len(lines)
+        if self._journal_size >= self.compact_bytes:
+            self._compact_requested.set()
+        return len(lines)
+
+    def _compact_loop(self):
+        while self._running:
+            self._compact_requested.wait()
+            self._compact_requested.clear()
+            if self._running:
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error(f"Journal compaction failed: {e}")
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        with self._compact_lock, self._locked():
+            self._catch_up()
+            # Rotate first: if the process stops before the snapshot is
+            # written, the next start replays the rotated journal.
+            self._journal.close()
+            if os.path.exists(self.rotated_path):
+                with open(self.rotated_path, "a") as rotated, open(self.journal_path) as journal:
+                    rotated.write(journal.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.rotated_path)
+            self._journal = open(self.journal_path, "a")
+            self._journal_size = 0
+            data = self._snapshot()
+            self._write_snapshot(data)
+            os.remove(self.rotated_path)
+            self._disk_token = self._disk_state()
+        logger.info(
+            f"Compacted journal into {self.snapshot_path} "
+            f"({len(data[self.legacy_key])} records)"
+        )
+
+    def close(self):
+        self._running = False
+        self._compact_requested.set()
+        self._compactor.join()
+        with self._lock:
+            self._journal.close()
+        super().close()
+
+
+class SnapshotStore(MemoryStore):
+    """
+    The JSON file alone, rewritten atomically on every persisted batch.
+
+    Meant to sit behind the write-behind saver, which coalesces many
+    mutations into one temp-file + rename per flush interval.
+    """
+
+    def _persist(self, entries):
+        return self._write_snapshot(self._snapshot())
+
+
+class TaskQueries:
+    """Task-specific queries for the in-memory stores"""
+
+    legacy_key = "tasks"
+
+    @staticmethod
+    def _is_open(task):
+        return not task.get("completed", False) and task.get("status") != "Completed"
+
+    def open_tasks_with_due_date(self):
+        """Return tasks that are not completed and have a due date"""
+        tasks = [t for t in self.all() if self._is_open(t) and t.get("due_date")]
+        return sorted(tasks, key=lambda t: t["due_date"])
+
+
+class TaskJournalStore(TaskQueries, JournalStore):
+    def __init__(self, snapshot_path=None, compact_bytes=None):
+        super().__init__(snapshot_path or config.TASKS_FILE, compact_bytes)
+
+
+class NoteJournalStore(JournalStore):
+    legacy_key = "notes"
+
+    def __init__(self, snapshot_path=None, compact_bytes=None):
+        super().__init__(snapshot_path or config.NOTES_FILE, compact_bytes)
+
+
+class TaskSnapshotStore(TaskQueries, SnapshotStore):
+    def __init__(self, snapshot_path=None):
+        super().__init__(snapshot_path or config.TASKS_FILE)
+
+
+class NoteSnapshotStore(SnapshotStore):
+    legacy_key = "notes"
+
+    def __init__(self, snapshot_path=None):
+        super().__init__(snapshot_path or config.NOTES_FILE)
@@ -0,0 +1,97 @@
+import logging
+import os
+import socket
+import threading
+import time
+import config
+
+logger = logging.getLogger("nikassistant.leader")
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so there is only ever one process
+    fcntl = None
+
+
+class LeaderElection:
+    """
+    Elects one leader among the app's worker processes with a file lock.
+
+    Every process tries to take an exclusive, non-blocking ``flock`` on
+    ``lock_path``; the one that gets it is the leader and calls
+    ``on_elected``. The others retry every ``retry_interval`` seconds. The
+    kernel releases the lock when the leader exits or crashes, so a
+    follower takes over on its next attempt without any stale-lock cleanup.
+    """
+
+    def __init__(self, lock_path=None, on_elected=None, retry_interval=None):
+        self.lock_path = str(lock_path or config.SCHEDULER_LOCK_FILE)
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval or config.LEADER_RETRY_SECONDS
+        self.is_leader = False
+        self._file = None
+        self._stop = threading.Event()
+        self.thread = None
+        self.stats = {"attempts": 0, "elected_at": None}
+
+    def try_acquire(self):
+        """Take the lock if it is free; returns whether this process leads"""
+        if self.is_leader:
+            return True
+        self.stats["attempts"] += 1
+        file = open(self.lock_path, "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                return False
+        # Record who holds the lock, for humans looking at the file
+        file.seek(0)
+        file.truncate()
+        file.write(f"{socket.gethostname()} {os.getpid()}\n")
+        file.flush()
+        self._file = file
+        self.is_leader = True
+        self.stats["elected_at"] = time.time()
+        logger.info(f"Process {os.getpid()} elected scheduler leader")
+        if self.on_elected:
+            try:
+                self.on_elected()
+            except Exception as e:
+                logger.error(f"Error starting leader duties: {e}")
+        return True
+
+    def holder(self):
+        """The ``host pid`` line written by the current leader, if any"""
+        try:
+            with open(self.lock_path, "r") as file:
+                return file.read().strip() or None
+        except OSError:
+            return None
+
+    def start(self):
+        """Try to lead now, and keep trying in the background until elected"""
+        if self.try_acquire() or self.thread:
+            return
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.retry_interval):
+            try:
+                if self.try_acquire():
+                    return
+            except OSError as e:
+                logger.error(f"Error taking leader lock {self.lock_path}: {e}")
+
+    def stop(self):
+        """Stop retrying and give up leadership if held"""
+        self._stop.set()
+        if self.thread:
+            self.thread.join()
+        if self._file is not None:
+            # Closing the file releases the flock
+            self._file.close()
+            self._file = None
+        self.is_leader = False
@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+import config
+
+logger = logging.getLogger("nikassistant.mobile")
+
+# Most messages FCM accepts in one send_each request
+FCM_MAX_BATCH = 500
+
+
+class FirebaseTransport:
+    """Sends a batch of messages with firebase_admin's ``messaging.send_each``"""
+
+    def __init__(self, app=None):
+        self.app = app
+
+    def send_batch(self, messages):
+        """
+        Args:
+            messages: List of dicts with ``title``, ``body`` and ``topic``
+
+        Returns:
+            list: Whether each message was accepted, in order
+        """
+        from firebase_admin import messaging
+
+        payloads = [
+            messaging.Message(
+                notification=messaging.Notification(title=m["title"], body=m["body"]),
+                topic=m["topic"],
+            )
+            for m in messages
+        ]
+        response = messaging.send_each(payloads, app=self.app)
+        for m, r in zip(messages, response.responses):
+            if not r.success:
+                logger.warning(f"FCM rejected mobile notification '{m['title']}': {r.exception}")
+        return [r.success for r in response.responses]
+
+
+class MobileBatcher:
+    """
+    Collects mobile notifications and sends them in batches.
+
+    The first message of a batch waits up to ``window`` seconds for others
+    to join it; the batch goes out when the window ends, when it holds
+    ``max_batch`` messages or when ``flush`` is called. Each message gets a
+    Future resolving to whether it was accepted, so a batch of 500 costs
+    one request instead of 500.
+
+    The transport is any object with ``send_batch(messages)`` returning one
+    bool per message, which lets the batcher run against a fake server.
+    """
+
+    def __init__(self, transport, window=None, max_batch=None):
+        """
+        Args:
+            transport: Object sending a list of messages (see FirebaseTransport)
+            window: Seconds a batch waits to fill (default: config.NOTIFY_MOBILE_BATCH_WINDOW)
+            max_batch: Most messages per request, at most 500
+                (default: config.NOTIFY_MOBILE_BATCH_SIZE)
+        """
+        self.transport = transport
+        self.window = config.NOTIFY_MOBILE_BATCH_WINDOW if window is None else window
+        self.max_batch = min(max_batch or config.NOTIFY_MOBILE_BATCH_SIZE, FCM_MAX_BATCH)
+        self._cond = threading.Condition()
+        self._pending = []
+        self._first_at = None
+        self._flush = False
+        self._closed = False
+        self._thread = None
+        self.stats = {"batches": 0, "messages": 0, "failed": 0}
+
+    def submit(self, title, body, topic="all_users"):
+        """
+        Queue a message for the next batch
+
+        Returns:
+            Future: Resolves to True if the message was accepted, else False
+        """
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MobileBatcher is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="notify-mobile-batch", daemon=True
+                )
+                self._thread.start()
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append(({"title": title, "body": body, "topic": topic}, future))
+            self._cond.notify()
+        return future
+
+    def flush(self):
+        """Send the messages waiting now without waiting for the window"""
+        with self._cond:
+            self._flush = True
+            self._cond.notify()
+
+    def _next_batch(self):
+        """Wait until a batch is ready; returns it, or None once closed and drained"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    wait = self._first_at + self.window - time.monotonic()
+                    if wait <= 0 or self._flush or self._closed or len(self._pending) >= self.max_batch:
+                        break
+                    self._cond.wait(wait)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            if self._pending:
+                # The rest start a window of their own
+                self._first_at = time.monotonic()
+            else:
+                self._flush = False
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._send(batch)
+
+    def _send(self, batch):
+        messages = [message for message, _ in batch]
+        try:
+            results = self.transport.send_batch(messages)
+        except Exception as e:
+            logger.error(f"Failed to send batch of {len(batch)} mobile notifications: {e}")
+            results = []
+        # A short or failed response leaves the rest of the batch unsent
+        results = list(results) + [False] * (len(batch) - len(results))
+        with self._cond:
+            self.stats["batches"] += 1
+            self.stats["messages"] += len(batch)
+            self.stats["failed"] += sum(1 for ok in results if not ok)
+        for (_, future), ok in zip(batch, results):
+            future.set_result(bool(ok))
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._pending)
+        stats["avg_batch"] = round(stats["messages"] / stats["batches"], 1) if stats["batches"] else 0.0
+        return stats
+
+    def close(self):
+        """Send what is pending, then stop the batching thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread:
+            thread.join()
+
+
+# Global batcher shared by the notification services of this process
+mobile_batcher = MobileBatcher(FirebaseTransport())
@@ -1,15 +1,25 @@
 import json
 import logging
 import os
+from concurrent.futures import Future
 from datetime import datetime
 import config
 from plyer import notification
+from backend.fanout import channel_pool
+from backend.dedup import SUPPRESSED, dedup_cache
+from backend.mobile_batch import mobile_batcher
 
 logger = logging.getLogger("nikassistant.notifications")
 
+def _release_unless_sent(future, key):
+    """Done callback: drop a mobile send's dedup claim if it failed or raised"""
+    if future.cancelled() or future.exception() is not None or not future.result():
+        dedup_cache.release(key)
+
 class NotificationService:
     def __init__(self):
         self.app_name = "NikAssistant"
+        self.mobile_batcher = mobile_batcher
         self.icon_path = os.path.join(config.STATIC_DIR, "icons", "app_icon.png")
         
         # Create icon directory if it doesn't exist
@@ -39,7 +49,7 @@ class NotificationService:
             logger.error(f"Failed to initialize Firebase: {e}")
             return False
     
-    def send_desktop_notification(self, title, message, timeout=10):
+    def send_desktop_notification(self, title, message, timeout=10, dedup=True):
         """
         Send desktop notification using Plyer
         
@@ -47,7 +57,15 @@ class NotificationService:
             title (str): Notification title
             message (str): Notification message
             timeout (int): Notification timeout in seconds
+            dedup (bool): Skip repeats within the dedup TTL (see DedupCache)
+
+        Returns:
+            bool: Success status, or SUPPRESSED if skipped as a repeat
         """
+        key = dedup_cache.key("desktop", title, message)
+        if dedup and not dedup_cache.claim(key):
+            logger.debug(f"Duplicate desktop notification skipped: {title}")
+            return SUPPRESSED
         try:
             notification.notify(
                 title=title,
@@ -59,49 +77,80 @@ class NotificationService:
             logger.debug(f"Desktop notification sent: {title}")
             return True
         except Exception as e:
+            if dedup:
+                dedup_cache.release(key)
             logger.error(f"Failed to send desktop notification: {e}")
             return False
             
-    def send_mobile_notification(self, title, message, topic="all_users"):
+    def submit_mobile_notification(self, title, message, topic="all_users", dedup=True):
+        """
+        Queue a mobile notification for the next Firebase Cloud Messaging batch
+        
+        Args:
+            title (str): Notification title
+            message (str): Notification message
+            topic (str): Topic to send notification to
+            dedup (bool): Skip repeats within the dedup TTL (see DedupCache)
+            
+        Returns:
+            Future: Resolves to True once FCM accepted the notification,
+            SUPPRESSED if skipped as a repeat, else False
+        """
+        key = dedup_cache.key("mobile", title, message, topic)
+        if dedup and not dedup_cache.claim(key):
+            logger.debug(f"Duplicate mobile notification skipped: {title}")
+            future = Future()
+            future.set_result(SUPPRESSED)
+            return future
+        
+        try:
+            future = self.mobile_batcher.submit(title, message, topic)
+        except Exception:
+            if dedup:
+                dedup_cache.release(key)
+            raise
+        if dedup:
+            future.add_done_callback(lambda f: _release_unless_sent(f, key))
+        return future
+            
+    def send_mobile_notification(self, title, message, topic="all_users", dedup=True):
         """
         Send mobile notification using Firebase Cloud Messaging
         
+        The notification goes out in the next batch (see MobileBatcher), so
+        this waits up to NOTIFY_MOBILE_BATCH_WINDOW for others to join it.
+        
         Args:
             title (str): Notification title
             message (str): Notification message
             topic (str): Topic to send notification to
+            dedup (bool): Skip repeats within the dedup TTL (see DedupCache)
         """
         if not self.firebase_available:
             logger.warning("Mobile notifications unavailable - Firebase not configured")
             return False
             
         try:
-            from firebase_admin import messaging
-            
-            message_payload = messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=message,
-                ),
-                topic=topic,
-            )
-            
-            messaging.send(message_payload)
-            logger.debug(f"Mobile notification sent: {title}")
-            return True
+            future = self.submit_mobile_notification(title, message, topic, dedup)
+            ok = future.result(timeout=config.NOTIFY_CHANNEL_TIMEOUTS["mobile"])
+            if ok is True:
+                logger.debug(f"Mobile notification sent: {title}")
+            return ok
         except Exception as e:
             logger.error(f"Failed to send mobile notification: {e}")
             return False
             
     def send_notification(self, title, message):
         """
-        Send notification to all available channels
+        Send notification to all available channels at once
         
         Args:
             title (str): Notification title
             message (str): Notification message
         """
-        desktop_success = self.send_desktop_notification(title, message)
-        mobile_success = self.send_mobile_notification(title, message)
+        calls = {'desktop': lambda: self.send_desktop_notification(title, message)}
+        if self.firebase_available:
+            calls['mobile'] = lambda: self.send_mobile_notification(title, message)
+        results = channel_pool.run(calls)
         
-        return desktop_success or mobile_success
+        return any(results.values())
@@ -0,0 +1,281 @@
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import config
+
+logger = logging.getLogger("nikassistant.outbox")
+
+
+def retry_delay(attempt, base=None, cap=None, rng=random.random):
+    """
+    Seconds to wait before retry number ``attempt`` (1 for the first retry)
+
+    Exponential backoff capped at ``cap``, with jitter: a random delay
+    between half and all of the backoff, so channels that failed together
+    don't all retry at the same moment.
+    """
+    base = config.NOTIFY_RETRY_BASE_SECONDS if base is None else base
+    cap = config.NOTIFY_RETRY_MAX_SECONDS if cap is None else cap
+    backoff = min(cap, base * 2 ** (attempt - 1))
+    return backoff * (0.5 + rng() / 2)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else
+        return True
+    return True
+
+
+class NotificationOutbox:
+    """
+    Notifications waiting to be delivered, in SQLite.
+
+    Each notification is stored with one delivery row per channel; a row
+    is deleted once that channel acknowledged it, and the notification
+    once every channel did.
+
+    Rows belong to the run that added them, identified by a token made
+    fresh for every outbox (a restarted process may get the same pid, pid
+    1 in a container always does). A heartbeat thread renews the run's
+    lease in the ``owners`` table. ``recover`` takes over the rows of runs
+    whose lease expired, that closed, or that were on this host under a
+    pid that is gone or is now ours, so a crash or restart resends what
+    was not delivered instead of losing it. Open one outbox per process
+    and database file.
+
+    ``add`` commits right away. Acknowledgements and retries are buffered
+    and written by ``commit`` in one transaction, once per batch of sends;
+    a crash before that commit resends the batch (at-least-once delivery).
+    """
+
+    def __init__(self, db_path=None, lease_seconds=None, clock=time.time):
+        """
+        Args:
+            db_path: SQLite file (default: config.NOTIFY_OUTBOX_DB)
+            lease_seconds: How long rows stay ours without a heartbeat
+                (default: config.NOTIFY_OUTBOX_LEASE_SECONDS)
+            clock: Callable returning epoch seconds
+        """
+        self.db_path = str(db_path or config.NOTIFY_OUTBOX_DB)
+        self.lease_seconds = lease_seconds or config.NOTIFY_OUTBOX_LEASE_SECONDS
+        self.clock = clock
+        # Never all digits, so old databases' INTEGER owner column keeps it as text
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self.host = socket.gethostname()
+        self._lock = threading.RLock()
+        self._acks = []
+        self._retries = []
+        self.conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    owner TEXT NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS owners (
+                    owner TEXT PRIMARY KEY,
+                    host TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    heartbeat REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS deliveries (
+                    message_id INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL,
+                    PRIMARY KEY (message_id, channel)
+                )
+                """
+            )
+        self.heartbeat()
+        self._stopped = threading.Event()
+        self._heartbeats = threading.Thread(
+            target=self._heartbeat_loop, name="outbox-heartbeat", daemon=True
+        )
+        self._heartbeats.start()
+
+    @contextmanager
+    def _transaction(self, immediate=False):
+        """
+        Run the enclosed statements as a single transaction
+
+        ``immediate`` takes the write lock up front, for transactions that
+        read rows and then update them.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self):
+        """Renew this run's lease on its notifications"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO owners (owner, host, pid, heartbeat) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(owner) DO UPDATE SET heartbeat=excluded.heartbeat",
+                (self.owner, self.host, os.getpid(), self.clock()),
+            )
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"Outbox heartbeat failed: {e}")
+
+    def _owner_gone(self, host, pid, heartbeat, now):
+        """Whether a run that owns rows can no longer deliver them"""
+        if heartbeat is None or now - heartbeat > self.lease_seconds:
+            # Closed (or from before leases), or stopped renewing
+            return True
+        return host == self.host and (pid == os.getpid() or not _pid_alive(pid))
+
+    def add(self, notification, channels):
+        """
+        Store a notification until each of ``channels`` acknowledged it
+
+        Returns:
+            int: The notification's outbox id
+        """
+        payload = json.dumps(notification, default=str)
+        run_at = notification.get("scheduled_time", 0)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO messages (payload, owner) VALUES (?, ?)", (payload, self.owner)
+            )
+            message_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO deliveries (message_id, channel, next_attempt) VALUES (?, ?, ?)",
+                [(message_id, channel, run_at) for channel in channels],
+            )
+        return message_id
+
+    def ack(self, message_id, channel):
+        """Mark a channel delivered (or given up); written by the next ``commit``"""
+        with self._lock:
+            self._acks.append((message_id, channel))
+
+    def retry(self, message_id, channel, attempts, next_attempt):
+        """Record a failed attempt and when to try again; written by the next ``commit``"""
+        with self._lock:
+            self._retries.append((attempts, next_attempt, message_id, channel))
+
+    def commit(self):
+        """Write buffered acknowledgements and retries in one transaction"""
+        with self._lock:
+            if not self._acks and not self._retries:
+                return
+            acks, self._acks = self._acks, []
+            retries, self._retries = self._retries, []
+            with self._transaction() as conn:
+                conn.executemany(
+                    "UPDATE deliveries SET attempts = ?, next_attempt = ? "
+                    "WHERE message_id = ? AND channel = ?",
+                    retries,
+                )
+                conn.executemany(
+                    "DELETE FROM deliveries WHERE message_id = ? AND channel = ?", acks
+                )
+                conn.executemany(
+                    "DELETE FROM messages WHERE id = ? AND NOT EXISTS "
+                    "(SELECT 1 FROM deliveries WHERE message_id = ?)",
+                    [(message_id, message_id) for message_id in {a[0] for a in acks}],
+                )
+
+    def recover(self):
+        """
+        Take over undelivered notifications of runs that are gone
+
+        Called at startup and then periodically, for runs whose lease
+        expires later.
+
+        Returns:
+            list: Notifications with ``outbox_id``, ``attempts`` (per channel),
+            the channel flags of the undelivered channels and
+            ``scheduled_time`` of their next attempt
+        """
+        now = self.clock()
+        with self._transaction(immediate=True) as conn:
+            owners = conn.execute(
+                "SELECT DISTINCT m.owner, o.host, o.pid, o.heartbeat "
+                "FROM messages m LEFT JOIN owners o ON o.owner = m.owner "
+                "WHERE m.owner != ?",
+                (self.owner,),
+            ).fetchall()
+            rows = []
+            for owner, host, pid, heartbeat in owners:
+                if not self._owner_gone(host, pid, heartbeat, now):
+                    continue
+                rows += conn.execute(
+                    "SELECT m.id, m.payload, d.channel, d.attempts, d.next_attempt "
+                    "FROM messages m JOIN deliveries d ON d.message_id = m.id "
+                    "WHERE m.owner = ? ORDER BY m.id",
+                    (owner,),
+                ).fetchall()
+                conn.execute(
+                    "UPDATE messages SET owner = ? WHERE owner = ?", (self.owner, owner)
+                )
+                conn.execute("DELETE FROM owners WHERE owner = ?", (owner,))
+            conn.execute(
+                "DELETE FROM owners WHERE heartbeat < ?", (now - self.lease_seconds,)
+            )
+        recovered = {}
+        for message_id, payload, channel, attempts, next_attempt in rows:
+            notification = recovered.get(message_id)
+            if notification is None:
+                notification = json.loads(payload)
+                notification.update(desktop=False, email=False, mobile=False)
+                notification["outbox_id"] = message_id
+                notification["attempts"] = {}
+                notification["scheduled_time"] = next_attempt
+                recovered[message_id] = notification
+            notification[channel] = True
+            notification["attempts"][channel] = attempts
+            notification["scheduled_time"] = min(notification["scheduled_time"], next_attempt)
+        if recovered:
+            logger.info(f"Recovered {len(recovered)} undelivered notifications from the outbox")
+        return list(recovered.values())
+
+    def count(self):
+        """Number of channel deliveries still pending"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM deliveries").fetchone()[0]
+
+    def close(self):
+        """Stop the heartbeat and give up the lease, leaving undelivered rows to the next run"""
+        self._stopped.set()
+        self._heartbeats.join()
+        with self._lock:
+            self.commit()
+            self.conn.execute("DELETE FROM owners WHERE owner = ?", (self.owner,))
+            self.conn.close()
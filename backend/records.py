@@ -0,0 +1,424 @@
+import json
+import sys
+from array import array
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+MICROS_PER_DAY = 86_400_000_000
+
+# Date string layouts found in tasks.json/notes.json. A timestamp is stored
+# as epoch microseconds plus the index of its layout so it formats back to
+# exactly the original string.
+TIMESTAMP_FORMATS = [
+    None,
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d %H:%M",
+]
+_FORMATS_BY_SHAPE = {
+    (10, ""): 1,
+    (19, " "): 2,
+    (19, "T"): 3,
+    (26, "T"): 4,
+    (26, " "): 5,
+    (16, "T"): 6,
+    (16, " "): 7,
+}
+
+
+# isoformat() arguments producing each layout (the date-only one aside);
+# much faster than strftime when packing hundreds of thousands of rows
+_ISOFORMAT_ARGS = {
+    2: (" ", "seconds"),
+    3: ("T", "seconds"),
+    4: ("T", "microseconds"),
+    5: (" ", "microseconds"),
+    6: ("T", "minutes"),
+    7: (" ", "minutes"),
+}
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _format(dt, code):
+    """``dt.strftime(TIMESTAMP_FORMATS[code])``"""
+    if code == 1:
+        return dt.date().isoformat()
+    return dt.isoformat(*_ISOFORMAT_ARGS[code])
+
+
+def encode_timestamp(value):
+    """
+    Encode a date string as (epoch microseconds, format code)
+
+    Returns None when the string does not round-trip exactly, in which case
+    the caller keeps the original value.
+    """
+    if not isinstance(value, str):
+        return None
+    code = _FORMATS_BY_SHAPE.get((len(value), value[10:11]))
+    if code is None:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None or _format(dt, code) != value:
+        return None
+    return (dt - EPOCH) // _MICROSECOND, code
+
+
+def decode_timestamp(micros, code):
+    return _format(EPOCH + timedelta(microseconds=micros), code)
+
+
+def to_epoch_micros(day):
+    """Epoch microseconds at midnight of a YYYY-MM-DD string or date"""
+    if isinstance(day, str):
+        day = datetime.fromisoformat(day[:10])
+    elif not isinstance(day, datetime):
+        day = datetime(day.year, day.month, day.day)
+    return (day - EPOCH) // timedelta(microseconds=1)
+
+
+class IntColumn:
+    def __init__(self):
+        self.values = array("q")
+
+    def encode(self, value):
+        if isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63:
+            return value
+        return None
+
+    def append(self, value):
+        self.values.append(0 if value is None else value)
+
+    def get(self, i):
+        return self.values[i]
+
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+
+class BoolColumn(IntColumn):
+    def __init__(self):
+        self.values = bytearray()
+
+    def encode(self, value):
+        return int(value) if isinstance(value, bool) else None
+
+    def get(self, i):
+        return bool(self.values[i])
+
+    def nbytes(self):
+        return len(self.values)
+
+
+class EnumColumn:
+    """Small vocabularies (priority, category) stored as one byte per row"""
+
+    def __init__(self):
+        self.values = bytearray()
+        self.vocabulary = [None]
+        self._codes = {}
+
+    def encode(self, value):
+        if not isinstance(value, str):
+            return None
+        code = self._codes.get(value)
+        if code is None:
+            if len(self.vocabulary) > 255:
+                return None
+            code = self._codes[value] = len(self.vocabulary)
+            self.vocabulary.append(sys.intern(value))
+        return code
+
+    def append(self, value):
+        self.values.append(0 if value is None else value)
+
+    def get(self, i):
+        return self.vocabulary[self.values[i]]
+
+    def nbytes(self):
+        return len(self.values)
+
+
+class TextColumn:
+    """UTF-8 strings packed into one buffer with an offsets array"""
+
+    def __init__(self):
+        self.data = bytearray()
+        # 32-bit offsets: a table holds at most 4 GiB of text
+        self.offsets = array("I", [0])
+
+    def encode(self, value):
+        return value.encode("utf-8") if isinstance(value, str) else None
+
+    def append(self, value):
+        if value is not None:
+            self.data += value
+        self.offsets.append(len(self.data))
+
+    def get(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def nbytes(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class TimestampColumn:
+    """Dates as int64 epoch microseconds, vectorizable through ``micros``"""
+
+    def __init__(self):
+        self.values = array("q")
+        self.formats = bytearray()
+
+    def encode(self, value):
+        return encode_timestamp(value)
+
+    def append(self, value):
+        micros, code = value if value is not None else (0, 0)
+        self.values.append(micros)
+        self.formats.append(code)
+
+    def get(self, i):
+        return decode_timestamp(self.values[i], self.formats[i])
+
+    def micros(self):
+        return np.frombuffer(self.values, dtype=np.int64)
+
+    def nbytes(self):
+        return self.values.itemsize * len(self.values) + len(self.formats)
+
+
+class RecordTable:
+    """
+    Column-oriented, array-backed storage for many records.
+
+    Each known field lives in a typed column; a per-row bitmask says which
+    fields were present. Values that don't fit their column's type, and
+    keys outside the schema, are kept verbatim in a per-row JSON "extra"
+    column. ``row(i)`` therefore rebuilds exactly the dict that went in,
+    so the table round-trips to the JSON schema used by the stores.
+    """
+
+    schema = {}
+
+    def __init__(self, records=()):
+        self.columns = {name: column_type() for name, column_type in self.schema.items()}
+        self._bits = {name: 1 << i for i, name in enumerate(self.schema)}
+        self.present = array("I")
+        self.extra = TextColumn()
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.present)
+
+    def append(self, record):
+        """Add a record; returns its row number"""
+        # Encode everything before touching a column, so a value that fails
+        # to encode leaves the table as it was
+        mask = 0
+        encoded = {}
+        extra = {}
+        for name, value in record.items():
+            column = self.columns.get(name)
+            value_code = column.encode(value) if column is not None else None
+            if value_code is None:
+                extra[name] = value
+            else:
+                mask |= self._bits[name]
+                encoded[name] = value_code
+        # Remember key order only when it differs from the schema's
+        order = list(record)
+        if extra or order != [name for name in self.schema if name in record]:
+            extra["__order__"] = order
+        extra_text = self.extra.encode(json.dumps(extra)) if extra else None
+        for name, column in self.columns.items():
+            column.append(encoded.get(name))
+        self.present.append(mask)
+        self.extra.append(extra_text)
+        return len(self.present) - 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def row(self, i):
+        mask = self.present[i]
+        record = {
+            name: column.get(i)
+            for name, column in self.columns.items()
+            if mask & self._bits[name]
+        }
+        extra_text = self.extra.get(i)
+        if extra_text:
+            extra = json.loads(extra_text)
+            order = extra.pop("__order__", None)
+            record.update(extra)
+            if order:
+                record = {key: record[key] for key in order}
+        return record
+
+    def __iter__(self):
+        return (self.row(i) for i in range(len(self)))
+
+    def has(self, name):
+        """Boolean numpy mask of rows where ``name`` was stored in its column"""
+        present = np.frombuffer(self.present, dtype=np.uint32)
+        return (present & self._bits[name]) != 0
+
+    def nbytes(self):
+        """Approximate memory held by the column buffers"""
+        return (
+            sum(column.nbytes() for column in self.columns.values())
+            + self.present.itemsize * len(self.present)
+            + self.extra.nbytes()
+        )
+
+
+class TaskTable(RecordTable):
+    """Columnar task storage for large archives, with vectorized date queries"""
+
+    schema = {
+        "id": IntColumn,
+        "title": TextColumn,
+        "description": TextColumn,
+        "priority": EnumColumn,
+        "category": EnumColumn,
+        "due_date": TimestampColumn,
+        "completed": BoolColumn,
+        "created_at": TimestampColumn,
+        "completed_at": TimestampColumn,
+    }
+
+    def completed_mask(self):
+        completed = np.frombuffer(self.columns["completed"].values, dtype=np.uint8)
+        return completed.astype(bool) & self.has("completed")
+
+    def due_before_mask(self, day):
+        """Rows with a due date before ``day`` (YYYY-MM-DD or date)"""
+        due = self.columns["due_date"].micros()
+        return self.has("due_date") & (due < to_epoch_micros(day))
+
+    def due_between_mask(self, start_day, end_day):
+        """Rows due from ``start_day`` to ``end_day`` inclusive"""
+        due = self.columns["due_date"].micros()
+        start = to_epoch_micros(start_day)
+        end = to_epoch_micros(end_day) + MICROS_PER_DAY
+        return self.has("due_date") & (due >= start) & (due < end)
+
+    def overdue_mask(self, today):
+        """Open rows due before ``today``"""
+        return self.due_before_mask(today) & ~self.completed_mask()
+
+    def rows(self, mask):
+        return [self.row(i) for i in np.flatnonzero(mask)]
+
+
+
+class PackedRecords(MutableMapping):
+    """
+    Key -> record mapping that keeps cold records packed in a RecordTable.
+
+    Records ``should_pack`` accepts (for tasks: completed ones) are stored
+    as a row of ``table`` and decoded into a new dict on every access;
+    the rest stay plain dicts. Storing a record again (e.g. after an
+    update) packs it into a new row, or unpacks it if it no longer
+    qualifies; replaced and deleted rows are dropped from the table once
+    they outnumber the live ones. Keys keep their insertion order.
+
+    Since packed records are copies, change them only by storing them
+    back, as ``RecordCollection`` does.
+    """
+
+    def __init__(self, table_type, should_pack, records=()):
+        self.table_type = table_type
+        self.should_pack = should_pack
+        self.table = table_type()
+        self.live = bytearray()
+        self.dead = 0
+        self._slots = {}
+        self.update(records)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __getitem__(self, key):
+        slot = self._slots[key]
+        return self.table.row(slot) if type(slot) is int else slot
+
+    def get(self, key, default=None):
+        slot = self._slots.get(key)
+        if slot is None:
+            return default
+        return self.table.row(slot) if type(slot) is int else slot
+
+    def __setitem__(self, key, record):
+        self._kill(self._slots.get(key))
+        self._slots[key] = self._pack(record)
+        self._compact_if_sparse()
+
+    def __delitem__(self, key):
+        self._kill(self._slots.pop(key))
+        self._compact_if_sparse()
+
+    def pop(self, key, *default):
+        # MutableMapping.pop would decode a packed record twice
+        if key not in self._slots and default:
+            return default[0]
+        record = self[key]
+        del self[key]
+        return record
+
+    def _pack(self, record):
+        if not self.should_pack(record):
+            return record
+        try:
+            row = self.table.append(record)
+        except (TypeError, ValueError, OverflowError):
+            # Not JSON serializable, a string UTF-8 can't encode, or a
+            # value or text too large for its column
+            return record
+        self.live.append(1)
+        return row
+
+    def _kill(self, slot):
+        if type(slot) is int:
+            self.live[slot] = 0
+            self.dead += 1
+
+    @property
+    def packed(self):
+        """Number of records stored in the table"""
+        return len(self.live) - self.dead
+
+    def _compact_if_sparse(self):
+        if self.dead < 1024 or self.dead * 2 < len(self.live):
+            return
+        table = self.table_type()
+        for key, slot in self._slots.items():
+            if type(slot) is int:
+                self._slots[key] = table.append(self.table.row(slot))
+        self.table = table
+        self.live = bytearray(b"\x01") * len(table)
+        self.dead = 0
+
+    def live_mask(self):
+        """Boolean numpy mask of the table rows still in use"""
+        return np.frombuffer(self.live, dtype=np.uint8).astype(bool)
+
+    def nbytes(self):
+        """Approximate memory held by the table"""
+        return self.table.nbytes() + len(self.live)
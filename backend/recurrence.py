@@ -0,0 +1,104 @@
+import logging
+import re
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from itertools import islice, takewhile
+from dateutil.rrule import rrulestr
+
+logger = logging.getLogger("nikassistant.recurrence")
+
+# Task reminders are at most hourly; finer rules would expand to thousands
+# of occurrences per day
+SUB_HOURLY = {"MINUTELY", "SECONDLY"}
+# Occurrences one task may contribute to a single query, for rules that
+# predate the check above or were written to the store directly
+MAX_OCCURRENCES = 1000
+
+
+def is_recurring(task):
+    """Whether a task repeats: it has an RRULE and a first due date"""
+    return bool(task.get("rrule")) and bool(task.get("due_date"))
+
+
+@lru_cache(maxsize=1024)
+def _rule(rrule, dtstart):
+    return rrulestr(rrule, dtstart=datetime.fromisoformat(dtstart))
+
+
+def task_rule(task):
+    """
+    The parsed recurrence of a task
+
+    ``rrule`` holds an RFC 5545 rule (e.g. ``FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;BYHOUR=9``)
+    and ``due_date`` is its first occurrence (DTSTART). Parsed rules are
+    cached, so repeated queries only pay for iterating occurrences.
+
+    Raises:
+        ValueError: If the rule or the due date is invalid
+    """
+    return _rule(task["rrule"], task["due_date"])
+
+
+def validate_rrule(rrule, due_date):
+    """Why ``rrule`` can't be used with ``due_date``, or None if it can"""
+    if not isinstance(rrule, str) or not due_date:
+        return "rrule must be a string and needs a due_date"
+    try:
+        _rule(rrule, due_date)
+    except (ValueError, TypeError) as e:
+        return f"invalid rrule: {e}"
+    if SUB_HOURLY & set(re.findall(r"FREQ=(\w+)", rrule.upper())):
+        return "rrule must not repeat more often than hourly"
+    return None
+
+
+def next_occurrence(task, after):
+    """First occurrence strictly after ``after``, or None if the rule has ended"""
+    return task_rule(task).after(after)
+
+
+def format_occurrence(task, moment):
+    """An occurrence in the style of the task's own due date"""
+    if len(task["due_date"]) == 10 and moment.time() == time():
+        return moment.date().isoformat()
+    return moment.isoformat()
+
+
+def _occurrence(task, moment):
+    return {**task, "due_date": format_occurrence(task, moment), "occurrence_of": task["id"]}
+
+
+def first_occurrence_from(task, start_day):
+    """The first occurrence due on or after ``start_day`` (as ``expand`` makes them), or None"""
+    try:
+        moment = task_rule(task).after(datetime.fromisoformat(start_day), inc=True)
+    except (ValueError, TypeError):
+        return None
+    return None if moment is None else _occurrence(task, moment)
+
+
+def expand(task, start_day, end_day):
+    """
+    Occurrences of a recurring task due from ``start_day`` to ``end_day``
+    inclusive (YYYY-MM-DD)
+
+    Each occurrence is a copy of the task with that occurrence's
+    ``due_date`` and ``occurrence_of`` set to the task's id; only the
+    occurrences inside the window are generated, at most ``MAX_OCCURRENCES``.
+    """
+    start = datetime.fromisoformat(start_day)
+    end = datetime.fromisoformat(end_day) + timedelta(days=1) - timedelta(microseconds=1)
+    try:
+        moments = list(islice(
+            takewhile(lambda moment: moment <= end, task_rule(task).xafter(start, inc=True)),
+            MAX_OCCURRENCES + 1,
+        ))
+    except (ValueError, TypeError):
+        return []
+    if len(moments) > MAX_OCCURRENCES:
+        logger.warning(
+            f"Task {task['id']} has more than {MAX_OCCURRENCES} occurrences "
+            f"from {start_day} to {end_day}; showing the first {MAX_OCCURRENCES}"
+        )
+        del moments[MAX_OCCURRENCES:]
+    return [_occurrence(task, moment) for moment in moments]
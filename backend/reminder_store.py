@@ -0,0 +1,311 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import config
+
+logger = logging.getLogger("nikassistant.reminder_store")
+
+# A reminder moved to a new time is a new reminder: it is no longer claimed
+UPSERT_SQL = (
+    "INSERT INTO reminders (user_id, task_id, run_at, fingerprint) "
+    "VALUES (?, ?, ?, ?) ON CONFLICT(user_id, task_id) DO UPDATE SET "
+    "claimed_at=CASE WHEN run_at = excluded.run_at THEN claimed_at END, "
+    "run_at=excluded.run_at, fingerprint=excluded.fingerprint"
+)
+
+
+class ReminderStore:
+    """
+    Pending task reminders in SQLite, one row per task.
+
+    Rows survive restarts, so nothing has to be rescheduled on startup:
+    the pump only needs the earliest ``run_at``, which the index answers
+    directly. Each row also keeps the fingerprint of the task it was
+    scheduled from, letting the scheduler diff tasks against what is
+    already stored instead of rewriting every reminder.
+
+    Delivery claims due rows (``claimed_at``) rather than deleting them;
+    they are only deleted by ``ack`` once delivered, so a reminder is
+    never lost to a crash or a failed send.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = str(db_path or config.REMINDERS_DB)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS reminders (
+                    user_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    run_at REAL NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    claimed_at REAL,
+                    PRIMARY KEY (user_id, task_id)
+                )
+                """
+            )
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(reminders)")]
+            if "claimed_at" not in columns:
+                self.conn.execute("ALTER TABLE reminders ADD COLUMN claimed_at REAL")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reminders_run_at ON reminders (run_at)"
+            )
+
+    @contextmanager
+    def _transaction(self, immediate=False):
+        """
+        Run the enclosed statements as a single transaction
+
+        ``immediate`` takes the write lock up front, for transactions that
+        read rows and then update them.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def upsert(self, user_id, task_id, run_at, fingerprint):
+        """Set a task's reminder to fire at epoch second ``run_at``"""
+        with self._lock:
+            self.conn.execute(UPSERT_SQL, (user_id, str(task_id), run_at, fingerprint))
+
+    def delete(self, user_id, task_id):
+        """Drop a task's reminder; returns whether there was one"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM reminders WHERE user_id = ? AND task_id = ?",
+                (user_id, str(task_id)),
+            )
+        return cursor.rowcount > 0
+
+    def apply(self, rows):
+        """
+        Write many reminders in one transaction
+
+        Args:
+            rows: Mapping of ``(user_id, task_id)`` to ``(run_at, fingerprint)``,
+                or to None to delete that reminder
+        """
+        upserts = [(u, t, *row) for (u, t), row in rows.items() if row is not None]
+        deletes = [key for key, row in rows.items() if row is None]
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM reminders WHERE user_id = ? AND task_id = ?", deletes
+            )
+            conn.executemany(UPSERT_SQL, upserts)
+
+    def fingerprints(self, user_id):
+        """Map of task id to the fingerprint its stored reminder came from"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT task_id, fingerprint FROM reminders WHERE user_id = ?",
+                (user_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def next_run_at(self):
+        """Earliest pending ``run_at``, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MIN(run_at) FROM reminders WHERE claimed_at IS NULL"
+            ).fetchone()
+        return row[0]
+
+    def claim_due(self, now):
+        """
+        Claim every unclaimed reminder due at or before ``now`` for delivery
+
+        Returns:
+            list: ``(user_id, task_id, run_at)`` tuples, oldest first
+        """
+        with self._transaction(immediate=True) as conn:
+            rows = conn.execute(
+                "SELECT user_id, task_id, run_at FROM reminders "
+                "WHERE run_at <= ? AND claimed_at IS NULL ORDER BY run_at",
+                (now,),
+            ).fetchall()
+            conn.execute(
+                "UPDATE reminders SET claimed_at = ? "
+                "WHERE run_at <= ? AND claimed_at IS NULL",
+                (now, now),
+            )
+        return rows
+
+    def ack(self, rows):
+        """Delete delivered reminders, unless they were rescheduled meanwhile"""
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM reminders WHERE user_id = ? AND task_id = ? "
+                "AND run_at = ? AND claimed_at IS NOT NULL",
+                rows,
+            )
+
+    def release(self, rows):
+        """Unclaim reminders whose delivery failed, so they are tried again"""
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE reminders SET claimed_at = NULL "
+                "WHERE user_id = ? AND task_id = ? AND run_at = ?",
+                rows,
+            )
+
+    def release_claimed(self):
+        """
+        Unclaim every claimed reminder, e.g. ones a stopped process was delivering
+
+        Returns:
+            int: How many there were
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE reminders SET claimed_at = NULL WHERE claimed_at IS NOT NULL"
+            )
+        return cursor.rowcount
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class ReminderPump:
+    """
+    Thread that delivers reminders from a ReminderStore when they come due.
+
+    It sleeps until the store's earliest ``run_at`` and hands everything
+    due to ``deliver(rows, missed)`` in one call. The rows are claimed
+    first and only deleted once ``deliver`` returns; if it raises they are
+    released and retried after a growing pause, so delivery is at least
+    once. ``recover`` handles the reminders that came due while the
+    process was down, including ones a previous run claimed but never
+    acknowledged: those within ``misfire_grace`` seconds are delivered
+    together, older ones are dropped. ``clock`` returns epoch seconds and can be replaced in tests,
+    which then drive ``run_pending`` directly instead of starting the thread.
+
+    Other worker processes write to the same store without being able to
+    ``wake`` the pump, so it never sleeps longer than ``poll_interval``.
+    """
+
+    def __init__(self, store, deliver, clock=time.time, misfire_grace=None, poll_interval=None):
+        self.store = store
+        self.deliver = deliver
+        self.clock = clock
+        self.misfire_grace = (
+            config.REMINDER_MISFIRE_GRACE_SECONDS if misfire_grace is None else misfire_grace
+        )
+        self.poll_interval = poll_interval or config.SCHEDULER_SYNC_SECONDS
+        self._cond = threading.Condition()
+        self._running = False
+        self.thread = None
+        self._failures = 0
+        self.stats = {"delivered": 0, "missed_delivered": 0, "missed_dropped": 0, "failed": 0}
+
+    def wake(self):
+        """Re-check the next due time, e.g. after an earlier reminder was added"""
+        with self._cond:
+            self._cond.notify()
+
+    def _deliver(self, rows, missed):
+        """
+        Hand claimed rows to ``deliver``, deleting them only once it returns
+
+        ``deliver`` may return rows it handed on to be sent later (see
+        ReminderDispatcher); those stay claimed until whoever sends them
+        acks or releases them.
+        """
+        try:
+            handed_on = self.deliver(rows, missed)
+        except BaseException:
+            self.stats["failed"] += len(rows)
+            self.store.release(rows)
+            raise
+        if handed_on:
+            handed_on = set(handed_on)
+            rows = [row for row in rows if row not in handed_on]
+        self.store.ack(rows)
+
+    def recover(self):
+        """Deliver reminders missed while stopped, within the misfire grace time"""
+        released = self.store.release_claimed()
+        if released:
+            logger.warning(f"Delivering {released} reminders again, a previous run never finished them")
+        now = self.clock()
+        rows = self.store.claim_due(now)
+        if not rows:
+            return 0
+        recent = [row for row in rows if now - row[2] <= self.misfire_grace]
+        stale = [row for row in rows if now - row[2] > self.misfire_grace]
+        if stale:
+            self.store.ack(stale)
+            self.stats["missed_dropped"] += len(stale)
+            logger.warning(f"Dropped {len(stale)} reminders missed by more than {self.misfire_grace}s")
+        if recent:
+            self._deliver(recent, True)
+            self.stats["missed_delivered"] += len(recent)
+        return len(recent)
+
+    def run_pending(self):
+        """Deliver every reminder due now; returns how many there were"""
+        rows = self.store.claim_due(self.clock())
+        if rows:
+            self._deliver(rows, False)
+            self.stats["delivered"] += len(rows)
+        return len(rows)
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        try:
+            self.recover()
+        except Exception as e:
+            # The rows were released; the thread retries them as they are due
+            logger.error(f"Error delivering missed reminders: {e}")
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                next_run_at = self.store.next_run_at()
+                delay = self.poll_interval
+                if next_run_at is not None:
+                    delay = min(delay, next_run_at - self.clock())
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            try:
+                self.run_pending()
+                self._failures = 0
+            except Exception as e:
+                self._failures += 1
+                retry_in = min(self.poll_interval, 2 ** self._failures)
+                logger.error(f"Error delivering reminders, retrying in {retry_in}s: {e}")
+                with self._cond:
+                    if self._running:
+                        self._cond.wait(retry_in)
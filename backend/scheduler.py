@@ -1,26 +1,257 @@
 import json
 import uuid
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 import config
 from backend.email_service import EmailService
 from backend.notification_service import NotificationService
+from backend.shards import shards
+from backend.task_index import is_open_task
+from backend.due_timer import DueTimer, due_timestamp
+from backend.reminder_store import ReminderStore, ReminderPump
+from backend.dispatch import ReminderDispatcher
+from backend.fanout import channel_pool
+from backend.recurrence import is_recurring, next_occurrence, format_occurrence
 
 logger = logging.getLogger("nikassistant.scheduler")
 
+def deliver_task_reminder(task, notification_service, email_service):
+    """
+    Send a reminder notification (and email, if enabled) for a task
+
+    A plain function so dispatch worker processes can send with their own
+    services.
+
+    Returns:
+        bool: Whether the reminder went out on at least one channel
+    """
+    try:
+        task_title = task.get('title', 'Untitled Task')
+        due_date_str = task.get('due_date', 'Unknown')
+        due_date = datetime.fromisoformat(due_date_str)
+        
+        # Format the time nicely
+        due_time = due_date.strftime('%I:%M %p')
+        
+        # Send email reminder if email is enabled for this task, alongside
+        # the desktop notification
+        email = None
+        if task.get('email_reminder', False) and config.EMAIL_USER:
+            started = time.monotonic()
+            email = channel_pool.submit(
+                'email',
+                email_service.send_email,
+                subject=f"Reminder: {task_title}",
+                body=f"""
+                <h2>Task Reminder</h2>
+                <p>Your task <strong>{task_title}</strong> is due at {due_time}.</p>
+                <p>Priority: {task.get('priority', 'Medium')}</p>
+                <p>Category: {task.get('category', 'General')}</p>
+                <p>Description: {task.get('description', '')}</p>
+                <hr>
+                <p>This is an automated reminder from NikAssistant.</p>
+                """
+            )
+        
+        # Send desktop notification
+        message = f"Task '{task_title}' is due at {due_time}"
+        sent = notification_service.send_notification(
+            title="Task Reminder",
+            message=message
+        )
+        
+        if email is not None and channel_pool.result('email', email, started):
+            logger.info(f"Sent email reminder for task '{task_title}'")
+            sent = True
+        return bool(sent)
+    except Exception as e:
+        logger.error(f"Error sending task reminder: {e}")
+        return False
+
+
+class ReminderSync:
+    """
+    Keeps one user's stored reminders in step with their tasks.
+
+    Subscribed to the user's task collection, it keeps a fingerprint of
+    (due_date, reminder, status) per task, starting from the fingerprints
+    saved with the stored reminders. A change only touches the reminder of
+    the task whose fingerprint changed, and a reload (including the first
+    one after a restart) diffs the whole set instead of rescheduling
+    everything.
+    """
+
+    def __init__(self, task_scheduler, user_id):
+        self.task_scheduler = task_scheduler
+        self.user_id = user_id
+        self.fingerprints = task_scheduler.reminders.fingerprints(user_id)
+
+    @staticmethod
+    def fingerprint(task):
+        """What the reminder depends on; None if no reminder is due"""
+        if task is None or not is_open_task(task):
+            return None
+        if not task.get('reminder') or not task.get('due_date'):
+            return None
+        fingerprint = [task.get('due_date'), task.get('reminder'), task.get('status')]
+        if task.get('rrule'):
+            fingerprint.append(task['rrule'])
+        return json.dumps(fingerprint)
+
+    def on_reload(self, records):
+        with self.task_scheduler.batched_reminders():
+            seen = set()
+            for task in records:
+                key = str(task['id'])
+                seen.add(key)
+                self._sync(key, task)
+            for key in [key for key in self.fingerprints if key not in seen]:
+                self._sync(key, None)
+
+    def on_change(self, old, new):
+        self._sync(str((new or old)['id']), new)
+
+    def _sync(self, key, task):
+        fingerprint = self.fingerprint(task)
+        previous = self.fingerprints.get(key)
+        if fingerprint == previous:
+            return
+        stats = self.task_scheduler.reminder_stats
+        if fingerprint is None:
+            del self.fingerprints[key]
+            self.task_scheduler.unschedule_task_reminder(key, self.user_id)
+            stats['removed'] += 1
+        else:
+            self.fingerprints[key] = fingerprint
+            self.task_scheduler.schedule_task_reminder(task, self.user_id, fingerprint)
+            stats['modified' if previous else 'added'] += 1
+
+
+class DueWatch:
+    """
+    Feeds one user's open, dated tasks into the scheduler's DueTimer.
+
+    Keeps the due date it last scheduled per task, so a change costs one
+    heap operation and a reload only touches tasks whose due date changed.
+    Deadlines at or before ``since`` are left to the timer: when a shard is
+    loaded again after an eviction, those already fired or are still queued.
+    """
+
+    def __init__(self, timer, user_id, since=None):
+        self.timer = timer
+        self.user_id = user_id
+        self.since = since
+        self.due_dates = {}
+
+    @staticmethod
+    def due_date(task):
+        # A recurring task is never overdue: its next occurrence takes over
+        if task is None or not is_open_task(task) or is_recurring(task):
+            return None
+        return task.get('due_date') or None
+
+    def on_reload(self, records):
+        seen = set()
+        for task in records:
+            key = str(task['id'])
+            seen.add(key)
+            self._sync(key, task)
+        for key in [key for key in self.due_dates if key not in seen]:
+            self._sync(key, None)
+
+    def on_change(self, old, new):
+        self._sync(str((new or old)['id']), new)
+
+    def _sync(self, key, task):
+        due_date = self.due_date(task)
+        if due_date == self.due_dates.get(key):
+            return
+        if due_date is None:
+            del self.due_dates[key]
+            self.timer.cancel((self.user_id, key))
+            return
+        self.due_dates[key] = due_date
+        try:
+            due = due_timestamp(due_date)
+        except ValueError:
+            logger.warning(f"Ignoring task {key} with invalid due date {due_date!r}")
+            return
+        if self.since is None or due > self.since:
+            self.timer.schedule((self.user_id, key), due)
+
+
 class TaskScheduler:
-    def __init__(self):
-        self.scheduler = BackgroundScheduler()
-        self.email_service = EmailService()
-        self.notification_service = NotificationService()
+    def __init__(self, clock=None, reminder_store=None, email_service=None,
+                 notification_service=None):
+        """
+        Args:
+            clock: Callable returning the current datetime (default:
+                datetime.now); see backend.simulation.VirtualClock
+            reminder_store: ReminderStore to use (default: config.REMINDERS_DB)
+            email_service: EmailService to send through (default: a new one)
+            notification_service: NotificationService to send through
+                (default: a new one)
+        """
+        self.clock = clock or datetime.now
+        self.scheduler = BackgroundScheduler(
+            job_defaults={
+                'misfire_grace_time': config.REMINDER_MISFIRE_GRACE_SECONDS,
+                'coalesce': config.REMINDER_COALESCE,
+            }
+        )
+        self.email_service = email_service or EmailService()
+        self.notification_service = notification_service or NotificationService()
+        self.reminder_stats = {'added': 0, 'modified': 0, 'removed': 0}
+        self.reminders = reminder_store or ReminderStore()
+        self.reminder_pump = ReminderPump(
+            self.reminders, self._deliver_reminders, clock=self._timestamp
+        )
+        # Only fed on the leader, the one process that fires it
+        self.due_timer = DueTimer(
+            self._on_tasks_due, clock=self._timestamp, window=config.OVERDUE_BATCH_SECONDS
+        )
+        # Reminders are sent from worker processes once the scheduler starts
+        self.dispatcher = (
+            ReminderDispatcher(on_done=self._on_dispatched) if config.DISPATCH_WORKERS else None
+        )
+        self._syncs = {}
+        # Once set, due dates already passed are not scheduled again for
+        # shards loaded after an eviction
+        self._due_since = None
+        self._batch = threading.local()
+        self._leading = False
+        # Every process keeps the stored reminders of the shards it has
+        # loaded in step; only the leader loads the others (see lead())
+        shards.watch_tasks(self._attach)
+        shards.watch_evictions(self._detach)
+
+    def lead(self):
+        """
+        Take on the leader's duties without starting any threads
+
+        Starts feeding due dates to the overdue timer, which standby
+        processes never fire, and loads the pending shards once, so the
+        reminders of tasks changed while no scheduler was running are
+        stored. ``start`` calls this;
+        a virtual-time run calls it instead of ``start``.
+        """
+        if self._leading:
+            return
+        self._leading = True
+        for user_id, (tasks, listeners) in list(self._syncs.items()):
+            listeners.append(tasks.subscribe(self._due_watch(user_id)))
         self.load_tasks()
-        
+        self._due_since = self._timestamp()
+
     def start(self):
         """Start the background scheduler"""
         try:
+            self.lead()
             self.scheduler.start()
             logger.info("Scheduler started successfully")
             # Schedule daily summary for 9 AM
@@ -29,194 +260,393 @@ class TaskScheduler:
                 IntervalTrigger(days=1, start_date=self._get_next_time(9, 0)),
                 id='daily_summary'
             )
-            # Check for overdue tasks every hour
+            # Other worker processes edit tasks too; pick up their changes
+            # to the shards this process has loaded
             self.scheduler.add_job(
-                self.check_overdue_tasks,
-                IntervalTrigger(hours=1),
-                id='overdue_check'
+                self.sync_shards,
+                IntervalTrigger(seconds=config.SCHEDULER_SYNC_SECONDS),
+                id='sync_shards'
             )
+            if self.dispatcher:
+                self.dispatcher.start()
+            # Deliver reminders missed while stopped, then as they come due
+            self.reminder_pump.start()
+            # Overdue tasks are reported the moment they pass their due time
+            self.due_timer.start()
         except Exception as e:
             logger.error(f"Failed to start scheduler: {e}")
     
     def stop(self):
         """Stop the background scheduler"""
+        self.due_timer.stop()
+        self.reminder_pump.stop()
+        if self.dispatcher:
+            self.dispatcher.stop()
         if self.scheduler.running:
             self.scheduler.shutdown()
             logger.info("Scheduler stopped")
     
     def load_tasks(self):
-        """Load tasks from JSON and schedule reminders"""
+        """Load every user shard with pending tasks, syncing their reminders
+
+        Stored reminders persist across restarts, so this only writes the
+        reminders of tasks that changed while the scheduler was stopped.
+        """
         try:
-            with open(config.TASKS_FILE, 'r') as file:
-                data = json.load(file)
-                tasks = data.get('tasks', [])
-                
-                # Clear existing task reminders
-                for job in self.scheduler.get_jobs():
-                    if job.id.startswith('task_'):
-                        job.remove()
-                
-                # Schedule reminders for upcoming tasks
-                for task in tasks:
-                    if task.get('status') != 'Completed' and task.get('due_date') and task.get('reminder'):
-                        self.schedule_task_reminder(task)
-                        
-            logger.info(f"Loaded and scheduled {len(tasks)} tasks")
+            users = 0
+            for shard in shards.pending_shards():
+                users += 1
+            logger.info(f"Synced reminders for {users} users: {self.reminder_stats}")
         except Exception as e:
             logger.error(f"Error loading tasks: {e}")
+
+    def sync_shards(self):
+        """
+        Reload loaded shards changed by other processes, resyncing their reminders
+
+        Shards that are not loaded are left alone: their reminders are
+        stored, and whichever process edits them keeps those in step.
+        """
+        try:
+            reloaded = shards.refresh_loaded()
+            if reloaded:
+                logger.info(f"Resynced {reloaded} shards changed by other processes")
+        except Exception as e:
+            logger.error(f"Error syncing shards: {e}")
+
+    def _attach(self, user_id, tasks):
+        """Keep a user's reminders and due dates in step with their task collection"""
+        self._detach(user_id)
+        listeners = [ReminderSync(self, user_id)]
+        if self._leading:
+            listeners.append(self._due_watch(user_id))
+        self._syncs[user_id] = (tasks, listeners)
+        for listener in listeners:
+            tasks.subscribe(listener)
+
+    def _due_watch(self, user_id):
+        return DueWatch(self.due_timer, user_id, since=self._due_since)
+
+    def _detach(self, user_id, tasks=None):
+        """
+        Drop a user's listeners when their shard is evicted
+
+        The fingerprints are stored with the reminders and the due dates
+        stay queued in the timer, so nothing is lost; ``_attach`` rebuilds
+        both when the shard is loaded again.
+        """
+        entry = self._syncs.pop(user_id, None)
+        if entry is not None:
+            collection, listeners = entry
+            for listener in listeners:
+                collection.unsubscribe(listener)
     
-    def schedule_task_reminder(self, task):
-        """Schedule a reminder for a specific task"""
+    def _timestamp(self):
+        return self.clock().timestamp()
+
+    def next_run_at(self):
+        """Epoch seconds of the next reminder or due date, or None"""
+        times = [t for t in (self.reminders.next_run_at(), self.due_timer.next_due()) if t is not None]
+        return min(times) if times else None
+
+    def run_pending(self):
+        """
+        Deliver every reminder and overdue notice due at the scheduler's clock
+
+        In virtual time the background threads are never started; the
+        caller moves the clock and calls this instead.
+
+        Returns:
+            int: How many reminders and due dates fired
+        """
+        fired = self.reminder_pump.run_pending()
+        due = self.due_timer.pop_due()
+        if due:
+            self._on_tasks_due(due)
+        return fired + len(due)
+
+    @staticmethod
+    def reminder_time(task):
+        """
+        When a task's reminder should fire
+
+        ``reminder`` is either minutes before the due date (the task panel's
+        old format) or the reminder's own date and time.
+        """
+        reminder = task.get('reminder')
+        if reminder is True:
+            reminder = 30
+        if isinstance(reminder, int) or str(reminder).isdigit():
+            due_date = datetime.fromisoformat(task.get('due_date'))
+            return due_date - timedelta(minutes=int(reminder))
+        return datetime.fromisoformat(reminder)
+
+    def next_reminder_time(self, task):
+        """
+        When a task's next reminder should fire, or None if there is none
+
+        A recurring task is only ever reminded of its next occurrence, at
+        the same offset from it as the reminder has from the first one.
+        """
+        reminder_time = self.reminder_time(task)
+        if not is_recurring(task):
+            return reminder_time
+        offset = datetime.fromisoformat(task['due_date']) - reminder_time
+        occurrence = next_occurrence(task, self.clock() + offset)
+        return occurrence - offset if occurrence else None
+
+    def schedule_task_reminder(self, task, user_id=None, fingerprint=None):
+        """Store (or move) the reminder for a specific task"""
         task_id = task.get('id', str(uuid.uuid4()))
-        due_date_str = task.get('due_date')
-        reminder_minutes = int(task.get('reminder', 30))
+        user_id = user_id or config.DEFAULT_USER
         
-        if not due_date_str:
-            return
+        if not task.get('due_date'):
+            return False
         
         try:
-            due_date = datetime.fromisoformat(due_date_str)
-            reminder_time = due_date - timedelta(minutes=reminder_minutes)
+            reminder_time = self.next_reminder_time(task)
             
             # Only schedule if the reminder time is in the future
-            if reminder_time > datetime.now():
-                self.scheduler.add_job(
-                    self.send_task_reminder,
-                    DateTrigger(run_date=reminder_time),
-                    args=[task],
-                    id=f"task_{task_id}"
-                )
-                logger.info(f"Scheduled reminder for task '{task.get('title')}' at {reminder_time}")
+            if reminder_time and reminder_time > self.clock():
+                row = (reminder_time.timestamp(), fingerprint or ReminderSync.fingerprint(task) or '')
+                batch = getattr(self._batch, 'rows', None)
+                if batch is not None:
+                    batch[(user_id, str(task_id))] = row
+                    return True
+                next_run_at = self.reminders.next_run_at()
+                self.reminders.upsert(user_id, task_id, *row)
+                if next_run_at is None or row[0] < next_run_at:
+                    self.reminder_pump.wake()
+                logger.debug(f"Scheduled reminder for task '{task.get('title')}' at {reminder_time}")
+                return True
         except Exception as e:
             logger.error(f"Error scheduling reminder for task {task_id}: {e}")
-    
-    def send_task_reminder(self, task):
-        """Send a reminder notification for a task"""
+        self.unschedule_task_reminder(task_id, user_id)
+        return False
+
+    def unschedule_task_reminder(self, task_id, user_id=None):
+        """Remove a task's stored reminder if there is one"""
+        user_id = user_id or config.DEFAULT_USER
+        batch = getattr(self._batch, 'rows', None)
+        if batch is not None:
+            batch[(user_id, str(task_id))] = None
+            return True
+        return self.reminders.delete(user_id, task_id)
+
+    @contextmanager
+    def batched_reminders(self):
+        """
+        Collect the reminder writes made in this thread and store them in
+        one transaction on exit, instead of one per task
+        """
+        if getattr(self._batch, 'rows', None) is not None:
+            yield
+            return
+        self._batch.rows = {}
         try:
-            task_title = task.get('title', 'Untitled Task')
-            due_date_str = task.get('due_date', 'Unknown')
-            due_date = datetime.fromisoformat(due_date_str)
-            
-            # Format the time nicely
-            due_time = due_date.strftime('%I:%M %p')
-            
-            # Send desktop notification
-            message = f"Task '{task_title}' is due at {due_time}"
+            yield
+        finally:
+            rows, self._batch.rows = self._batch.rows, None
+            if rows:
+                self.reminders.apply(rows)
+                self.reminder_pump.wake()
+
+    def _deliver_reminders(self, rows, missed):
+        """
+        ReminderPump callback: remind about each task as it is now
+
+        Reminders missed while stopped are coalesced into one digest when
+        config.REMINDER_COALESCE is set.
+
+        Returns:
+            list: Rows handed to the dispatcher; they stay stored until a
+            worker reports them done (see ``_on_dispatched``)
+        """
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row[0], []).append(row)
+        tasks = []
+        for user_id, reminders in by_user.items():
+            collection = shards.get(user_id, touch=False).tasks
+            for row in reminders:
+                task = collection.get(row[1])
+                # Skip tasks closed or deleted since the reminder was stored
+                if task is None or not is_open_task(task):
+                    continue
+                if is_recurring(task):
+                    task = self._roll_forward(task, user_id, row[2])
+                tasks.append((row, task))
+        if missed and config.REMINDER_COALESCE and len(tasks) > 1:
+            self.send_missed_reminders([task for _, task in tasks])
+            return []
+        if self.dispatcher and self.dispatcher.running:
+            # Blocking sends happen in the worker processes
+            for row, task in tasks:
+                self.dispatcher.submit(row[0], task, token=row)
+            self.dispatcher.flush()
+            return [row for row, _ in tasks]
+        for _, task in tasks:
+            self.send_task_reminder(task)
+        return []
+
+    def _on_dispatched(self, done):
+        """
+        Dispatcher callback: forget reminders a worker finished
+
+        Reminders lost with a worker that died are released, so the pump
+        delivers them again.
+        """
+        finished = [row for row, ok in done if ok is not None]
+        lost = [row for row, ok in done if ok is None]
+        if finished:
+            self.reminders.ack(finished)
+        if lost:
+            self.reminders.release(lost)
+            self.reminder_pump.wake()
+            logger.warning(f"Delivering {len(lost)} reminders again, their worker exited")
+
+    def _roll_forward(self, task, user_id, run_at):
+        """
+        Schedule a recurring task's next reminder after one has fired
+
+        Returns:
+            dict: The occurrence the fired reminder was for
+        """
+        try:
+            offset = datetime.fromisoformat(task['due_date']) - self.reminder_time(task)
+            occurrence = datetime.fromtimestamp(run_at) + offset
+            self.schedule_task_reminder(task, user_id)
+            return {**task, 'due_date': format_occurrence(task, occurrence), 'occurrence_of': task['id']}
+        except Exception as e:
+            logger.error(f"Error rolling recurring task {task.get('id')} forward: {e}")
+            return task
+
+    def send_missed_reminders(self, tasks):
+        """Send one notification for reminders that came due while stopped"""
+        try:
+            titles_str = "\n".join([f"- {t.get('title', 'Untitled')}" for t in tasks])
             self.notification_service.send_notification(
-                title="Task Reminder",
-                message=message
+                title=f"You missed {len(tasks)} task reminders",
+                message=f"While NikAssistant was offline:\n{titles_str}"
             )
-            
-            # Send email reminder if email is enabled for this task
-            if task.get('email_reminder', False) and config.EMAIL_USER:
-                self.email_service.send_email(
-                    subject=f"Reminder: {task_title}",
-                    body=f"""
-                    <h2>Task Reminder</h2>
-                    <p>Your task <strong>{task_title}</strong> is due at {due_time}.</p>
-                    <p>Priority: {task.get('priority', 'Medium')}</p>
-                    <p>Category: {task.get('category', 'General')}</p>
-                    <p>Description: {task.get('description', '')}</p>
-                    <hr>
-                    <p>This is an automated reminder from NikAssistant.</p>
-                    """
-                )
-                logger.info(f"Sent email reminder for task '{task_title}'")
+            logger.info(f"Sent digest of {len(tasks)} missed reminders")
         except Exception as e:
-            logger.error(f"Error sending task reminder: {e}")
+            logger.error(f"Error sending missed reminders: {e}")
+    
+    def send_task_reminder(self, task):
+        """Send a reminder notification for a task"""
+        return deliver_task_reminder(task, self.notification_service, self.email_service)
     
+    def _on_tasks_due(self, keys):
+        """
+        DueTimer callback: notify each user about tasks that just became overdue
+
+        The timer batches deadlines within config.OVERDUE_BATCH_SECONDS, so
+        each user gets one notification for all of them.
+        """
+        by_user = {}
+        for user_id, task_id in keys:
+            by_user.setdefault(user_id, []).append(task_id)
+        for user_id, task_ids in by_user.items():
+            tasks = shards.get(user_id, touch=False).tasks
+            due = [tasks.get(task_id) for task_id in task_ids]
+            self._notify_overdue([t for t in due if t is not None and is_open_task(t)])
+
     def check_overdue_tasks(self):
-        """Check for overdue tasks and send notifications"""
+        """Check all pending shards for overdue tasks and send notifications"""
         try:
-            with open(config.TASKS_FILE, 'r') as file:
-                data = json.load(file)
-                tasks = data.get('tasks', [])
-                now = datetime.now()
-                
-                overdue_tasks = []
-                for task in tasks:
-                    if (
-                        task.get('status') != 'Completed' and 
-                        task.get('due_date') and 
-                        datetime.fromisoformat(task.get('due_date')) < now
-                    ):
-                        overdue_tasks.append(task)
-                
-                if overdue_tasks:
-                    titles = [t.get('title', 'Untitled') for t in overdue_tasks]
-                    titles_str = "\n".join([f"- {t}" for t in titles])
-                    self.notification_service.send_notification(
-                        title=f"You have {len(overdue_tasks)} overdue tasks",
-                        message=f"Overdue tasks:\n{titles_str}"
-                    )
-                    logger.info(f"Sent notification for {len(overdue_tasks)} overdue tasks")
+            for shard in shards.pending_shards():
+                self._notify_overdue(shard.tasks.open_tasks_with_due_date())
+        except Exception as e:
+            logger.error(f"Error checking overdue tasks: {e}")
+
+    def _notify_overdue(self, tasks):
+        """Send one overdue notification for a user's open dated tasks"""
+        try:
+            now = self.clock()
+            
+            overdue_tasks = []
+            for task in tasks:
+                if datetime.fromisoformat(task.get('due_date')) < now:
+                    overdue_tasks.append(task)
+            
+            if overdue_tasks:
+                titles = [t.get('title', 'Untitled') for t in overdue_tasks]
+                titles_str = "\n".join([f"- {t}" for t in titles])
+                self.notification_service.send_notification(
+                    title=f"You have {len(overdue_tasks)} overdue tasks",
+                    message=f"Overdue tasks:\n{titles_str}"
+                )
+                logger.info(f"Sent notification for {len(overdue_tasks)} overdue tasks")
         except Exception as e:
             logger.error(f"Error checking overdue tasks: {e}")
     
     def send_daily_summary(self):
-        """Send a daily summary of tasks"""
+        """Send a daily summary of tasks to each user with pending tasks"""
         try:
-            with open(config.TASKS_FILE, 'r') as file:
-                data = json.load(file)
-                tasks = data.get('tasks', [])
-                today = datetime.now().date()
-                tomorrow = today + timedelta(days=1)
-                
-                today_tasks = []
-                tomorrow_tasks = []
-                
-                for task in tasks:
-                    if task.get('status') != 'Completed' and task.get('due_date'):
-                        due_date = datetime.fromisoformat(task.get('due_date')).date()
-                        if due_date == today:
-                            today_tasks.append(task)
-                        elif due_date == tomorrow:
-                            tomorrow_tasks.append(task)
-                
-                message_parts = []
-                
-                if today_tasks:
-                    titles = [t.get('title', 'Untitled') for t in today_tasks]
-                    titles_str = "\n".join([f"- {t}" for t in titles])
-                    message_parts.append(f"Today's tasks ({len(today_tasks)}):\n{titles_str}")
-                
-                if tomorrow_tasks:
-                    titles = [t.get('title', 'Untitled') for t in tomorrow_tasks]
-                    titles_str = "\n".join([f"- {t}" for t in titles])
-                    message_parts.append(f"Tomorrow's tasks ({len(tomorrow_tasks)}):\n{titles_str}")
+            for shard in shards.pending_shards():
+                self._send_summary(shard.tasks)
+        except Exception as e:
+            logger.error(f"Error sending daily summary: {e}")
+
+    def _send_summary(self, tasks):
+        """Send the daily summary for one user's task collection"""
+        try:
+            today = self.clock().date()
+            tomorrow = today + timedelta(days=1)
+            
+            # Skip users with nothing due without touching their tasks
+            summary = tasks.summary(today.isoformat())
+            if not summary['due_today'] and not summary['due_tomorrow']:
+                return
+            
+            today_tasks = tasks.due_on(today.isoformat())
+            tomorrow_tasks = tasks.due_on(tomorrow.isoformat())
+            
+            message_parts = []
+            
+            if today_tasks:
+                titles = [t.get('title', 'Untitled') for t in today_tasks]
+                titles_str = "\n".join([f"- {t}" for t in titles])
+                message_parts.append(f"Today's tasks ({len(today_tasks)}):\n{titles_str}")
+            
+            if tomorrow_tasks:
+                titles = [t.get('title', 'Untitled') for t in tomorrow_tasks]
+                titles_str = "\n".join([f"- {t}" for t in titles])
+                message_parts.append(f"Tomorrow's tasks ({len(tomorrow_tasks)}):\n{titles_str}")
+            
+            if message_parts:
+                message = "\n\n".join(message_parts)
+                self.notification_service.send_notification(
+                    title="Daily Task Summary",
+                    message=message
+                )
                 
-                if message_parts:
-                    message = "\n\n".join(message_parts)
-                    self.notification_service.send_notification(
-                        title="Daily Task Summary",
-                        message=message
+                # Send email summary
+                if config.EMAIL_USER:
+                    self.email_service.send_email(
+                        subject="NikAssistant Daily Task Summary",
+                        body=f"""
+                        <h2>Daily Task Summary</h2>
+                        <h3>Today's Tasks:</h3>
+                        <ul>
+                            {"".join(f"<li><strong>{t.get('title')}</strong> ({t.get('priority', 'Medium')})</li>" for t in today_tasks)}
+                        </ul>
+                        <h3>Tomorrow's Tasks:</h3>
+                        <ul>
+                            {"".join(f"<li><strong>{t.get('title')}</strong> ({t.get('priority', 'Medium')})</li>" for t in tomorrow_tasks)}
+                        </ul>
+                        <hr>
+                        <p>This is an automated summary from NikAssistant.</p>
+                        """
                     )
-                    
-                    # Send email summary
-                    if config.EMAIL_USER:
-                        self.email_service.send_email(
-                            subject="NikAssistant Daily Task Summary",
-                            body=f"""
-                            <h2>Daily Task Summary</h2>
-                            <h3>Today's Tasks:</h3>
-                            <ul>
-                                {"".join(f"<li><strong>{t.get('title')}</strong> ({t.get('priority', 'Medium')})</li>" for t in today_tasks)}
-                            </ul>
-                            <h3>Tomorrow's Tasks:</h3>
-                            <ul>
-                                {"".join(f"<li><strong>{t.get('title')}</strong> ({t.get('priority', 'Medium')})</li>" for t in tomorrow_tasks)}
-                            </ul>
-                            <hr>
-                            <p>This is an automated summary from NikAssistant.</p>
-                            """
-                        )
-                    logger.info("Sent daily task summary")
+                logger.info("Sent daily task summary")
         except Exception as e:
             logger.error(f"Error sending daily summary: {e}")
 
     def _get_next_time(self, hour, minute):
         """Get the next occurrence of a specific time"""
-        now = datetime.now()
+        now = self.clock()
         target_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
         if target_time <= now:
             target_time += timedelta(days=1)
@@ -0,0 +1,350 @@
+import json
+import logging
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import config
+from backend.collection import NoteCollection, TaskCollection
+from backend.journal import atomic_write_json
+from backend.storage import create_store
+from backend.task_index import is_open_task
+from backend.write_behind import saver
+
+logger = logging.getLogger("nikassistant.shards")
+
+PENDING_FILE = config.DATA_DIR / "pending_shards.json"
+
+
+def normalize_user_id(user_id):
+    """
+    Turn a user id into a safe directory name
+
+    Returns:
+        str: The id with unsafe characters replaced, or the default user
+    """
+    user_id = re.sub(r"[^A-Za-z0-9_.@-]", "_", str(user_id or "").strip())[:64]
+    if user_id.strip(".") == "":
+        return config.DEFAULT_USER
+    return user_id
+
+
+def user_data_dir(user_id):
+    """Directory holding a user's tasks and notes"""
+    if user_id == config.DEFAULT_USER:
+        return config.DATA_DIR
+    return config.USERS_DIR / user_id
+
+
+def is_known_user(user_id):
+    """
+    Whether a normalized user id may have a shard
+
+    Ids come from the unauthenticated ``?user=`` parameter, so only the
+    default user, config.ALLOWED_USERS and users whose directory already
+    exists are accepted; anything else must not create a directory.
+    """
+    return (
+        user_id == config.DEFAULT_USER
+        or user_id in config.ALLOWED_USERS
+        or user_data_dir(user_id).is_dir()
+    )
+
+
+class Shard:
+    """One user's task and note collections"""
+
+    def __init__(self, user_id, tasks, notes):
+        self.user_id = user_id
+        self.tasks = tasks
+        self.notes = notes
+
+
+class PendingTracker:
+    """
+    Collection listener that counts a user's open tasks with a due date
+
+    Calls ``on_transition(user_id, pending)`` on the first load and then
+    only when the count moves between zero and non-zero, so the shard
+    registry can persist which users the scheduler needs to look at.
+    """
+
+    def __init__(self, user_id, on_transition):
+        self.user_id = user_id
+        self.on_transition = on_transition
+        self.count = None
+
+    @staticmethod
+    def _pending(task):
+        return task is not None and bool(task.get("due_date")) and is_open_task(task)
+
+    def _set(self, count):
+        was_pending = None if self.count is None else self.count > 0
+        self.count = count
+        if was_pending != (count > 0):
+            self.on_transition(self.user_id, count > 0)
+
+    def on_reload(self, records):
+        self._set(sum(1 for task in records if self._pending(task)))
+
+    def on_change(self, old, new):
+        self._set(self.count - self._pending(old) + self._pending(new))
+
+
+class ShardRegistry:
+    """
+    Lazily loaded per-user shards with least-recently-used eviction.
+
+    A user's data is only read when ``get`` first asks for it. Beyond
+    ``max_loaded`` shards, the least recently used idle one (no session
+    asked for it in ``idle_seconds``) is flushed and dropped; shards in
+    use stay loaded even past the limit. A session still holding an evicted shard's collections keeps
+    using them (the saver still flushes them) and ``get`` hands the same
+    objects back, so there is never a second copy of a user's data; their
+    stores close once the last reference goes.
+
+    The set of users with open, dated tasks is kept in ``PENDING_FILE`` so
+    the scheduler can skip every other shard without loading it.
+    """
+
+    def __init__(self, max_loaded=None, pending_file=PENDING_FILE, idle_seconds=None,
+                 clock=time.monotonic):
+        self.max_loaded = max_loaded or config.MAX_LOADED_SHARDS
+        self.pending_file = pending_file
+        self.idle_seconds = config.SHARD_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._loaded = OrderedDict()
+        self._last_used = {}
+        self._evicted = weakref.WeakValueDictionary()
+        self._pending_lock = threading.Lock()
+        self._pending = self._read_pending()
+        self._task_watchers = []
+        self._evict_watchers = []
+        self.stats = {"loads": 0, "hits": 0, "evictions": 0, "revived": 0}
+
+    def _read_pending(self):
+        try:
+            with open(self.pending_file, "r") as file:
+                return set(json.load(file).get("users", []))
+        except FileNotFoundError:
+            # Nothing recorded yet: only the pre-sharding default data can exist
+            return {config.DEFAULT_USER}
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading {self.pending_file}: {e}")
+            return {config.DEFAULT_USER}
+
+    def _set_pending(self, user_id, pending):
+        # Called from collection listeners, so it takes its own lock rather
+        # than the registry's
+        with self._pending_lock:
+            if pending == (user_id in self._pending):
+                return
+            # Other worker processes write the file too: start from its
+            # current contents so their changes are not overwritten
+            self._pending |= self._read_pending()
+            if pending:
+                self._pending.add(user_id)
+            else:
+                self._pending.discard(user_id)
+            try:
+                atomic_write_json(self.pending_file, {"users": sorted(self._pending)})
+            except OSError as e:
+                logger.error(f"Error writing {self.pending_file}: {e}")
+
+    def refresh_pending(self):
+        """Pick up users marked pending by other worker processes"""
+        pending = self._read_pending()
+        with self._pending_lock:
+            self._pending |= pending
+
+    def get(self, user_id=None, touch=True):
+        """
+        Return a user's shard, loading it if needed
+
+        Args:
+            user_id: User id (default: config.DEFAULT_USER)
+            touch: Mark the shard in use and most recently used. Background
+                scans pass False so the shards they load stay idle and go
+                first, instead of pushing out the shards of active sessions.
+
+        Raises:
+            ValueError: If the user is not known (see ``is_known_user``)
+        """
+        user_id = normalize_user_id(user_id)
+        with self._lock:
+            shard = self._loaded.get(user_id)
+            if shard is not None:
+                self.stats["hits"] += 1
+            else:
+                if not is_known_user(user_id):
+                    raise ValueError(f"Unknown user '{user_id}'")
+                shard = self._revive(user_id) or self._open(user_id)
+                self._loaded[user_id] = shard
+                self._loaded.move_to_end(user_id, last=False)
+            if touch:
+                self._loaded.move_to_end(user_id)
+                self._last_used[user_id] = self.clock()
+            evicted = self._evict_over_limit(keep=user_id)
+        self._flush_evicted(evicted)
+        shard.tasks.refresh_if_stale()
+        shard.notes.refresh_if_stale()
+        return shard
+
+    def _revive(self, user_id):
+        """Reuse an evicted shard's collections that a session still holds"""
+        tasks = self._evicted.pop(("tasks", user_id), None)
+        notes = self._evicted.pop(("notes", user_id), None)
+        if tasks is None and notes is None:
+            return None
+        self.stats["revived"] += 1
+        if tasks is None:
+            tasks = self._open_collection("tasks", user_id)
+        else:
+            # Eviction detached the watchers' listeners (see watch_evictions)
+            for watcher in self._task_watchers:
+                watcher(user_id, tasks)
+        if notes is None:
+            notes = self._open_collection("notes", user_id)
+        return Shard(user_id, tasks, notes)
+
+    def _open_collection(self, kind, user_id):
+        store = create_store(kind, user_data_dir(user_id))
+        if kind == "tasks":
+            collection = TaskCollection(store)
+            collection.subscribe(PendingTracker(user_id, self._set_pending))
+            for watcher in self._task_watchers:
+                watcher(user_id, collection)
+        else:
+            collection = NoteCollection(store)
+        # Close the store once nothing references the collection any more
+        weakref.finalize(collection, store.close).atexit = False
+        return saver.register(collection)
+
+    def _open(self, user_id):
+        user_data_dir(user_id).mkdir(parents=True, exist_ok=True)
+        shard = Shard(
+            user_id,
+            self._open_collection("tasks", user_id),
+            self._open_collection("notes", user_id),
+        )
+        self.stats["loads"] += 1
+        logger.info(f"Loaded shard for user '{user_id}' ({len(shard.tasks)} tasks)")
+        return shard
+
+    def _idle(self, user_id, now):
+        last_used = self._last_used.get(user_id)
+        return last_used is None or now - last_used >= self.idle_seconds
+
+    def _evict_over_limit(self, keep):
+        """Drop the idle shards over the limit; call with ``_lock`` held"""
+        excess = len(self._loaded) - self.max_loaded
+        if excess <= 0:
+            return []
+        # Least recently used idle shards first, never the one being handed out
+        now = self.clock()
+        idle = [u for u in self._loaded if u != keep and self._idle(u, now)]
+        return [self._drop(user_id) for user_id in idle[:excess]]
+
+    def _drop(self, user_id):
+        """Move a loaded shard to the evicted set; call with ``_lock`` held"""
+        shard = self._loaded.pop(user_id)
+        self._last_used.pop(user_id, None)
+        self._evicted[("tasks", user_id)] = shard.tasks
+        self._evicted[("notes", user_id)] = shard.notes
+        self.stats["evictions"] += 1
+        for watcher in self._evict_watchers:
+            watcher(user_id, shard.tasks)
+        return shard
+
+    def _flush_evicted(self, evicted):
+        # Outside the registry lock, so other users' get() calls don't wait
+        # on this disk I/O. The collections' flush locks keep this in order
+        # with the saver thread, and a get() reviving the shard meanwhile
+        # gets the same collections back.
+        for shard in evicted:
+            saver.flush(shard.tasks)
+            saver.flush(shard.notes)
+            logger.info(f"Evicted shard for user '{shard.user_id}'")
+
+    def evict(self, user_id):
+        """Flush a shard and drop the registry's reference to it"""
+        with self._lock:
+            if user_id not in self._loaded:
+                return False
+            shard = self._drop(user_id)
+        self._flush_evicted([shard])
+        return True
+
+    def watch_tasks(self, watcher):
+        """
+        Call ``watcher(user_id, tasks)`` for every task collection
+
+        Runs for the collections already loaded and then for each one
+        loaded or revived later, so a watcher can subscribe listeners to
+        every loaded user's tasks.
+        """
+        with self._lock:
+            self._task_watchers.append(watcher)
+            open_shards = list(self._loaded.values())
+        for shard in open_shards:
+            watcher(shard.user_id, shard.tasks)
+
+    def watch_evictions(self, watcher):
+        """
+        Call ``watcher(user_id, tasks)`` when a shard is evicted
+
+        Runs under the registry lock, before a ``get`` can revive the
+        shard, so a ``watch_tasks`` watcher can drop what it keeps per
+        user and rebuild it when the shard is loaded again.
+        """
+        with self._lock:
+            self._evict_watchers.append(watcher)
+
+    def loaded_users(self):
+        with self._lock:
+            return list(self._loaded)
+
+    def pending_users(self):
+        """Users with open tasks that have a due date"""
+        with self._pending_lock:
+            return sorted(self._pending)
+
+    def refresh_loaded(self):
+        """
+        Reload the loaded shards whose stores another process changed
+
+        Returns:
+            int: How many collections were reloaded
+        """
+        with self._lock:
+            loaded = list(self._loaded.values())
+        reloaded = 0
+        for shard in loaded:
+            reloaded += shard.tasks.refresh_if_stale()
+            reloaded += shard.notes.refresh_if_stale()
+        return reloaded
+
+    def pending_shards(self):
+        """Yield the shards of users with pending tasks, loading them quietly"""
+        self.refresh_pending()
+        for user_id in self.pending_users():
+            try:
+                shard = self.get(user_id, touch=False)
+            except ValueError as e:
+                # e.g. the user's directory was removed by hand
+                logger.warning(f"Skipping pending shard: {e}")
+                continue
+            yield shard
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "loaded": len(self._loaded),
+            "pending_users": len(self.pending_users()),
+        }
+
+
+# Global instance
+shards = ShardRegistry()
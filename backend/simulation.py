@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timedelta
+
+
+class VirtualClock:
+    """
+    Settable clock for running TaskScheduler in simulated time
+
+    Pass it as ``TaskScheduler(clock=...)``; it returns ``now`` until moved
+    with ``set`` or ``advance``. ``advanced_at`` is the ``perf_counter``
+    reading at the last move, so recording services can tell how long
+    delivery took in real time after the simulated moment arrived.
+    """
+
+    def __init__(self, start=None):
+        self.now = start or datetime.now().replace(microsecond=0)
+        self.advanced_at = time.perf_counter()
+
+    def __call__(self):
+        return self.now
+
+    def set(self, moment):
+        if moment < self.now:
+            raise ValueError(f"Virtual clock cannot go back from {self.now} to {moment}")
+        self.now = moment
+        self.advanced_at = time.perf_counter()
+
+    def advance(self, seconds):
+        self.set(self.now + timedelta(seconds=seconds))
+
+
+class RecordingNotificationService:
+    """
+    Stand-in for NotificationService that records instead of sending
+
+    Each entry in ``sent`` is ``(virtual time, real seconds since the clock
+    last moved, title, message)``.
+    """
+
+    firebase_available = False
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def send_notification(self, title, message):
+        self.sent.append((self.clock(), time.perf_counter() - self.clock.advanced_at, title, message))
+        return True
+
+    def send_desktop_notification(self, title, message, timeout=10, dedup=True):
+        return self.send_notification(title, message)
+
+    def send_mobile_notification(self, title, message, topic="all_users", dedup=True):
+        return False
+
+
+class RecordingEmailService:
+    """Stand-in for EmailService that records ``(virtual time, subject)``"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def send_email(self, to_email=None, subject="Notification from NikAssistant", body="", dedup=True):
+        self.sent.append((self.clock(), subject))
+        return True
+
+
+def run_until(scheduler, clock, end, step=None):
+    """
+    Move ``clock`` forward to ``end``, delivering everything due on the way
+
+    Args:
+        scheduler: TaskScheduler built with ``clock``, leading (``lead()``)
+            but not started
+        clock: The scheduler's VirtualClock
+        end: datetime to stop at
+        step: Seconds per tick. None jumps straight to each next due time,
+            so nothing fires late.
+
+    Returns:
+        int: How many reminders and due dates fired
+    """
+    fired = 0
+    while clock.now < end:
+        if step:
+            clock.set(min(clock.now + timedelta(seconds=step), end))
+            fired += scheduler.run_pending()
+            continue
+        next_run_at = scheduler.next_run_at()
+        if next_run_at is None:
+            clock.set(end)
+        else:
+            clock.set(min(max(datetime.fromtimestamp(next_run_at), clock.now), end))
+        count = scheduler.run_pending()
+        if not count and clock.now < end:
+            # The due time rounded to just before itself; nudge past it
+            clock.advance(0.001)
+        fired += count
+    return fired
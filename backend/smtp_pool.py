@@ -0,0 +1,186 @@
+import logging
+import smtplib
+import threading
+import time
+import config
+
+logger = logging.getLogger("nikassistant.smtp")
+
+
+class SMTPPool:
+    """
+    Authenticated SMTP sessions kept open between emails.
+
+    Opening a session costs a TCP connect, EHLO, STARTTLS (a TLS handshake
+    and another EHLO) and AUTH; a pooled session sends the next email with
+    just MAIL/RCPT/DATA. At most ``size`` sessions are open at once. A
+    session idle for more than ``idle_timeout`` seconds is closed instead
+    of reused, and one idle for more than ``check_after`` seconds is
+    checked with NOOP first. A send that finds its session disconnected is
+    retried once on a new one.
+    """
+
+    def __init__(self, host, port, user, password, size=None, idle_timeout=None,
+                 check_after=None, starttls=True, timeout=None,
+                 clock=time.monotonic):
+        """
+        Args:
+            host, port: SMTP server
+            user, password: Login, or None to send without AUTH
+            size: Most open sessions (default: config.SMTP_POOL_SIZE)
+            idle_timeout: Seconds before an idle session is closed
+                (default: config.SMTP_IDLE_TIMEOUT)
+            check_after: Seconds idle before a session is checked with NOOP
+                (default: config.SMTP_HEALTH_CHECK_SECONDS)
+            starttls: Whether to upgrade sessions with STARTTLS
+            timeout: Socket timeout in seconds (default: config.NOTIFY_CHANNEL_TIMEOUTS['email'])
+            clock: Callable returning seconds
+        """
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size or config.SMTP_POOL_SIZE
+        self.idle_timeout = config.SMTP_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self.check_after = config.SMTP_HEALTH_CHECK_SECONDS if check_after is None else check_after
+        self.starttls = starttls
+        self.timeout = timeout or config.NOTIFY_CHANNEL_TIMEOUTS["email"]
+        self.clock = clock
+        self._cond = threading.Condition()
+        # (session, last used) pairs, most recently used last
+        self._idle = []
+        self._open = 0
+        self.stats = {"connects": 0, "reuses": 0, "expired": 0, "failed_checks": 0, "reconnects": 0}
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            self._quit(server)
+            raise
+        return server
+
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _healthy(self, server):
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Take an idle session, or open one if fewer than ``size`` are open"""
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    self._cond.wait()
+                if not self._idle:
+                    self._open += 1
+                    break
+                server, last_used = self._idle.pop()
+            idle_for = self.clock() - last_used
+            if idle_for > self.idle_timeout:
+                self._count("expired")
+            elif idle_for <= self.check_after or self._healthy(server):
+                self._count("reuses")
+                return server
+            else:
+                self._count("failed_checks")
+            self._discard(server)
+        try:
+            server = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        self._count("connects")
+        return server
+
+    def release(self, server):
+        """Return a session that is still usable"""
+        with self._cond:
+            self._idle.append((server, self.clock()))
+            self._cond.notify()
+
+    def _discard(self, server):
+        """Close a session and free its slot"""
+        self._quit(server)
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def send_message(self, message):
+        """
+        Send an email.message.Message on a pooled session
+
+        Raises:
+            smtplib.SMTPException or OSError: If the send failed on a new session too
+        """
+        for attempt in range(2):
+            server = self.acquire()
+            try:
+                server.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                self._discard(server)
+                if attempt:
+                    raise
+            except smtplib.SMTPException:
+                # The server refused this message; the session is still fine
+                self.release(server)
+                raise
+            except OSError:
+                # Socket errors (SMTPException, an OSError too, is handled above)
+                self._discard(server)
+                if attempt:
+                    raise
+            except BaseException:
+                self._discard(server)
+                raise
+            else:
+                self.release(server)
+                return
+            self._count("reconnects")
+            logger.info(f"SMTP session to {self.host} dropped, reconnecting")
+
+    def _count(self, key):
+        with self._cond:
+            self.stats[key] += 1
+
+    def get_stats(self):
+        with self._cond:
+            return {**self.stats, "open": self._open, "idle": len(self._idle)}
+
+    def close(self):
+        """Close the idle sessions"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for server, _ in idle:
+            self._quit(server)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def smtp_pool(host, port, user, password):
+    """The process-wide pool for a server and login, shared by every EmailService"""
+    key = (host, port, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.password != password:
+            if pool is not None:
+                pool.close()
+            pool = _pools[key] = SMTPPool(host, port, user, password)
+        return pool
@@ -0,0 +1,252 @@
+import json
+import os
+import struct
+import sys
+from itertools import repeat
+from operator import itemgetter
+from array import array
+from pathlib import Path
+import numpy as np
+
+MAGIC = b"NIKSNAP\x01"
+_HEADER_LENGTH = struct.Struct("<I")
+
+# Per-value type tags, one byte per row and field
+ABSENT, INT, STR, TRUE, FALSE, NULL, OTHER = range(7)
+
+_CONSTANTS = (None, None, None, True, False, None, None)
+
+# Strings are stored joined by NUL so a whole column decodes with one
+# split(); the rare string that contains NUL is stored as OTHER (JSON).
+_SEPARATOR = "\x00"
+
+
+def binary_snapshot_path(json_path):
+    """Where the binary snapshot for a JSON snapshot lives"""
+    return str(Path(json_path).with_suffix(".bin"))
+
+
+def _source_stamp(json_path):
+    stat = os.stat(json_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _encode_field(records, name):
+    tags = bytearray()
+    ints = array("q")
+    strings = []
+    others = []
+    for record in records:
+        if name not in record:
+            tags.append(ABSENT)
+            continue
+        value = record[name]
+        if value is True:
+            tags.append(TRUE)
+        elif value is False:
+            tags.append(FALSE)
+        elif value is None:
+            tags.append(NULL)
+        elif type(value) is int and -(2**63) <= value < 2**63:
+            tags.append(INT)
+            ints.append(value)
+        elif type(value) is str and _SEPARATOR not in value:
+            tags.append(STR)
+            strings.append(value)
+        else:
+            tags.append(OTHER)
+            others.append(value)
+    if sys.byteorder == "big":
+        ints.byteswap()
+
+    # Dictionary-encode repetitive strings (priorities, dates, categories):
+    # each distinct value is stored, and later allocated, only once
+    codes = array("I")
+    distinct = dict.fromkeys(strings)
+    if len(distinct) * 2 <= len(strings):
+        index = {value: i for i, value in enumerate(distinct)}
+        codes.extend(map(index.__getitem__, strings))
+        if sys.byteorder == "big":
+            codes.byteswap()
+        stored = list(distinct)
+    else:
+        stored = strings
+
+    sections = [
+        bytes(tags),
+        ints.tobytes(),
+        _SEPARATOR.join(stored).encode("utf-8"),
+        codes.tobytes(),
+        json.dumps(others).encode("utf-8") if others else b"",
+    ]
+    return sections, len(stored)
+
+
+def _decode_field(tags, ints_bytes, strings_bytes, codes_bytes, string_count, others_bytes):
+    ints = array("q")
+    ints.frombytes(ints_bytes)
+    codes = array("I")
+    codes.frombytes(codes_bytes)
+    if sys.byteorder == "big":
+        ints.byteswap()
+        codes.byteswap()
+    strings = strings_bytes.decode("utf-8").split(_SEPARATOR) if string_count else []
+    if codes:
+        strings = list(map(strings.__getitem__, codes))
+    others = json.loads(others_bytes) if others_bytes else []
+
+    # Whole-column fast paths for the common single-type fields
+    if len(strings) == len(tags):
+        return strings
+    if len(ints) == len(tags):
+        return ints.tolist()
+
+    # Constants first, then scatter the typed values into their rows
+    values = list(map(_CONSTANTS.__getitem__, tags))
+    tag_codes = np.frombuffer(tags, dtype=np.uint8)
+    for tag, typed in ((INT, ints.tolist()), (STR, strings), (OTHER, others)):
+        if typed:
+            for row, value in zip(np.flatnonzero(tag_codes == tag).tolist(), typed):
+                values[row] = value
+    return values
+
+
+def write_snapshot(path, records, meta, json_path):
+    """
+    Write records as a binary snapshot that shadows ``json_path``
+
+    The file holds, per field, a type-tag byte per record, an int64 array,
+    a NUL-joined UTF-8 string blob (dictionary-encoded when values repeat)
+    and a JSON list for anything else. Each
+    record's key order is kept as an index into a list of key "shapes".
+    The JSON file's size and mtime are recorded so a stale or hand-edited
+    JSON file is never shadowed by an old snapshot.
+
+    Args:
+        path: Binary snapshot path
+        records: List of record dicts
+        meta: Store metadata dict
+        json_path: The JSON snapshot this file accelerates
+
+    Returns:
+        int: Number of bytes written
+    """
+    fields = list(dict.fromkeys(key for record in records for key in record))
+    shapes = {}
+    shape_of = array("I")
+    for record in records:
+        keys = tuple(record)
+        shape = shapes.get(keys)
+        if shape is None:
+            shape = shapes[keys] = len(shapes)
+        shape_of.append(shape)
+    if sys.byteorder == "big":
+        shape_of.byteswap()
+
+    sections = [shape_of.tobytes()]
+    string_counts = []
+    for name in fields:
+        encoded, string_count = _encode_field(records, name)
+        sections += encoded
+        string_counts.append(string_count)
+
+    header = {
+        "rows": len(records),
+        "fields": fields,
+        "shapes": [list(keys) for keys in shapes],
+        "string_counts": string_counts,
+        "sections": [len(section) for section in sections],
+        "meta": meta,
+        "source": _source_stamp(json_path),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(_HEADER_LENGTH.pack(len(header_bytes)))
+        file.write(header_bytes)
+        for section in sections:
+            file.write(section)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    return len(MAGIC) + _HEADER_LENGTH.size + len(header_bytes) + sum(header["sections"])
+
+
+def read_snapshot(path, json_path):
+    """
+    Load records from a binary snapshot if it is current
+
+    Returns:
+        tuple: ``(records, meta)``, or None if the file is missing, corrupt
+        or older than ``json_path``
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    if not data.startswith(MAGIC):
+        return None
+    try:
+        offset = len(MAGIC)
+        (header_length,) = _HEADER_LENGTH.unpack_from(data, offset)
+        offset += _HEADER_LENGTH.size
+        header = json.loads(data[offset:offset + header_length])
+        offset += header_length
+        if header["source"] != _source_stamp(json_path):
+            return None
+
+        view = memoryview(data)
+        sections = []
+        for length in header["sections"]:
+            sections.append(view[offset:offset + length])
+            offset += length
+        if offset != len(data):
+            return None
+
+        shape_of = array("I")
+        shape_of.frombytes(sections[0])
+        if sys.byteorder == "big":
+            shape_of.byteswap()
+
+        fields = header["fields"]
+        columns = []
+        for i, string_count in enumerate(header["string_counts"]):
+            tags, ints, strings, codes, others = sections[1 + 5 * i:6 + 5 * i]
+            columns.append(
+                _decode_field(tags, ints, bytes(strings), codes, string_count, bytes(others))
+            )
+        records = _assemble(fields, header["shapes"], shape_of, columns)
+    except (KeyError, IndexError, ValueError, struct.error):
+        return None
+    return records, header["meta"]
+
+
+def _build(keys, columns):
+    """Dicts from parallel value columns, built without a Python-level loop"""
+    return list(map(dict, map(zip, repeat(keys), zip(*columns))))
+
+
+def _assemble(fields, shapes, shape_of, columns):
+    position = {name: i for i, name in enumerate(fields)}
+    if len(shapes) == 1:
+        keys = shapes[0]
+        return _build(keys, [columns[position[key]] for key in keys])
+
+    # Build each shape's records column-wise, then put them back in file order
+    shape_codes = np.frombuffer(shape_of, dtype=np.uint32)
+    records = [None] * len(shape_codes)
+    for shape, keys in enumerate(shapes):
+        rows = np.flatnonzero(shape_codes == shape).tolist()
+        if not keys:
+            built = [{} for _ in rows]
+        elif len(rows) == 1:
+            built = [{key: columns[position[key]][rows[0]] for key in keys}]
+        else:
+            pick = itemgetter(*rows)
+            built = _build(keys, [pick(columns[position[key]]) for key in keys])
+        for row, record in zip(rows, built):
+            records[row] = record
+    return records
@@ -0,0 +1,420 @@
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+import config
+
+logger = logging.getLogger("nikassistant.storage")
+
+
+def highest_int_id(records):
+    """The largest integer id among ``records`` (0 if there is none)"""
+    return max(
+        (r["id"] for r in records
+         if isinstance(r.get("id"), int) and not isinstance(r["id"], bool)),
+        default=0,
+    )
+
+
+def reassign_duplicate_ids(records, name):
+    """
+    Give records with a missing or repeated id a fresh integer id
+
+    Older versions numbered new records ``len(list) + 1``, which repeats
+    after a delete. Keyed storage would silently drop all but one of them.
+    """
+    seen = set()
+    next_id = highest_int_id(records) + 1
+    for record in records:
+        if record.get("id") is None or str(record["id"]) in seen:
+            logger.warning(f"Reassigning duplicate id {record.get('id')} in {name}")
+            record["id"] = next_id
+            next_id += 1
+        seen.add(str(record["id"]))
+    return records
+
+
+class DuplicateIdError(ValueError):
+    """A record inserted as new has an id that is already stored"""
+
+
+class SQLiteStore:
+    """
+    Row-level storage for a collection of JSON records.
+
+    Each record is stored as one row keyed by its id, so adding, editing or
+    deleting a record only touches that row instead of rewriting the whole
+    collection. The database runs in WAL mode so the scheduler thread can
+    read while a session is writing.
+    """
+
+    table = None
+    legacy_file = None
+    legacy_key = None
+
+    @property
+    def id_counter_key(self):
+        """Meta key holding the next id ``allocate_id`` hands out"""
+        return f"{self.legacy_key}_next_id"
+
+    @property
+    def version_key(self):
+        """Meta key counting committed writes to this store's table"""
+        return f"{self.table}_version"
+
+    def __init__(self, db_path=None, legacy_file=None):
+        self.db_path = str(db_path or config.DB_FILE)
+        if legacy_file is not None:
+            self.legacy_file = Path(legacy_file)
+        self._lock = threading.RLock()
+        # Table version last read or written by this store, and the number
+        # of times another connection was seen to move it
+        self._seen_version = None
+        self.external_version = 0
+        self.conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._migrate_from_json()
+        self._seen_version = self._table_version()
+
+    def _create_schema(self):
+        """Create the record and metadata tables if they don't exist"""
+        with self._lock:
+            self.conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    data TEXT NOT NULL,
+                    {self._column_ddl()}
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    @contextmanager
+    def _transaction(self, immediate=False):
+        """
+        Run the enclosed statements as a single transaction
+
+        ``immediate`` takes the write lock up front, for transactions that
+        read a value and write it back.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _column_ddl(self):
+        """Extra indexed columns for subclasses, as SQL column definitions"""
+        return "updated_at TEXT"
+
+    def _columns(self, record):
+        """Values for the extra columns of a record"""
+        return {"updated_at": record.get("updated_at")}
+
+    @staticmethod
+    def _key(record_id):
+        return str(record_id)
+
+    def _migrate_from_json(self):
+        """Import the legacy JSON file once, the first time the table is used"""
+        flag = f"migrated_{self.table}"
+        if self.get_meta(flag):
+            return
+
+        records = []
+        if self.legacy_file and self.legacy_file.exists():
+            try:
+                with open(self.legacy_file, "r") as file:
+                    records = json.load(file).get(self.legacy_key, [])
+            except Exception as e:
+                logger.error(f"Error reading {self.legacy_file} for migration: {e}")
+                return
+
+        reassign_duplicate_ids(records, self.table)
+
+        with self._transaction():
+            self._upsert_rows(records)
+            self._set_meta(flag, "1")
+            self._bump_version()
+        logger.info(f"Migrated {len(records)} {self.table} from {self.legacy_file}")
+
+    def _upsert_rows(self, records):
+        rows = []
+        for record in records:
+            columns = self._columns(record)
+            rows.append(
+                (self._key(record["id"]), json.dumps(record), *columns.values())
+            )
+        if not rows:
+            return 0
+
+        names = list(self._columns(records[0]).keys())
+        placeholders = ", ".join("?" for _ in range(len(names) + 2))
+        updates = ", ".join(f"{name}=excluded.{name}" for name in ["data"] + names)
+        self.conn.executemany(
+            f"INSERT INTO {self.table} (id, data, {', '.join(names)}) "
+            f"VALUES ({placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}",
+            rows,
+        )
+        self._bump_id_counter(highest_int_id(records))
+        return sum(len(row[1]) for row in rows)
+
+    def _insert_rows(self, records):
+        """Insert new records, refusing any whose id is already stored"""
+        if not records:
+            return 0
+        keys = [self._key(record["id"]) for record in records]
+        existing = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            existing += self.conn.execute(
+                f"SELECT id FROM {self.table} WHERE id IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+        if existing:
+            raise DuplicateIdError(
+                f"{self.table} already has ids {', '.join(row[0] for row in existing)}"
+            )
+        return self._upsert_rows(records)
+
+    def _table_version(self):
+        return int(self.get_meta(self.version_key, 0))
+
+    def _bump_version(self):
+        """
+        Count a write to the table; call inside the writing transaction
+
+        A version we did not write ourselves means another connection
+        committed since we last looked, which is recorded before our own
+        write moves the counter past it.
+        """
+        version = self._table_version()
+        if self._seen_version is not None and version != self._seen_version:
+            self.external_version += 1
+        self._seen_version = version + 1
+        self._set_meta(self.version_key, self._seen_version)
+
+    def _next_free_id(self):
+        """The stored id counter, or one past the highest integer id if unset"""
+        value = self.get_meta(self.id_counter_key)
+        if value is not None:
+            return int(value)
+        highest = self.conn.execute(
+            f"SELECT MAX(CAST(id AS INTEGER)) FROM {self.table} "
+            "WHERE id != '' AND id NOT GLOB '*[^0-9]*'"
+        ).fetchone()[0]
+        return (highest or 0) + 1
+
+    def _bump_id_counter(self, record_id):
+        """Move the id counter past an id stored by any other means"""
+        if record_id and record_id >= self._next_free_id():
+            self._set_meta(self.id_counter_key, record_id + 1)
+
+    def allocate_id(self, floor=1):
+        """
+        Claim an integer id for a new record
+
+        The counter is read and bumped in one ``BEGIN IMMEDIATE``
+        transaction, so processes sharing the database never get the same
+        id, and ids are not reused after a delete.
+
+        Args:
+            floor: Lowest acceptable id, past ids the caller holds unflushed
+
+        Returns:
+            int: The id
+        """
+        with self._transaction(immediate=True):
+            value = max(self._next_free_id(), floor)
+            self._set_meta(self.id_counter_key, value + 1)
+        return value
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (key, str(value)),
+        )
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._set_meta(key, value)
+
+    def all(self):
+        """Return every record in insertion order"""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT data FROM {self.table} ORDER BY seq"
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, record_id):
+        """Return a single record by id, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT data FROM {self.table} WHERE id = ?", (self._key(record_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def upsert(self, record):
+        """Insert a record, or replace the stored copy if its id exists"""
+        self.upsert_many([record])
+
+    def upsert_many(self, records):
+        with self._transaction(immediate=True):
+            self._upsert_rows(records)
+            self._bump_version()
+
+    def delete(self, record_id):
+        """Delete a record by id"""
+        self.delete_many([record_id])
+
+    def delete_many(self, record_ids):
+        with self._transaction(immediate=True):
+            self.conn.executemany(
+                f"DELETE FROM {self.table} WHERE id = ?",
+                [(self._key(record_id),) for record_id in record_ids],
+            )
+            self._bump_version()
+
+    def replace_all(self, records):
+        """Replace the whole collection, e.g. after an import or reset"""
+        self.apply(records, [], reset=True)
+
+    def apply(self, upserts, deletes, reset=False, inserts=()):
+        """
+        Persist a batch of changes in one transaction
+
+        ``inserts`` are new records with ids from ``allocate_id``; unlike
+        ``upserts`` they never replace a stored record.
+
+        Returns:
+            int: Number of record bytes written
+
+        Raises:
+            DuplicateIdError: If an insert's id is already stored; nothing
+                of the batch is written
+        """
+        with self._transaction(immediate=True):
+            if reset:
+                self.conn.execute(f"DELETE FROM {self.table}")
+            if deletes:
+                self.conn.executemany(
+                    f"DELETE FROM {self.table} WHERE id = ?",
+                    [(self._key(record_id),) for record_id in deletes],
+                )
+            written = self._insert_rows(list(inserts)) + self._upsert_rows(upserts)
+            self._bump_version()
+            return written
+
+    def change_token(self):
+        """
+        Value that changes whenever another connection writes this table
+
+        Our own writes do not change it, so a cache can tell external edits
+        (another worker process) apart from its own flushes. Unlike
+        ``PRAGMA data_version`` it only follows this table's version in
+        ``meta``: the task and note stores share a database file, and
+        neither id allocation nor the other table's writes count.
+        """
+        with self._lock:
+            version = self._table_version()
+            if version != self._seen_version:
+                self._seen_version = version
+                self.external_version += 1
+            return self.external_version
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class TaskStore(SQLiteStore):
+    table = "tasks"
+    legacy_file = config.TASKS_FILE
+    legacy_key = "tasks"
+
+    def _column_ddl(self):
+        return "due_date TEXT, completed INTEGER NOT NULL DEFAULT 0"
+
+    def _columns(self, record):
+        completed = record.get("completed", False) or record.get("status") == "Completed"
+        return {"due_date": record.get("due_date") or None, "completed": int(bool(completed))}
+
+    def _create_schema(self):
+        super()._create_schema()
+        with self._lock:
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tasks_open_due "
+                "ON tasks (completed, due_date)"
+            )
+
+    def open_tasks_with_due_date(self):
+        """Return tasks that are not completed and have a due date"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT data FROM tasks WHERE completed = 0 AND due_date IS NOT NULL "
+                "ORDER BY due_date"
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+class NoteStore(SQLiteStore):
+    table = "notes"
+    legacy_file = config.NOTES_FILE
+    legacy_key = "notes"
+
+
+LEGACY_FILES = {"tasks": config.TASKS_FILE.name, "notes": config.NOTES_FILE.name}
+
+
+def create_store(kind, data_dir=None):
+    """
+    Open a task or note store for the configured backend
+
+    Each data directory must have only one open store per kind;
+    ``backend.shards`` keeps track of them.
+
+    Args:
+        kind: "tasks" or "notes"
+        data_dir: Directory holding the store's files (default: config.DATA_DIR)
+    """
+    data_dir = Path(data_dir or config.DATA_DIR)
+    legacy_file = data_dir / LEGACY_FILES[kind]
+    if config.STORAGE_BACKEND == "json":
+        from backend.journal import TaskJournalStore, NoteJournalStore
+
+        store_class = {"tasks": TaskJournalStore, "notes": NoteJournalStore}[kind]
+        return store_class(legacy_file)
+    if config.STORAGE_BACKEND == "file":
+        from backend.journal import TaskSnapshotStore, NoteSnapshotStore
+
+        store_class = {"tasks": TaskSnapshotStore, "notes": NoteSnapshotStore}[kind]
+        return store_class(legacy_file)
+    store_class = {"tasks": TaskStore, "notes": NoteStore}[kind]
+    return store_class(data_dir / config.DB_FILE.name, legacy_file)
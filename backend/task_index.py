@@ -0,0 +1,101 @@
+from bisect import bisect_left, insort
+from backend.recurrence import is_recurring
+
+
+def is_open_task(task):
+    """Whether a task still needs doing"""
+    return not task.get("completed", False) and task.get("status") != "Completed"
+
+
+class TaskIndex:
+    """
+    Secondary indexes over a task collection, maintained incrementally.
+
+    Hash indexes (dicts used as ordered sets of record keys) cover open
+    tasks, open tasks per priority and tasks per category. Two sorted lists
+    of ``(due_date, key)`` pairs, one for all tasks and one for open tasks,
+    answer date-range queries and counts with a binary search. Open
+    recurring tasks are kept apart in ``recurring``: their due date is only
+    the first occurrence, so they stay out of the date lists.
+
+    Attach it to a collection with ``RecordCollection.subscribe``.
+    """
+
+    def __init__(self):
+        self.on_reload([])
+
+    def on_reload(self, records):
+        self.open = {}
+        self.open_by_priority = {}
+        self.by_category = {}
+        self.recurring = {}
+        self.due_of = {}
+        self.all_due = []
+        self.open_due = []
+        for task in records:
+            self._add(task, bulk=True)
+        # Sort once rather than paying an insort per record
+        self.all_due.sort()
+        self.open_due.sort()
+
+    def on_change(self, old, new):
+        if old is not None:
+            self._remove(old)
+        if new is not None:
+            self._add(new)
+
+    def _add(self, task, bulk=False):
+        key = str(task["id"])
+        due_date = task.get("due_date") or None
+        is_open = is_open_task(task)
+
+        self.by_category.setdefault(task.get("category"), {})[key] = None
+        if is_open:
+            self.open[key] = None
+            self.open_by_priority.setdefault(task.get("priority"), {})[key] = None
+        if is_recurring(task):
+            if is_open:
+                self.recurring[key] = None
+        elif due_date:
+            self.due_of[key] = due_date
+            add = list.append if bulk else insort
+            add(self.all_due, (due_date, key))
+            if is_open:
+                add(self.open_due, (due_date, key))
+
+    def _remove(self, task):
+        key = str(task["id"])
+        self.by_category.get(task.get("category"), {}).pop(key, None)
+        self.open.pop(key, None)
+        self.open_by_priority.get(task.get("priority"), {}).pop(key, None)
+        self.recurring.pop(key, None)
+        due_date = self.due_of.pop(key, None)
+        if due_date:
+            self._discard(self.all_due, (due_date, key))
+            self._discard(self.open_due, (due_date, key))
+
+    @staticmethod
+    def _discard(entries, entry):
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+
+    def _range(self, start_day, end_day, include_completed):
+        entries = self.all_due if include_completed else self.open_due
+        # "\uffff" sorts after any time suffix, so date-times on end_day count
+        lo = bisect_left(entries, (start_day,))
+        hi = bisect_left(entries, (end_day + "\uffff",))
+        return entries, lo, hi
+
+    def keys_between(self, start_day, end_day, include_completed=False):
+        """Keys of tasks due from start_day to end_day inclusive, by due date"""
+        entries, lo, hi = self._range(start_day, end_day, include_completed)
+        return [key for _, key in entries[lo:hi]]
+
+    def count_between(self, start_day, end_day, include_completed=False):
+        _, lo, hi = self._range(start_day, end_day, include_completed)
+        return hi - lo
+
+    def count_before(self, day):
+        """Number of open tasks due before ``day``"""
+        return bisect_left(self.open_due, (day,))
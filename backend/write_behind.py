@@ -0,0 +1,129 @@
+import atexit
+import logging
+import threading
+import time
+import weakref
+import config
+
+logger = logging.getLogger("nikassistant.write_behind")
+
+
+class WriteBehindSaver:
+    """
+    Background thread that flushes dirty collections to their stores.
+
+    Mutations only mark a collection dirty. Every ``interval_ms`` the saver
+    drains each dirty collection and persists all of its changes in one
+    ``store.apply`` call, so a burst of edits costs a single write. Clean
+    collections are skipped entirely. Pending changes are flushed on stop
+    and at interpreter exit.
+    """
+
+    def __init__(self, interval_ms=None):
+        self.interval = (interval_ms or config.WRITE_BEHIND_INTERVAL_MS) / 1000
+        self._collections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._atexit_registered = False
+        self.thread = None
+        self.stats = {
+            "mutations": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "bytes_written": 0,
+            "total_flush_ms": 0.0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+        }
+
+    def register(self, collection):
+        """Track a collection and start the saver if needed"""
+        self._collections.add(collection)
+        self.start()
+        return collection
+
+    def start(self):
+        """Start the background flush thread"""
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self._stop_event.clear()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+        logger.info(f"Write-behind saver started ({self.interval * 1000:.0f} ms)")
+
+    def stop(self):
+        """Stop the thread and flush anything still pending"""
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self.flush_all()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush_all()
+
+    def flush_all(self):
+        for collection in list(self._collections):
+            self.flush(collection)
+
+    def flush(self, collection):
+        """
+        Persist one collection's pending changes, if any
+
+        Safe to call from any thread: the collection's ``flush_lock`` is
+        held from drain to apply, so a later batch never reaches the store
+        before an earlier one.
+        """
+        with collection.flush_lock:
+            self._flush(collection)
+
+    def _flush(self, collection):
+        batch = collection.drain_changes()
+        if batch is None:
+            return
+
+        start = time.perf_counter()
+        try:
+            written = collection.store.apply(
+                batch.upserts, batch.deletes, reset=batch.reset, inserts=batch.inserts
+            )
+        except Exception as e:
+            collection.restore(batch)
+            self.stats["flush_errors"] += 1
+            logger.error(f"Write-behind flush failed, will retry: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.stats["mutations"] += batch.mutations
+        self.stats["flushes"] += 1
+        self.stats["bytes_written"] += written or 0
+        self.stats["total_flush_ms"] += elapsed_ms
+        self.stats["last_flush_ms"] = elapsed_ms
+        self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed_ms)
+        logger.debug(
+            f"Flushed {batch.mutations} mutations "
+            f"({len(batch.inserts)} inserts, {len(batch.upserts)} upserts, "
+            f"{len(batch.deletes)} deletes) "
+            f"in {elapsed_ms:.1f} ms"
+        )
+
+    def get_stats(self):
+        """
+        Saver counters
+
+        ``flushes_avoided`` compares against writing once per mutation.
+        """
+        stats = dict(self.stats)
+        stats["flushes_avoided"] = stats["mutations"] - stats["flushes"]
+        stats["avg_flush_ms"] = (
+            stats["total_flush_ms"] / stats["flushes"] if stats["flushes"] else 0.0
+        )
+        return stats
+
+
+# Global instance
+saver = WriteBehindSaver()
@@ -0,0 +1,111 @@
+"""
+Benchmark reminder dispatch: a burst of simultaneous reminders across worker counts.
+
+Submits ``--burst`` reminders for ``--users`` users at once (everything
+due at 9:00 Monday) to a ReminderDispatcher with 1, 2, 4, ... worker
+processes and waits until all are sent. Each send renders the reminder
+email (CPU work) and then blocks for ``--io-ms`` like a desktop
+notification or SMTP round trip would. The first line is the old
+behaviour: every send in one thread.
+
+Reports throughput, speedup over one worker, the time ``submit`` spent
+blocked on full shard queues, and per-shard spread.
+
+Usage:
+    python benchmarks/bench_dispatch.py [--burst 100000] [--workers 1 2 4 8] [--io-ms 0.5]
+"""
+import argparse
+import functools
+import os
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.dispatch import ReminderDispatcher  # noqa: E402
+
+
+def render_email(task):
+    message = MIMEMultipart()
+    message["Subject"] = f"Reminder: {task['title']}"
+    message.attach(MIMEText(f"<h2>Task Reminder</h2><p>{task['title']} is due at 09:00 AM.</p>", "html"))
+    return message.as_string()
+
+
+def make_sender(io_ms):
+    def send(task):
+        render_email(task)
+        if io_ms:
+            time.sleep(io_ms / 1000)
+        return True
+    return send
+
+
+def make_burst(count, users):
+    return [
+        (f"user{i % users}", {"id": i, "title": f"Task {i}", "due_date": "2030-01-07T09:00:00"})
+        for i in range(count)
+    ]
+
+
+def bench_inline(burst, io_ms):
+    send = make_sender(io_ms)
+    start = time.perf_counter()
+    for _, task in burst:
+        send(task)
+    return time.perf_counter() - start
+
+
+def bench_workers(burst, workers, io_ms):
+    dispatcher = ReminderDispatcher(
+        workers=workers, sender_factory=functools.partial(make_sender, io_ms)
+    )
+    dispatcher.start()
+    # Warm up: workers import modules and build their sender first
+    for user_id, task in burst[:workers * dispatcher.batch_size]:
+        dispatcher.submit(user_id, task)
+    dispatcher.drain()
+    baseline = sum(dispatcher.sent)
+
+    start = time.perf_counter()
+    for user_id, task in burst:
+        dispatcher.submit(user_id, task)
+    dispatcher.drain()
+    elapsed = time.perf_counter() - start
+    stats = dispatcher.get_stats()
+    dispatcher.stop()
+    assert sum(s["sent"] for s in stats) - baseline == len(burst)
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--io-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    burst = make_burst(args.burst, args.users)
+    print(f"Burst of {args.burst:,} reminders for {args.users:,} users, "
+          f"{args.io_ms} ms blocking I/O per send, {os.cpu_count()} CPU cores")
+    inline_s = bench_inline(burst, args.io_ms)
+    print(f"  inline     {inline_s:8.2f} s   {args.burst / inline_s:10,.0f} reminders/s")
+
+    single_s = None
+    for workers in args.workers:
+        elapsed, stats = bench_workers(burst, workers, args.io_ms)
+        single_s = single_s or elapsed * workers / args.workers[0]
+        blocked = sum(s["blocked_seconds"] for s in stats)
+        per_shard = [s["sent"] for s in stats]
+        print(f"  {workers:2d} workers {elapsed:8.2f} s   {args.burst / elapsed:10,.0f} reminders/s   "
+              f"speedup {single_s / elapsed:5.2f}x   submit blocked {blocked:6.2f} s   "
+              f"shard sizes {min(per_shard):,}-{max(per_shard):,}   "
+              f"max latency {max(s['max_latency_ms'] for s in stats):,.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
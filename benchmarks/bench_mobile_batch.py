@@ -0,0 +1,94 @@
+"""
+Benchmark batched mobile notification delivery against a fake FCM server.
+
+Starts an HTTP server on localhost that stands in for FCM: it accepts a
+JSON list of messages per request, waits ``--rtt`` milliseconds to model
+the round trip to Google, and answers with one result per message. Then
+``--count`` notifications are sent through a MobileBatcher for each of
+``--batch-sizes``; batch size 1 is one request per notification, as
+``messaging.send`` used to make.
+
+Usage:
+    python benchmarks/bench_mobile_batch.py [--count 5000] [--batch-sizes 1 100 500] [--rtt 20]
+"""
+import argparse
+import http.client
+import http.server
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.mobile_batch import MobileBatcher  # noqa: E402
+
+
+class FakeFCM(http.server.BaseHTTPRequestHandler):
+    """Accepts every message of a batch after a simulated round trip"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        messages = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.rtt)
+        self.server.requests += 1
+        self.server.received += len(messages)
+        body = json.dumps([True] * len(messages)).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpTransport:
+    """MobileBatcher transport posting each batch to the fake FCM server"""
+
+    def __init__(self, port):
+        self.http = http.client.HTTPConnection("127.0.0.1", port)
+
+    def send_batch(self, messages):
+        self.http.request("POST", "/batch", body=json.dumps(messages).encode())
+        response = self.http.getresponse()
+        return json.loads(response.read())
+
+
+def run(count, batch_size, rtt):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FakeFCM)
+    server.rtt = rtt
+    server.requests = server.received = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    batcher = MobileBatcher(HttpTransport(server.server_address[1]), max_batch=batch_size)
+
+    start = time.perf_counter()
+    futures = [batcher.submit(f"Task {i}", "is due") for i in range(count)]
+    batcher.flush()
+    sent = sum(future.result() for future in futures)
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    server.shutdown()
+
+    assert sent == server.received == count, (sent, server.received)
+    print(f"  batch {batch_size:4d}   {elapsed:7.2f} s   {count / elapsed:9,.0f} notifications/s   "
+          f"{server.requests:6,} requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=5_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 500])
+    parser.add_argument("--rtt", type=float, default=20, help="Simulated round trip (ms)")
+    args = parser.parse_args()
+
+    print(f"{args.count:,} mobile notifications, {args.rtt:g} ms per FCM request")
+    for batch_size in args.batch_sizes:
+        run(args.count, batch_size, args.rtt / 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark SmartNotifier delivery through the durable outbox.
+
+Starts a fake SMTP server and a fake batch push endpoint (HTTP) on localhost,
+then queues ``--count`` notifications for the email and mobile channels
+and times how long the notifier takes until the outbox is empty. The push
+sink rejects ``--fail-rate`` of the messages, so part of the sends go
+through retry with backoff (shortened to milliseconds here).
+
+Runs once per ``--batch-sizes`` value: the notifier acknowledges a whole
+batch of sends in one outbox commit, so batch size 1 is the cost of a
+commit per notification.
+
+Usage:
+    python benchmarks/bench_outbox.py [--count 5000] [--batch-sizes 1 100 500] [--fail-rate 0.05]
+"""
+import argparse
+import http.client
+import http.server
+import json
+import random
+import smtplib
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+
+
+class SMTPSink(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept and discard messages"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 sink ready")
+        in_data = False
+        for raw in self.rfile:
+            line = raw.rstrip(b"\r\n")
+            if in_data:
+                if line == b".":
+                    in_data = False
+                    self.server.received += 1
+                    self.reply("250 queued")
+                continue
+            command = line[:4].upper()
+            if command == b"DATA":
+                in_data = True
+                self.reply("354 go ahead")
+            elif command == b"QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class PushSink(http.server.BaseHTTPRequestHandler):
+    """Accepts batches of push messages, failing a fraction of them"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        messages = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        results = [random.random() >= self.server.fail_rate for _ in messages]
+        self.server.received += sum(results)
+        body = json.dumps(results).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SinkEmailService:
+    """EmailService stand-in holding one SMTP session to the sink"""
+
+    def __init__(self, port):
+        self.email = self.password = "bench"
+        self.smtp = smtplib.SMTP("127.0.0.1", port)
+
+    def send_email(self, to_email=None, subject="", body="", dedup=True):
+        self.smtp.sendmail("bench@localhost", ["bench@localhost"],
+                           f"Subject: {subject}\r\n\r\n{body}".encode())
+        return True
+
+
+class PushTransport:
+    """MobileBatcher transport posting each batch to the push sink"""
+
+    def __init__(self, port):
+        self.http = http.client.HTTPConnection("127.0.0.1", port)
+
+    def send_batch(self, messages):
+        self.http.request("POST", "/push", body=json.dumps(messages).encode())
+        response = self.http.getresponse()
+        return json.loads(response.read())
+
+
+class SinkPushService:
+    """NotificationService stand-in batching mobile notifications to the sink"""
+
+    firebase_available = True
+
+    def __init__(self, port):
+        from backend.mobile_batch import MobileBatcher
+
+        self.mobile_batcher = MobileBatcher(PushTransport(port))
+
+    def send_desktop_notification(self, title, message, timeout=10, dedup=True):
+        return True
+
+    def submit_mobile_notification(self, title, message, topic="all_users", dedup=True):
+        return self.mobile_batcher.submit(title, message, topic)
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def run(count, batch_size, fail_rate, directory):
+    from backend.outbox import NotificationOutbox
+    from utils.notifier import SmartNotifier
+
+    smtp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPSink)
+    smtp.received = 0
+    push = http.server.ThreadingHTTPServer(("127.0.0.1", 0), PushSink)
+    push.received = 0
+    push.fail_rate = fail_rate
+
+    unlimited = {"desktop": 1e9, "email": 1e9, "mobile": 1e9}
+    notifier = SmartNotifier(
+        batch_size=batch_size, coalesce_seconds=0, rate_limits=unlimited,
+        outbox=NotificationOutbox(Path(directory) / f"outbox-{batch_size}.db"),
+    )
+    notifier.email_service = SinkEmailService(serve(smtp))
+    notifier.notification_service = SinkPushService(serve(push))
+
+    start = time.perf_counter()
+    for i in range(count):
+        notifier.add_notification(f"Task {i}", "is due", desktop=False, email=True, mobile=True)
+    queued_s = time.perf_counter() - start
+    notifier.start()
+    while notifier.outbox.count():
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    notifier.stop()
+    notifier.notification_service.mobile_batcher.close()
+    smtp.shutdown()
+    push.shutdown()
+
+    stats = notifier.get_stats()
+    assert smtp.received == count and push.received == count, (smtp.received, push.received)
+    print(f"  batch {batch_size:4d}   {elapsed:6.2f} s   {count / elapsed:8,.0f} notifications/s   "
+          f"enqueue {count / queued_s:8,.0f}/s   "
+          f"push retries {stats['retried']['mobile']:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=5_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 500])
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    config.NOTIFY_RETRY_BASE_SECONDS = 0.005
+    config.NOTIFY_RETRY_MAX_SECONDS = 0.05
+    config.NOTIFY_MAX_ATTEMPTS = 100
+    print(f"{args.count:,} notifications on email and mobile, "
+          f"{args.fail_rate:.0%} of push messages failing")
+    with tempfile.TemporaryDirectory() as directory:
+        for batch_size in args.batch_sizes:
+            run(args.count, batch_size, args.fail_rate, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark memory and date queries: task dicts vs packed completed tasks.
+
+Builds synthetic archived tasks in the tasks.json schema and holds them
+the way a TaskCollection does: a dict of task dicts (PACK_COMPLETED_TASKS
+off) or a PackedRecords mapping with the completed tasks in a columnar
+TaskTable (on). Measures the memory each holds with tracemalloc, checks
+every task reads back exactly, and times a query for completed tasks due
+before a cutoff (string comparisons over dicts vs a vectorized comparison
+over epoch microseconds).
+
+Usage:
+    python benchmarks/bench_records.py [--tasks 500000]
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.records import PackedRecords, TaskTable  # noqa: E402
+from backend.task_index import is_open_task  # noqa: E402
+
+
+def make_tasks(count):
+    rng = random.Random(7)
+    # From midnight, so two calls on the same day build the same tasks
+    start = datetime.combine(date.today(), datetime.min.time()) - timedelta(days=3 * 365)
+    tasks = []
+    for i in range(1, count + 1):
+        created = start + timedelta(seconds=rng.randrange(3 * 365 * 86400))
+        due = created.date() + timedelta(days=rng.randrange(30))
+        task = {
+            "id": i,
+            "title": f"Archived task number {i}",
+            "description": "",
+            "priority": rng.choice(["Low", "Medium", "High"]),
+            "due_date": due.strftime("%Y-%m-%d"),
+            "completed": rng.random() < 0.9,
+            "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if task["completed"]:
+            task["completed_at"] = (created + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+        tasks.append(task)
+    return tasks
+
+
+def measure(build):
+    """Build something and return it with the bytes it still holds"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, held, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=500_000)
+    args = parser.parse_args()
+
+    dicts, dict_bytes, _ = measure(
+        lambda: {str(t["id"]): t for t in make_tasks(args.tasks)}
+    )
+    packed, packed_bytes, build_s = measure(lambda: PackedRecords(
+        TaskTable,
+        lambda task: not is_open_task(task),
+        ((str(t["id"]), t) for t in make_tasks(args.tasks)),
+    ))
+
+    start = time.perf_counter()
+    assert all(packed[key] == task for key, task in dicts.items())
+    roundtrip_s = time.perf_counter() - start
+
+    cutoff = (date.today() - timedelta(days=365)).isoformat()
+    start = time.perf_counter()
+    old_dicts = sum(
+        1 for t in dicts.values()
+        if t.get("due_date") and t["due_date"] < cutoff and t.get("completed", False)
+    )
+    dict_query_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    table = packed.table
+    mask = table.due_before_mask(cutoff) & table.completed_mask() & packed.live_mask()
+    old_table = int(mask.sum())
+    table_query_ms = (time.perf_counter() - start) * 1000
+    assert old_dicts == old_table
+
+    print(f"Tasks:                  {args.tasks:,} ({packed.packed:,} completed, packed)")
+    print(f"Dicts in memory:        {dict_bytes / 2**20:8.1f} MiB")
+    print(f"Packed in memory:       {packed_bytes / 2**20:8.1f} MiB  ({dict_bytes / packed_bytes:.1f}x smaller)")
+    print(f"Packing:                {build_s:8.2f} s, round-trip check {roundtrip_s:.2f} s")
+    print(f"Archive query, dicts:   {dict_query_ms:8.1f} ms")
+    print(f"Archive query, table:   {table_query_ms:8.1f} ms  ({old_table:,} completed before {cutoff})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark TaskScheduler with many reminders in virtual time.
+
+For each size, a child process points the data directory at a temporary
+folder, loads ``N`` open tasks with a 30-minute reminder due over the next
+``--days`` days, and starts a TaskScheduler on a VirtualClock with
+recording email and notification services. It times scheduling all
+reminders (the scheduler's first sync), then advances the clock to the
+end of the window, firing every reminder and overdue notice on the way.
+
+Reports scheduling throughput, memory per reminder (process RSS and the
+reminders.db size), firing throughput, how late reminders fired in
+simulated time and the real time from the clock reaching a reminder to it
+being handed to the notification service.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--sizes 10000 100000 1000000] [--days 7] [--step 0]
+"""
+import argparse
+import os
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import config  # noqa: E402
+
+USER = "bench"
+
+
+def rss_bytes():
+    """Current resident set size (peak on platforms without /proc)"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_one(count, days, step, directory):
+    # Keep every file of the run in the temporary directory
+    data_dir = Path(directory)
+    config.DATA_DIR = data_dir
+    config.USERS_DIR = data_dir / "users"
+    config.DB_FILE = data_dir / "nikassistant.db"
+    config.REMINDERS_DB = data_dir / "reminders.db"
+    config.EMAIL_USER = None
+    config.ALLOWED_USERS = {USER}
+
+    from backend.shards import shards  # noqa: E402
+    from backend.scheduler import TaskScheduler  # noqa: E402
+    from backend.simulation import (  # noqa: E402
+        RecordingEmailService,
+        RecordingNotificationService,
+        VirtualClock,
+        run_until,
+    )
+
+    clock = VirtualClock(datetime(2030, 1, 1))
+    rng = random.Random(7)
+    expected = {}
+    tasks = []
+    for i in range(1, count + 1):
+        due = clock.now + timedelta(hours=1, seconds=rng.randrange(days * 86400))
+        expected[f"Task {i}"] = due - timedelta(minutes=30)
+        tasks.append({
+            "id": i,
+            "title": f"Task {i}",
+            "due_date": due.isoformat(),
+            "reminder": 30,
+            "status": "Pending",
+            "priority": "Medium",
+        })
+    shards.get(USER).tasks.upsert_many(tasks)
+    del tasks
+
+    notifications = RecordingNotificationService(clock)
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    scheduler = TaskScheduler(
+        clock=clock,
+        email_service=RecordingEmailService(clock),
+        notification_service=notifications,
+    )
+    scheduler.lead()
+    schedule_s = time.perf_counter() - start
+    rss_per_job = (rss_bytes() - rss_before) / count
+    db_bytes = sum(
+        os.path.getsize(path) for path in data_dir.glob("reminders.db*")
+    )
+
+    start = time.perf_counter()
+    fired = run_until(scheduler, clock, clock.now + timedelta(days=days, hours=2), step=step or None)
+    fire_s = time.perf_counter() - start
+
+    late = []
+    wall = []
+    for moment, real, title, message in notifications.sent:
+        if title != "Task Reminder":
+            continue
+        match = re.match(r"Task '(.+)' is due", message)
+        late.append((moment - expected[match.group(1)]).total_seconds())
+        wall.append(real * 1000)
+
+    print(f"\n{count:,} reminders ({days} days, {'step ' + str(step) + ' s' if step else 'event-driven'})")
+    print(f"  Schedule:     {schedule_s:8.2f} s   {count / schedule_s:10,.0f} reminders/s")
+    print(f"  Memory:       {rss_per_job:8.0f} B RSS per reminder, {db_bytes / count:.0f} B on disk")
+    print(f"  Fire:         {fire_s:8.2f} s   {fired / fire_s:10,.0f} events/s "
+          f"({len(late):,} reminders, {fired - len(late):,} due dates)")
+    print(f"  Lateness:     simulated max {max(late):.1f} s, mean {statistics.mean(late):.1f} s; "
+          f"real p50 {percentile(wall, 0.5):.3f} ms, p99 {percentile(wall, 0.99):.3f} ms")
+    scheduler.reminders.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--step", type=float, default=0,
+                        help="seconds per clock tick; 0 jumps to each next due time")
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        with tempfile.TemporaryDirectory() as directory:
+            run_one(args.one, args.days, args.step, directory)
+        return
+    # One process per size, so sizes don't share memory or global registries
+    for count in args.sizes:
+        subprocess.run(
+            [sys.executable, __file__, "--one", str(count), "--days", str(args.days),
+             "--step", str(args.step)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark pooled SMTP sessions against a connection per email.
+
+Starts an aiosmtpd server with AUTH on localhost that waits ``--rtt``
+milliseconds before answering EHLO, MAIL, RCPT and DATA, to model the
+round trips to a remote server (the greeting and AUTH answer at once).
+Then sends ``--count`` emails from ``--workers`` threads, first opening
+and logging in a new session for each one (what EmailService used to
+do), then through an SMTPPool. STARTTLS is left out, so the real savings
+also include a TLS handshake per email.
+
+Needs aiosmtpd (pip install aiosmtpd).
+
+Usage:
+    python benchmarks/bench_smtp_pool.py [--count 500] [--workers 4] [--rtt 20]
+"""
+import argparse
+import asyncio
+import logging
+import smtplib
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.smtp_pool import SMTPPool  # noqa: E402
+
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+except ImportError:
+    sys.exit("This benchmark needs aiosmtpd: pip install aiosmtpd")
+
+
+class SlowSink:
+    """aiosmtpd handler that counts messages, answering after a round trip"""
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.rtt)
+        session.host_name = hostname
+        return responses
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        await asyncio.sleep(self.rtt)
+        envelope.mail_from = address
+        envelope.mail_options.extend(mail_options)
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        await asyncio.sleep(self.rtt)
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.rtt)
+        self.received += 1
+        return "250 Message accepted"
+
+
+def accept_all(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_message(i):
+    message = MIMEText(f"<p>Task {i} is due</p>", "html")
+    message["From"] = message["To"] = "bench@localhost"
+    message["Subject"] = f"Task {i}"
+    return message
+
+
+def send_per_connection(port, message):
+    with smtplib.SMTP("127.0.0.1", port) as server:
+        server.login("bench", "bench")
+        server.send_message(message)
+
+
+def run(label, count, workers, send):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        list(executor.map(send, (make_message(i) for i in range(count))))
+    elapsed = time.perf_counter() - start
+    print(f"  {label:16s} {elapsed:7.2f} s   {count / elapsed:8,.0f} emails/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rtt", type=float, default=20, help="Simulated round trip (ms)")
+    args = parser.parse_args()
+
+    logging.getLogger("mail.log").setLevel(logging.ERROR)
+    sink = SlowSink(args.rtt / 1000)
+    port = free_port()
+    controller = Controller(sink, hostname="127.0.0.1", port=port,
+                            authenticator=accept_all, auth_require_tls=False)
+    controller.start()
+    print(f"{args.count:,} emails from {args.workers} threads, {args.rtt:g} ms per SMTP reply")
+    try:
+        run("per connection", args.count, args.workers, lambda m: send_per_connection(port, m))
+        pool = SMTPPool("127.0.0.1", port, "bench", "bench", size=args.workers, starttls=False)
+        run("pooled", args.count, args.workers, pool.send_message)
+        print(f"  pool: {pool.get_stats()}")
+        pool.close()
+    finally:
+        controller.stop()
+    assert sink.received == 2 * args.count, sink.received
+
+
+if __name__ == "__main__":
+    main()
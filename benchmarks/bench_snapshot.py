@@ -0,0 +1,91 @@
+"""
+Benchmark cold start: JSON snapshot vs the binary snapshot.
+
+Writes synthetic tasks the way the json/file backends do (an indented
+tasks.json plus its tasks.bin copy), then times loading each file and a
+full TaskJournalStore start with binary snapshots off and on. Each timing
+is the best of ``--repeat`` runs.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--sizes 10000 100000 1000000] [--repeat 3]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from backend.journal import TaskJournalStore, atomic_write_json  # noqa: E402
+from backend.snapshot import binary_snapshot_path, read_snapshot, write_snapshot  # noqa: E402
+from bench_records import make_tasks  # noqa: E402
+
+
+def best_of(repeat, load):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = load()
+        timings.append(time.perf_counter() - start)
+        del result
+    return min(timings)
+
+
+def open_store(path, binary):
+    config.BINARY_SNAPSHOTS = binary
+    store = TaskJournalStore(path)
+    store.close()
+    return store
+
+
+def bench(count, repeat, directory):
+    json_path = os.path.join(directory, f"tasks_{count}.json")
+    bin_path = binary_snapshot_path(json_path)
+    tasks = make_tasks(count)
+
+    start = time.perf_counter()
+    atomic_write_json(json_path, {"tasks": tasks})
+    json_write_s = time.perf_counter() - start
+    start = time.perf_counter()
+    write_snapshot(bin_path, tasks, {}, json_path)
+    bin_write_s = time.perf_counter() - start
+    del tasks
+
+    def load_json():
+        with open(json_path) as file:
+            return json.load(file)
+
+    json_load_s = best_of(repeat, load_json)
+    bin_load_s = best_of(repeat, lambda: read_snapshot(bin_path, json_path))
+    json_store_s = best_of(repeat, lambda: open_store(json_path, False))
+    bin_store_s = best_of(repeat, lambda: open_store(json_path, True))
+
+    print(f"\n{count:,} tasks")
+    print(f"  File size:    JSON {os.path.getsize(json_path) / 2**20:8.1f} MiB   "
+          f"binary {os.path.getsize(bin_path) / 2**20:8.1f} MiB")
+    print(f"  Write:        JSON {json_write_s * 1000:8.1f} ms   binary {bin_write_s * 1000:8.1f} ms")
+    print(f"  Parse:        JSON {json_load_s * 1000:8.1f} ms   binary {bin_load_s * 1000:8.1f} ms  "
+          f"({json_load_s / bin_load_s:.1f}x)")
+    print(f"  Store start:  JSON {json_store_s * 1000:8.1f} ms   binary {bin_store_s * 1000:8.1f} ms  "
+          f"({json_store_s / bin_store_s:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.sizes:
+            bench(count, args.repeat, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark the task render path: linear scans vs the TaskIndex.
+
+Builds a collection of synthetic tasks and times the queries one render
+of the dashboard, task panel and calendar makes, first the old way
+(scanning the full list) and then through the indexed TaskCollection.
+
+Usage:
+    python benchmarks/bench_task_index.py [--tasks 100000] [--repeat 20]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.collection import TaskCollection  # noqa: E402
+from backend.journal import TaskSnapshotStore  # noqa: E402
+
+
+def make_tasks(count):
+    rng = random.Random(42)
+    start = date.today() - timedelta(days=365)
+    tasks = []
+    for i in range(1, count + 1):
+        tasks.append({
+            "id": i,
+            "title": f"Task {i}",
+            "priority": rng.choice(["Low", "Medium", "High"]),
+            "category": rng.choice(["Work", "Personal", "Health", "Other"]),
+            "due_date": (start + timedelta(days=rng.randrange(730))).isoformat(),
+            "completed": rng.random() < 0.6,
+        })
+    return tasks
+
+
+def render_linear(tasks, today, month, upcoming_end):
+    """The queries one render made before the index existed"""
+    total = len(tasks)
+    completed = sum(1 for t in tasks if t.get("completed", False))
+    due_today = sum(1 for t in tasks if t.get("due_date") == today and not t.get("completed", False))
+    overdue = sum(1 for t in tasks if t.get("due_date") and t.get("due_date") < today and not t.get("completed", False))
+    active = [t for t in tasks if not t.get("completed", False)]
+    by_priority = [[t for t in active if t.get("priority") == p] for p in ("High", "Medium", "Low")]
+    month_tasks = [t for t in tasks if t.get("due_date", "").startswith(month)]
+    upcoming = [t for t in active if today <= t.get("due_date", "") <= upcoming_end]
+    found = next((t for t in tasks if t.get("id") == len(tasks) // 2), None)
+    return total, completed, due_today, overdue, by_priority, month_tasks, upcoming, found
+
+
+def render_indexed(tasks, today, year, month, upcoming_end):
+    """The same queries through the TaskCollection indexes"""
+    total = len(tasks)
+    completed = tasks.completed_count()
+    due_today = tasks.count_due_on(today)
+    overdue = tasks.count_overdue(today)
+    by_priority = [tasks.open_by_priority(p) for p in ("High", "Medium", "Low")]
+    month_tasks = tasks.in_month(year, month)
+    upcoming = tasks.due_between(today, upcoming_end)
+    found = tasks.get(len(tasks) // 2)
+    return total, completed, due_today, overdue, by_priority, month_tasks, upcoming, found
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    records = make_tasks(args.tasks)
+    store = TaskSnapshotStore(Path(tempfile.mkdtemp()) / "tasks.json")
+    collection = TaskCollection(store)
+
+    start = time.perf_counter()
+    collection.replace_all([dict(t) for t in records])
+    build_ms = (time.perf_counter() - start) * 1000
+
+    today = date.today()
+    today_str = today.isoformat()
+    upcoming_end = (today + timedelta(days=7)).isoformat()
+    month = today.strftime("%Y-%m")
+
+    linear_ms, linear = timed(
+        lambda: render_linear(records, today_str, month, upcoming_end), args.repeat
+    )
+    indexed_ms, indexed = timed(
+        lambda: render_indexed(collection, today_str, today.year, today.month, upcoming_end),
+        args.repeat,
+    )
+    counts_ms, _ = timed(
+        lambda: (
+            collection.completed_count(),
+            collection.count_due_on(today_str),
+            collection.count_overdue(today_str),
+        ),
+        args.repeat,
+    )
+    assert linear[:4] == indexed[:4], (linear[:4], indexed[:4])
+    assert len(linear[5]) == len(indexed[5]) and len(linear[6]) == len(indexed[6])
+
+    start = time.perf_counter()
+    for i in range(1, 1001):
+        collection.update(i, completed=not collection.get(i)["completed"])
+    mutation_us = (time.perf_counter() - start) / 1000 * 1_000_000
+
+    print(f"Tasks:                 {args.tasks:,}")
+    print(f"Index build:           {build_ms:9.1f} ms")
+    print(f"Render path, linear:   {linear_ms:9.3f} ms")
+    print(f"Render path, indexed:  {indexed_ms:9.3f} ms  ({linear_ms / indexed_ms:,.0f}x faster)")
+    print(f"  of which counts:     {counts_ms:9.3f} ms  (the rest is copying out the k results)")
+    print(f"Update with reindex:   {mutation_us:9.1f} us per mutation")
+
+
+if __name__ == "__main__":
+    main()
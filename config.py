@@ -17,14 +17,23 @@ DATA_DIR.mkdir(exist_ok=True)
 LOGS_DIR.mkdir(exist_ok=True)
 
 # Configure logging
-logging.basicConfig(
-    level=logging.DEBUG if os.getenv("DEBUG") == "True" else logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOGS_DIR / "app.log"),
-        logging.StreamHandler()
-    ]
-)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def setup_logging(format=LOG_FORMAT, force=False):
+    """Log to logs/app.log and the console; ``force`` replaces existing handlers"""
+    logging.basicConfig(
+        level=logging.DEBUG if os.getenv("DEBUG") == "True" else logging.INFO,
+        format=format,
+        handlers=[
+            logging.FileHandler(LOGS_DIR / "app.log"),
+            logging.StreamHandler()
+        ],
+        force=force,
+    )
+
+
+setup_logging()
 logger = logging.getLogger("nikassistant")
 
 # Data files
@@ -32,6 +41,69 @@ TASKS_FILE = DATA_DIR / "tasks.json"
 NOTES_FILE = DATA_DIR / "notes.json"
 CALENDAR_FILE = DATA_DIR / "calendar.json"
 
+# Storage backend for tasks and notes:
+#   sqlite - SQLite database in WAL mode (migrated once from the JSON files)
+#   json   - the JSON files as snapshots plus an append-only journal
+#   file   - the JSON files alone, rewritten atomically on each flush
+STORAGE_BACKEND = os.getenv("DATABASE_TYPE", "sqlite")
+DB_FILE = DATA_DIR / "nikassistant.db"
+
+# Journal size at which the json backend folds it into a new snapshot
+JOURNAL_COMPACT_BYTES = int(os.getenv("JOURNAL_COMPACT_BYTES", 1024 * 1024))
+
+# Write a binary copy of each JSON snapshot (json/file backends) and load
+# it instead of the JSON file on startup while it is current
+BINARY_SNAPSHOTS = os.getenv("BINARY_SNAPSHOTS", "True") == "True"
+
+# Keep completed tasks in memory as rows of a columnar table rather than
+# dicts; a large archive then takes several times less memory
+PACK_COMPLETED_TASKS = os.getenv("PACK_COMPLETED_TASKS", "True") == "True"
+
+# How often dirty task/note collections are flushed to the store
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", 200))
+
+# Pending reminders, kept across restarts
+REMINDERS_DB = DATA_DIR / "reminders.db"
+# Reminders missed while the app was down are still delivered if they are
+# at most this late; with coalescing they arrive as a single digest
+REMINDER_MISFIRE_GRACE_SECONDS = int(os.getenv("REMINDER_MISFIRE_GRACE_SECONDS", 3600))
+REMINDER_COALESCE = os.getenv("REMINDER_COALESCE", "True") == "True"
+# Tasks that become overdue within this many seconds of the first one are
+# reported together, in one notification per user
+OVERDUE_BATCH_SECONDS = int(os.getenv("OVERDUE_BATCH_SECONDS", 60))
+
+# Reminders can be sent from this many worker processes, each owning the
+# users that hash to it. The default 0 sends them from the scheduler's own
+# thread; set it for deployments with many users. A worker holds at most
+# DISPATCH_QUEUE_BATCHES batches of DISPATCH_BATCH_SIZE reminders; beyond
+# that the scheduler waits for it.
+DISPATCH_WORKERS = int(os.getenv("DISPATCH_WORKERS", 0))
+DISPATCH_QUEUE_BATCHES = int(os.getenv("DISPATCH_QUEUE_BATCHES", 64))
+DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", 100))
+
+# Only one worker process runs the scheduler: the one holding this lock.
+# The others retry every LEADER_RETRY_SECONDS and take over if it exits.
+SCHEDULER_LOCK_FILE = DATA_DIR / "scheduler.lock"
+LEADER_RETRY_SECONDS = int(os.getenv("LEADER_RETRY_SECONDS", 5))
+# How often the leader picks up task changes made by other worker processes
+# to the shards it has loaded
+SCHEDULER_SYNC_SECONDS = int(os.getenv("SCHEDULER_SYNC_SECONDS", 30))
+
+# Per-user data shards. The default user's data stays in DATA_DIR; every
+# other user gets DATA_DIR/users/<user id>/ with the same files.
+USERS_DIR = DATA_DIR / "users"
+DEFAULT_USER = os.getenv("DEFAULT_USER", "default")
+# Users besides the default one who may get a shard (comma separated).
+# Users whose directory already exists are allowed too; any other
+# ?user= value is refused rather than given a new directory.
+ALLOWED_USERS = {u.strip() for u in os.getenv("ALLOWED_USERS", "").split(",") if u.strip()}
+# Users whose data may stay loaded at once; the least recently used
+# idle shards beyond this are flushed and unloaded
+MAX_LOADED_SHARDS = int(os.getenv("MAX_LOADED_SHARDS", 16))
+# Seconds without a session asking for a shard before it counts as idle.
+# Shards in use are never evicted, even past MAX_LOADED_SHARDS.
+SHARD_IDLE_SECONDS = int(os.getenv("SHARD_IDLE_SECONDS", 300))
+
 # Initialize default data files if they don't exist
 def init_data_files():
     # Tasks JSON structure
@@ -54,6 +126,12 @@ def init_data_files():
 # Email configuration
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS")
+# Emails go out on up to SMTP_POOL_SIZE logged-in SMTP sessions kept open
+# between sends. A session idle for SMTP_IDLE_TIMEOUT seconds is closed, and
+# one idle for SMTP_HEALTH_CHECK_SECONDS is checked with NOOP before reuse.
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", 120))
+SMTP_HEALTH_CHECK_SECONDS = float(os.getenv("SMTP_HEALTH_CHECK_SECONDS", 15))
 
 # Google Calendar API
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -62,6 +140,49 @@ GOOGLE_CALENDAR_ID = os.getenv("GOOGLE_CALENDAR_ID", "primary")
 # Firebase (Optional)
 FIREBASE_SERVICE_ACCOUNT_KEY = os.getenv("FIREBASE_SERVICE_ACCOUNT_KEY")
 
+# SmartNotifier: notifications of the same type within this many seconds
+# after the first are folded into one digest (0 disables coalescing)
+NOTIFY_COALESCE_SECONDS = float(os.getenv("NOTIFY_COALESCE_SECONDS", 10))
+# Sends per minute allowed on each channel, with bursts of NOTIFY_BURST
+NOTIFY_RATE_LIMITS = {
+    "desktop": float(os.getenv("NOTIFY_DESKTOP_PER_MINUTE", 12)),
+    "email": float(os.getenv("NOTIFY_EMAIL_PER_MINUTE", 6)),
+    "mobile": float(os.getenv("NOTIFY_MOBILE_PER_MINUTE", 30)),
+}
+NOTIFY_BURST = int(os.getenv("NOTIFY_BURST", 3))
+# Notifications not yet delivered on every channel, kept across restarts.
+# A failed channel is retried after NOTIFY_RETRY_BASE_SECONDS, doubling up
+# to NOTIFY_RETRY_MAX_SECONDS, and given up after NOTIFY_MAX_ATTEMPTS.
+NOTIFY_OUTBOX_DB = DATA_DIR / "outbox.db"
+NOTIFY_RETRY_BASE_SECONDS = float(os.getenv("NOTIFY_RETRY_BASE_SECONDS", 5))
+NOTIFY_RETRY_MAX_SECONDS = float(os.getenv("NOTIFY_RETRY_MAX_SECONDS", 900))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", 8))
+# Each run of the notifier holds a lease on the notifications it added,
+# renewed every third of this many seconds. Another run takes them over
+# once the lease expires (sooner if the owner is known to be gone).
+NOTIFY_OUTBOX_LEASE_SECONDS = float(os.getenv("NOTIFY_OUTBOX_LEASE_SECONDS", 60))
+# A notification's channels are sent concurrently, each from its own pool
+# of this many threads; a channel taking longer than its timeout (seconds)
+# counts as failed
+NOTIFY_CHANNEL_WORKERS = {
+    "desktop": int(os.getenv("NOTIFY_DESKTOP_WORKERS", 2)),
+    "email": int(os.getenv("NOTIFY_EMAIL_WORKERS", 4)),
+    "mobile": int(os.getenv("NOTIFY_MOBILE_WORKERS", 4)),
+}
+NOTIFY_CHANNEL_TIMEOUTS = {
+    "desktop": float(os.getenv("NOTIFY_DESKTOP_TIMEOUT", 5)),
+    "email": float(os.getenv("NOTIFY_EMAIL_TIMEOUT", 30)),
+    "mobile": float(os.getenv("NOTIFY_MOBILE_TIMEOUT", 10)),
+}
+# Mobile notifications wait up to NOTIFY_MOBILE_BATCH_WINDOW seconds to be
+# sent to FCM together, at most NOTIFY_MOBILE_BATCH_SIZE (500) per request
+NOTIFY_MOBILE_BATCH_WINDOW = float(os.getenv("NOTIFY_MOBILE_BATCH_WINDOW", 0.05))
+NOTIFY_MOBILE_BATCH_SIZE = int(os.getenv("NOTIFY_MOBILE_BATCH_SIZE", 500))
+# Identical notifications (same channel, title, message and recipient) are
+# sent at most once per NOTIFY_DEDUP_TTL_SECONDS (0 sends every one)
+NOTIFY_DEDUP_TTL_SECONDS = float(os.getenv("NOTIFY_DEDUP_TTL_SECONDS", 6 * 3600))
+NOTIFY_DEDUP_MAX_ENTRIES = int(os.getenv("NOTIFY_DEDUP_MAX_ENTRIES", 10000))
+
 # App configuration
 APP_PORT = int(os.getenv("APP_PORT", 8501))
 DEBUG = os.getenv("DEBUG", "False") == "True"
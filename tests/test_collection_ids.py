@@ -0,0 +1,79 @@
+import multiprocessing
+
+import pytest
+
+from backend.collection import RecordCollection
+from backend.journal import TaskJournalStore, TaskSnapshotStore
+from backend.storage import DuplicateIdError, TaskStore
+
+STORES = {
+    "sqlite": lambda path: TaskStore(path / "tasks.db", path / "none.json"),
+    "journal": lambda path: TaskJournalStore(path / "tasks.json"),
+    "snapshot": lambda path: TaskSnapshotStore(path / "tasks.json"),
+}
+
+
+def _allocate_ids(kind, path, count, results):
+    store = STORES[kind](path)
+    collection = RecordCollection(store)
+    ids = []
+    for _ in range(count):
+        record_id = collection.next_id()
+        collection.add({"id": record_id, "title": f"task {record_id}"})
+        ids.append(record_id)
+    store.apply(*_drain(collection))
+    store.close()
+    results.put(ids)
+
+
+def _drain(collection):
+    batch = collection.drain_changes()
+    return batch.upserts, batch.deletes, batch.reset, batch.inserts
+
+
+@pytest.mark.parametrize("kind", STORES)
+def test_two_processes_never_get_the_same_id(tmp_path, kind):
+    STORES[kind](tmp_path).close()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [
+        context.Process(target=_allocate_ids, args=(kind, tmp_path, 50, results))
+        for _ in range(2)
+    ]
+    for process in processes:
+        process.start()
+    ids = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    assert not set(ids[0]) & set(ids[1])
+    store = STORES[kind](tmp_path)
+    assert sorted(r["id"] for r in store.all()) == sorted(ids[0] + ids[1])
+    store.close()
+
+
+@pytest.mark.parametrize("kind", STORES)
+def test_ids_are_not_reused_after_delete(tmp_path, kind):
+    store = STORES[kind](tmp_path)
+    collection = RecordCollection(store)
+    first = collection.next_id()
+    collection.add({"id": first})
+    store.apply(*_drain(collection))
+    collection.remove(first)
+    store.apply(*_drain(collection))
+
+    assert RecordCollection(store).next_id() > first
+    store.close()
+
+
+@pytest.mark.parametrize("kind", STORES)
+def test_insert_never_replaces_a_stored_record(tmp_path, kind):
+    store = STORES[kind](tmp_path)
+    store.upsert({"id": 7, "title": "stored"})
+
+    with pytest.raises(DuplicateIdError):
+        store.apply([{"id": 8}], [], inserts=[{"id": 7, "title": "new"}])
+    assert store.get(7)["title"] == "stored"
+    assert store.get(8) is None
+    store.close()
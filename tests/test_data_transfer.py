@@ -0,0 +1,26 @@
+import io
+
+from backend.collection import NoteCollection, TaskCollection
+from backend.data_transfer import export_bytes, import_stream
+from backend.storage import NoteStore, TaskStore
+
+
+def test_export_imports_back(tmp_path):
+    tasks = TaskCollection(TaskStore(tmp_path / "tasks.db", tmp_path / "none.json"))
+    notes = NoteCollection(NoteStore(tmp_path / "tasks.db", tmp_path / "none.json"))
+    tasks.add({"id": 1, "title": "Café", "priority": "High", "due_date": "2030-01-02", "completed": False})
+    notes.add({"id": 1, "title": "Idea", "content": "x", "category": "Ideas"})
+
+    data = export_bytes(tasks, notes)
+    assert isinstance(data, bytes)
+    assert len(data.splitlines()) == 3
+
+    copy_tasks = TaskCollection(TaskStore(tmp_path / "copy.db", tmp_path / "none.json"))
+    copy_notes = NoteCollection(NoteStore(tmp_path / "copy.db", tmp_path / "none.json"))
+    result = import_stream(io.BytesIO(data), copy_tasks, copy_notes)
+
+    assert result.imported == {"task": 1, "note": 1}
+    assert list(copy_tasks) == list(tasks)
+    assert list(copy_notes) == list(notes)
+    for collection in (tasks, notes, copy_tasks, copy_notes):
+        collection.store.close()
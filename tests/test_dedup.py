@@ -0,0 +1,140 @@
+import smtplib
+import threading
+
+import pytest
+
+import config
+from backend.dedup import SUPPRESSED, DedupCache, dedup_cache
+from backend.email_service import EmailService
+
+
+class FakePool:
+    """Stands in for SMTPPool, recording messages; fails the first ``failures`` sends"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    def send_message(self, message):
+        if self.failures:
+            self.failures -= 1
+            raise smtplib.SMTPServerDisconnected("connection lost")
+        self.sent.append(message["Subject"])
+
+
+@pytest.fixture
+def email_service(monkeypatch):
+    monkeypatch.setattr(config, "EMAIL_USER", "me@example.com")
+    monkeypatch.setattr(config, "EMAIL_PASS", "secret")
+    dedup_cache.clear()
+    service = EmailService()
+    service.smtp_pool = FakePool()
+    yield service
+    dedup_cache.clear()
+
+
+def test_second_test_email_inside_ttl_is_sent(email_service):
+    for _ in range(2):
+        assert email_service.send_email(subject="Test", body="<p>hi</p>", dedup=False) is True
+    assert email_service.smtp_pool.sent == ["Test", "Test"]
+
+
+def test_repeated_automated_email_is_reported_suppressed(email_service):
+    assert email_service.send_email(subject="Due", body="<p>task</p>") is True
+    assert email_service.send_email(subject="Due", body="<p>task</p>") is SUPPRESSED
+    assert email_service.smtp_pool.sent == ["Due"]
+
+
+def test_failed_send_releases_its_claim(email_service):
+    email_service.smtp_pool.failures = 1
+    assert email_service.send_email(subject="Due", body="<p>task</p>") is False
+    assert email_service.send_email(subject="Due", body="<p>task</p>") is True
+    assert email_service.smtp_pool.sent == ["Due"]
+
+
+def test_concurrent_claims_let_one_send_through():
+    cache = DedupCache(ttl=60)
+    key = cache.key("email", "Due", "task", "me@example.com")
+    barrier = threading.Barrier(8)
+    results = []
+
+    def claim():
+        barrier.wait()
+        results.append(cache.claim(key))
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+
+
+def test_test_notification_button_sends_every_time(email_service, tmp_path):
+    from backend.outbox import NotificationOutbox
+    from utils.notifier import SmartNotifier
+
+    notifier = SmartNotifier(coalesce_seconds=0, outbox=NotificationOutbox(tmp_path / "outbox.db"))
+    notifier.email_service = email_service
+    for _ in range(2):
+        notifier.add_notification("Test", "hi", desktop=False, email=True, dedup=False)
+    for notification in notifier.notification_queue.get_batch(timeout=0):
+        notifier._handle(notification)
+    notifier.outbox.commit()
+
+    assert email_service.smtp_pool.sent == ["Test", "Test"]
+    assert notifier.stats["sent"]["email"] == 2
+    assert notifier.outbox.count() == 0
+    notifier.outbox.close()
+
+
+class SlowPool(FakePool):
+    """FakePool whose first send hangs until ``release`` is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def send_message(self, message):
+        self.calls += 1
+        if self.calls == 1:
+            self.release.wait(5)
+            raise smtplib.SMTPServerDisconnected("connection lost")
+        super().send_message(message)
+
+
+def test_timed_out_send_is_retried_not_suppressed(email_service, tmp_path, monkeypatch):
+    from backend.fanout import channel_pool
+    from backend.outbox import NotificationOutbox
+    from utils.notifier import SmartNotifier
+
+    monkeypatch.setitem(channel_pool.timeouts, "email", 0.05)
+    email_service.smtp_pool = SlowPool()
+    notifier = SmartNotifier(coalesce_seconds=0, outbox=NotificationOutbox(tmp_path / "outbox.db"))
+    notifier.email_service = email_service
+    notifier.add_notification("Due", "task", desktop=False, email=True)
+    notification, = notifier.notification_queue.get_batch(timeout=0)
+    notifier._handle(notification)
+    # The send timed out and failed late: the retry must go out
+    email_service.smtp_pool.release.set()
+    notifier._send_notification(notification, ["email"])
+    notifier.outbox.commit()
+
+    assert email_service.smtp_pool.sent == ["Due"]
+    assert notifier.stats["suppressed"]["email"] == 0
+    assert notifier.outbox.count() == 0
+    notifier.outbox.close()
+
+
+def test_mobile_claim_is_released_when_the_send_raises():
+    from concurrent.futures import Future
+    from backend.notification_service import _release_unless_sent
+
+    key = dedup_cache.key("mobile", "Due", "task")
+    assert dedup_cache.claim(key)
+    future = Future()
+    future.add_done_callback(lambda f: _release_unless_sent(f, key))
+    future.set_exception(RuntimeError("FCM unavailable"))
+    assert dedup_cache.claim(key)
+    dedup_cache.clear()
@@ -0,0 +1,74 @@
+import os
+
+from backend.dispatch import ReminderDispatcher
+
+
+def _send(task):
+    return True
+
+
+def quick_sender():
+    return _send
+
+
+def _send_or_crash(task):
+    if task.get("crash"):
+        os._exit(1)
+    return task["id"] % 2 == 0
+
+
+def crashing_sender():
+    return _send_or_crash
+
+
+def test_dead_worker_is_replaced_instead_of_blocking_submit():
+    dispatcher = ReminderDispatcher(
+        workers=1, queue_batches=1, batch_size=1, sender_factory=quick_sender
+    )
+    dispatcher.start()
+    try:
+        dispatcher.submit("alice", {"id": 1})
+        assert dispatcher.drain(timeout=30)
+
+        dispatcher._processes[0].kill()
+        dispatcher._processes[0].join()
+        # More batches than the dead worker's queue holds: without a
+        # liveness check the second put would block forever
+        for task_id in range(2, 6):
+            dispatcher.submit("alice", {"id": task_id})
+        assert dispatcher.drain(timeout=30)
+
+        stats = dispatcher.get_stats()[0]
+        assert stats["restarts"] == 1
+        assert stats["sent"] + stats["lost"] == 5
+        assert stats["sent"] >= 1
+    finally:
+        dispatcher.stop()
+
+
+def test_results_come_back_per_reminder_and_lost_ones_are_reported():
+    done = []
+    dispatcher = ReminderDispatcher(
+        workers=1, batch_size=4, sender_factory=crashing_sender, on_done=done.extend
+    )
+    dispatcher.start()
+    try:
+        for task_id in (1, 2):
+            dispatcher.submit("alice", {"id": task_id}, token=f"row {task_id}")
+        assert dispatcher.drain(timeout=30)
+        assert sorted(done) == [("row 1", False), ("row 2", True)]
+
+        done.clear()
+        dispatcher.submit("alice", {"id": 3, "crash": True}, token="row 3")
+        dispatcher.submit("alice", {"id": 4}, token="row 4")
+        assert dispatcher.drain(timeout=30)
+        assert sorted(done) == [("row 3", None), ("row 4", None)]
+
+        done.clear()
+        dispatcher.submit("alice", {"id": 6}, token="row 6")
+        assert dispatcher.drain(timeout=30)
+        assert done == [("row 6", True)]
+        stats = dispatcher.get_stats()[0]
+        assert (stats["sent"], stats["failed"], stats["lost"]) == (2, 1, 2)
+    finally:
+        dispatcher.stop()
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from backend.fanout import ChannelPool
+
+
+def test_channels_run_concurrently_and_a_hung_one_times_out():
+    pool = ChannelPool(
+        workers={"desktop": 1, "email": 1, "mobile": 1},
+        timeouts={"desktop": 1, "email": 0.2, "mobile": 1},
+    )
+    hang = threading.Event()
+    start = time.monotonic()
+    results = pool.run({
+        "desktop": lambda: time.sleep(0.1) or True,
+        "email": lambda: hang.wait(5),
+        "mobile": lambda: time.sleep(0.1) or True,
+    })
+    elapsed = time.monotonic() - start
+    hang.set()
+
+    assert results == {"desktop": True, "email": False, "mobile": True}
+    # Only as long as the email timeout, not the sum of the channels
+    assert elapsed < 0.5
+    assert pool.get_stats() == {
+        "desktop": {"sent": 1, "failed": 0, "timed_out": 0},
+        "email": {"sent": 0, "failed": 0, "timed_out": 1},
+        "mobile": {"sent": 1, "failed": 0, "timed_out": 0},
+    }
+    pool.shutdown()
+
+
+def test_errors_and_false_results_count_as_failed():
+    pool = ChannelPool(workers={"desktop": 1, "email": 1}, timeouts={"desktop": 1, "email": 1})
+
+    def boom():
+        raise ConnectionError("SMTP down")
+
+    results = pool.run({"desktop": lambda: False, "email": boom})
+    assert results == {"desktop": False, "email": False}
+    stats = pool.get_stats()
+    assert stats["desktop"]["failed"] == 1
+    assert stats["email"]["failed"] == 1
+    pool.shutdown()
+
+
+def test_timeout_counts_from_the_start_of_the_fanout():
+    pool = ChannelPool(workers={"desktop": 1}, timeouts={"desktop": 0.3})
+    started = time.monotonic() - 0.25
+    future = pool.submit("desktop", time.sleep, 0.2)
+    # 0.25 s of the 0.3 s budget were already spent elsewhere
+    assert pool.result("desktop", future, started) is False
+    assert pool.get_stats()["desktop"]["timed_out"] == 1
+    pool.shutdown()
+
+
+def test_hung_channel_only_ties_up_its_own_workers():
+    pool = ChannelPool(workers={"desktop": 1, "email": 1}, timeouts={"desktop": 0.1, "email": 1})
+    hang = threading.Event()
+    assert pool.run({"desktop": lambda: hang.wait(5)}) == {"desktop": False}
+    assert pool.run({"email": lambda: True}) == {"email": True}
+    hang.set()
+    pool.shutdown()
@@ -0,0 +1,83 @@
+import multiprocessing
+
+import pytest
+
+from backend.journal import TaskJournalStore, TaskSnapshotStore
+
+STORES = {"journal": TaskJournalStore, "snapshot": TaskSnapshotStore}
+
+
+def _write_from_other_process(kind, path, record):
+    store = STORES[kind](path)
+    store.upsert(record)
+    store.close()
+
+
+def run_in_other_process(*args):
+    process = multiprocessing.get_context("spawn").Process(
+        target=_write_from_other_process, args=args
+    )
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+
+@pytest.mark.parametrize("kind", STORES)
+def test_change_token_sees_other_process(tmp_path, kind):
+    path = tmp_path / "tasks.json"
+    store = STORES[kind](path)
+    store.upsert({"id": 1, "title": "mine"})
+    token = store.change_token()
+    assert store.change_token() == token
+
+    run_in_other_process(kind, path, {"id": 2, "title": "theirs"})
+
+    assert store.change_token() != token
+    assert {r["title"] for r in store.all()} == {"mine", "theirs"}
+    store.close()
+
+
+@pytest.mark.parametrize("kind", STORES)
+def test_own_writes_keep_change_token(tmp_path, kind):
+    store = STORES[kind](tmp_path / "tasks.json")
+    token = store.change_token()
+    store.upsert({"id": 1, "title": "mine"})
+    store.delete(1)
+    assert store.change_token() == token
+    store.close()
+
+
+@pytest.mark.parametrize("kind", STORES)
+def test_write_after_other_process_keeps_its_records(tmp_path, kind):
+    path = tmp_path / "tasks.json"
+    store = STORES[kind](path)
+    store.upsert({"id": 1, "title": "mine"})
+
+    run_in_other_process(kind, path, {"id": 2, "title": "theirs"})
+    # No change_token() call first: the write itself must catch up
+    store.upsert({"id": 3, "title": "mine again"})
+    if kind == "journal":
+        store.compact()
+    store.close()
+
+    reopened = STORES[kind](path)
+    assert sorted(r["id"] for r in reopened.all()) == [1, 2, 3]
+    reopened.close()
+
+
+def test_write_after_torn_journal_tail_survives_restart(tmp_path):
+    path = tmp_path / "tasks.json"
+    store = TaskJournalStore(path)
+    store.upsert({"id": 1, "title": "kept"})
+    store.close()
+    # A crash mid-append leaves half a line behind
+    with open(store.journal_path, "a") as file:
+        file.write('{"op": "upsert", "record": {"id": 2, "ti')
+
+    store = TaskJournalStore(path)
+    store.upsert({"id": 3, "title": "acknowledged"})
+    store.close()
+
+    reopened = TaskJournalStore(path)
+    assert sorted(r["id"] for r in reopened.all()) == [1, 3]
+    reopened.close()
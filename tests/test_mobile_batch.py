@@ -0,0 +1,70 @@
+import threading
+
+from backend.mobile_batch import FCM_MAX_BATCH, MobileBatcher
+
+
+class FakeTransport:
+    """Records each batch; rejects messages whose title is in ``reject``"""
+
+    def __init__(self, reject=(), fail_batches=0, short=False):
+        self.reject = set(reject)
+        self.fail_batches = fail_batches
+        self.short = short
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def send_batch(self, messages):
+        with self.lock:
+            self.batches.append([m["title"] for m in messages])
+            if self.fail_batches:
+                self.fail_batches -= 1
+                raise ConnectionError("FCM unavailable")
+        results = [m["title"] not in self.reject for m in messages]
+        return results[:-1] if self.short else results
+
+
+def submit_all(batcher, count):
+    futures = [batcher.submit(f"m{i}", "body") for i in range(count)]
+    batcher.flush()
+    return [future.result(timeout=10) for future in futures]
+
+
+def test_more_than_500_are_split_into_fcm_sized_batches():
+    transport = FakeTransport(reject={"m3", "m700"})
+    batcher = MobileBatcher(transport, window=60, max_batch=1000)
+    results = submit_all(batcher, 1200)
+    batcher.close()
+
+    assert batcher.max_batch == FCM_MAX_BATCH
+    assert [len(batch) for batch in transport.batches] == [500, 500, 200]
+    assert [title for batch in transport.batches for title in batch] == [f"m{i}" for i in range(1200)]
+    # Each future gets its own message's result
+    assert [i for i, ok in enumerate(results) if not ok] == [3, 700]
+    stats = batcher.get_stats()
+    assert (stats["batches"], stats["messages"], stats["failed"]) == (3, 1200, 2)
+
+
+def test_a_failed_request_fails_only_its_batch():
+    transport = FakeTransport(fail_batches=1)
+    batcher = MobileBatcher(transport, window=60, max_batch=500)
+    results = submit_all(batcher, 600)
+    batcher.close()
+
+    assert results == [False] * 500 + [True] * 100
+
+
+def test_short_response_fails_the_unanswered_messages():
+    batcher = MobileBatcher(FakeTransport(short=True), window=60, max_batch=10)
+    results = submit_all(batcher, 3)
+    batcher.close()
+
+    assert results == [True, True, False]
+
+
+def test_window_sends_without_a_flush():
+    transport = FakeTransport()
+    batcher = MobileBatcher(transport, window=0.05)
+    futures = [batcher.submit(f"m{i}", "body") for i in range(3)]
+    assert [future.result(timeout=5) for future in futures] == [True, True, True]
+    batcher.close()
+    assert transport.batches == [["m0", "m1", "m2"]]
@@ -0,0 +1,173 @@
+import threading
+import time
+
+import pytest
+
+import config
+from backend.outbox import NotificationOutbox
+from utils.notifier import NotificationQueue, SmartNotifier, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def titles(notifications):
+    return [n["title"] for n in notifications]
+
+
+def test_due_notifications_come_out_by_priority_then_age():
+    clock = FakeClock()
+    queue = NotificationQueue(clock)
+    for title, kind in (("info 1", "info"), ("warning", "warning"), ("info 2", "info"),
+                        ("error", "error"), ("success", "success")):
+        queue.put({"title": title, "type": kind, "scheduled_time": clock.now})
+        clock.now += 1
+
+    assert titles(queue.get_batch(timeout=0)) == ["error", "warning", "info 1", "info 2", "success"]
+    assert len(queue) == 0
+
+
+def test_delayed_notifications_wait_for_their_time():
+    clock = FakeClock()
+    queue = NotificationQueue(clock)
+    queue.put({"title": "later", "type": "error", "scheduled_time": clock.now + 60})
+    queue.put({"title": "now", "type": "info", "scheduled_time": clock.now})
+
+    assert titles(queue.get_batch(timeout=0)) == ["now"]
+    assert queue.get_batch(timeout=0.01) == []
+    clock.now += 60
+    assert titles(queue.get_batch(timeout=0)) == ["later"]
+
+
+def test_max_items_leaves_the_rest_queued():
+    clock = FakeClock()
+    queue = NotificationQueue(clock)
+    for i in range(5):
+        queue.put({"title": str(i), "scheduled_time": clock.now})
+    assert titles(queue.get_batch(max_items=2, timeout=0)) == ["0", "1"]
+    assert titles(queue.get_batch(timeout=0)) == ["2", "3", "4"]
+
+
+def test_waiting_consumer_wakes_at_the_scheduled_time():
+    queue = NotificationQueue()
+    queue.put({"title": "soon", "scheduled_time": time.time() + 0.2})
+    start = time.monotonic()
+    assert titles(queue.get_batch(timeout=5)) == ["soon"]
+    assert 0.15 <= time.monotonic() - start < 1
+
+
+def test_new_earlier_notification_wakes_the_consumer():
+    queue = NotificationQueue()
+    queue.put({"title": "far", "scheduled_time": time.time() + 60})
+    result = []
+    consumer = threading.Thread(target=lambda: result.extend(queue.get_batch(timeout=5)))
+    consumer.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    queue.put({"title": "now", "scheduled_time": time.time()})
+    consumer.join()
+    assert titles(result) == ["now"]
+    assert time.monotonic() - start < 1
+
+
+def test_close_releases_a_waiting_consumer():
+    queue = NotificationQueue()
+    result = []
+    consumer = threading.Thread(target=lambda: result.append(queue.get_batch()))
+    consumer.start()
+    time.sleep(0.05)
+    queue.close()
+    consumer.join(5)
+    assert not consumer.is_alive()
+    assert result == [[]]
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.try_acquire() == pytest.approx(2.0)
+    clock.now += 1
+    assert bucket.try_acquire() == pytest.approx(1.0)
+    clock.now += 1
+    assert bucket.try_acquire() == 0
+    clock.now += 3600
+    assert [bucket.try_acquire() for _ in range(4)][-1] > 0
+
+
+@pytest.fixture
+def make_notifier(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "NOTIFY_BURST", 3)
+    notifiers = []
+
+    def make(**kwargs):
+        clock = FakeClock()
+        notifier = SmartNotifier(
+            clock=clock, outbox=NotificationOutbox(tmp_path / f"outbox{len(notifiers)}.db"), **kwargs
+        )
+        notifier.sent = []
+        notifier._send_notification = lambda n, channels=None: notifier.sent.append((n, channels))
+        notifiers.append(notifier)
+        return notifier, clock
+
+    yield make
+    for notifier in notifiers:
+        notifier.outbox.close()
+
+
+def handle_due(notifier):
+    for notification in notifier.notification_queue.get_batch(timeout=0):
+        notifier._handle(notification)
+
+
+def test_burst_of_one_type_is_sent_as_first_plus_digest(make_notifier):
+    notifier, clock = make_notifier(coalesce_seconds=10, rate_limits={"desktop": 600})
+    for i in range(5):
+        notifier.add_notification(f"Overdue {i}", "task", "warning")
+    handle_due(notifier)
+    assert [n["title"] for n, _ in notifier.sent] == ["Overdue 0"]
+    assert notifier.stats["coalesced"] == 4
+
+    clock.now += 9
+    handle_due(notifier)
+    assert len(notifier.sent) == 1
+    clock.now += 1
+    handle_due(notifier)
+
+    digest, channels = notifier.sent[-1]
+    assert digest["title"] == "4 more warning notifications"
+    assert digest["message"].splitlines() == [f"- Overdue {i}" for i in range(1, 5)]
+    assert len(digest["outbox_ids"]) == 4
+    assert channels == ["desktop"]
+    assert notifier.stats["digests"] == 1
+    assert notifier.stats["saved"]["desktop"] == 3
+
+
+def test_other_types_open_their_own_window(make_notifier):
+    notifier, clock = make_notifier(coalesce_seconds=10, rate_limits={"desktop": 600})
+    notifier.add_notification("Overdue", "task", "warning")
+    notifier.add_notification("Done", "task", "success")
+    handle_due(notifier)
+    assert sorted(n["title"] for n, _ in notifier.sent) == ["Done", "Overdue"]
+
+
+def test_rate_limited_channel_is_deferred_not_dropped(make_notifier):
+    notifier, clock = make_notifier(coalesce_seconds=0, rate_limits={"desktop": 60})
+    for i in range(5):
+        notifier.add_notification(f"n{i}", "message")
+    handle_due(notifier)
+    assert [n["title"] for n, _ in notifier.sent] == ["n0", "n1", "n2"]
+    assert notifier.stats["rate_limited"]["desktop"] == 2
+
+    clock.now += 1
+    handle_due(notifier)
+    clock.now += 1
+    handle_due(notifier)
+    assert [n["title"] for n, _ in notifier.sent] == ["n0", "n1", "n2", "n3", "n4"]
+    assert all(n.get("deferred") for n, _ in notifier.sent[3:])
+    assert len(notifier.notification_queue) == 0
@@ -0,0 +1,76 @@
+import pytest
+
+from backend.outbox import NotificationOutbox
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def crash(outbox):
+    """Stop an outbox the way a killed process would: no close, no lease release"""
+    outbox._stopped.set()
+    outbox._heartbeats.join()
+    outbox.conn.close()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "outbox.db"
+
+
+def test_restart_with_the_same_pid_recovers_its_rows(path):
+    clock = FakeClock()
+    before = NotificationOutbox(path, clock=clock)
+    message_id = before.add({"title": "Task due", "scheduled_time": 5}, ["email", "mobile"])
+    crash(before)
+
+    # Same pid (as pid 1 in a container), lease still fresh
+    after = NotificationOutbox(path, clock=clock)
+    recovered = after.recover()
+    assert [n["outbox_id"] for n in recovered] == [message_id]
+    assert recovered[0]["email"] and recovered[0]["mobile"] and not recovered[0]["desktop"]
+    assert after.recover() == []
+    after.close()
+
+
+def test_other_hosts_rows_are_taken_over_once_the_lease_expires(path):
+    clock = FakeClock()
+    other = NotificationOutbox(path, lease_seconds=60, clock=clock)
+    other.add({"title": "Task due"}, ["email"])
+    other.conn.execute("UPDATE owners SET host = 'elsewhere'")
+
+    outbox = NotificationOutbox(path, lease_seconds=60, clock=clock)
+    assert outbox.recover() == []
+    clock.now += 61
+    assert len(outbox.recover()) == 1
+    crash(other)
+    outbox.close()
+
+
+def test_closed_runs_leave_their_rows_to_the_next_one(path):
+    first = NotificationOutbox(path)
+    first.add({"title": "Task due"}, ["desktop"])
+    first.close()
+
+    second = NotificationOutbox(path)
+    assert len(second.recover()) == 1
+    second.close()
+
+
+def test_notifier_opens_its_outbox_on_first_use(path, monkeypatch):
+    import config
+    from utils.notifier import SmartNotifier
+
+    monkeypatch.setattr(config, "NOTIFY_OUTBOX_DB", path)
+    notifier = SmartNotifier()
+    assert not path.exists()
+
+    notifier.add_notification("Task due", "soon")
+    assert path.exists()
+    assert notifier.outbox.count() == 1
+    notifier.outbox.close()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from backend.collection import TaskCollection
+from backend.records import PackedRecords, TaskTable
+from backend.storage import TaskStore
+from backend.task_index import is_open_task
+
+ODD_TASKS = [
+    {"id": 1, "title": "Plain", "priority": "High", "due_date": "2030-01-02", "completed": True},
+    # Keys out of schema order, a field outside the schema, non-ASCII text
+    {"completed": True, "id": 2, "title": "Café ☕", "tags": ["a", "b"]},
+    # Values that don't fit their column stay verbatim
+    {"id": "9b2f-uuid", "title": None, "due_date": "next week", "completed": 1},
+    {"id": 4, "due_date": "2030-01-02T08:30:00.000001", "created_at": "2030-01-01 09:00"},
+    {"id": 5, "due_date": "2024-W01-1", "completed": True},
+]
+
+
+def completed(task):
+    return not is_open_task(task)
+
+
+def test_table_rows_round_trip_exactly():
+    table = TaskTable(ODD_TASKS)
+    for i, task in enumerate(ODD_TASKS):
+        row = table.row(i)
+        assert row == task
+        assert list(row) == list(task)
+
+
+def test_due_before_mask_compares_dates():
+    table = TaskTable(ODD_TASKS)
+    assert list(np.flatnonzero(table.due_before_mask("2030-01-03"))) == [0, 3]
+    assert list(np.flatnonzero(table.overdue_mask("2030-01-03"))) == [3]
+
+
+def test_packed_records_keep_order_and_move_between_forms():
+    records = PackedRecords(TaskTable, completed, ((str(t["id"]), t) for t in ODD_TASKS))
+    assert list(records) == [str(t["id"]) for t in ODD_TASKS]
+    assert records.packed == 4
+
+    reopened = records["1"]
+    reopened["completed"] = False
+    records["1"] = reopened
+    assert records["1"] is reopened
+    assert records.packed == 3
+
+    del records["2"]
+    assert "2" not in records
+    assert records.packed == 2
+    assert list(records.live_mask()) == [False, False, True, True]
+    assert records["5"] == ODD_TASKS[4]
+
+
+def test_replaced_rows_are_compacted():
+    records = PackedRecords(TaskTable, completed)
+    for i in range(3000):
+        records["1"] = {"id": 1, "title": f"edit {i}", "completed": True}
+    assert len(records.table) < 3000
+    assert records["1"] == {"id": 1, "title": "edit 2999", "completed": True}
+
+
+def test_collection_keeps_completed_tasks_packed(tmp_path):
+    tasks = TaskCollection(TaskStore(tmp_path / "tasks.db", tmp_path / "none.json"))
+    tasks.add({"id": 1, "title": "Open", "completed": False})
+    tasks.add({"id": 2, "title": "Done", "completed": True, "due_date": "2030-01-02"})
+    assert tasks._records.packed == 1
+
+    tasks.update(2, title="Done, renamed")
+    assert tasks.get(2)["title"] == "Done, renamed"
+    tasks.update(1, completed=True)
+    assert tasks._records.packed == 2
+    assert [t["title"] for t in tasks.completed_tasks()] == ["Open", "Done, renamed"]
+
+    batch = tasks.drain_changes()
+    tasks.store.apply(batch.upserts, batch.deletes, reset=batch.reset, inserts=batch.inserts)
+    tasks.reload()
+    assert tasks.get(2) == {"id": 2, "title": "Done, renamed", "completed": True, "due_date": "2030-01-02"}
+    assert tasks.count_due_on("2030-01-02", include_completed=True) == 1
+    tasks.store.close()
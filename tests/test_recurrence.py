@@ -0,0 +1,42 @@
+import logging
+
+from backend.collection import TaskCollection
+from backend.recurrence import MAX_OCCURRENCES, expand, validate_rrule
+from backend.storage import TaskStore
+
+
+def test_sub_hourly_rules_are_rejected():
+    assert validate_rrule("FREQ=HOURLY;INTERVAL=2", "2030-01-01T09:00:00") is None
+    assert "hourly" in validate_rrule("FREQ=MINUTELY", "2030-01-01T09:00:00")
+    assert "hourly" in validate_rrule("freq=secondly;count=5", "2030-01-01T09:00:00")
+
+
+def test_expand_is_capped_for_stored_minutely_rules(caplog):
+    task = {"id": 7, "title": "Spam", "due_date": "2030-01-01T00:00:00", "rrule": "FREQ=MINUTELY"}
+    with caplog.at_level(logging.WARNING, logger="nikassistant.recurrence"):
+        occurrences = expand(task, "2030-01-01", "2030-01-31")
+    assert len(occurrences) == MAX_OCCURRENCES
+    assert "more than" in caplog.text
+
+
+def test_expand_stops_at_the_window_end():
+    task = {"id": 1, "title": "Daily", "due_date": "2030-01-01", "rrule": "FREQ=DAILY"}
+    days = [o["due_date"] for o in expand(task, "2030-01-10", "2030-01-12")]
+    assert days == ["2030-01-10", "2030-01-11", "2030-01-12"]
+
+
+def test_next_open_tasks_include_the_next_occurrence(tmp_path):
+    tasks = TaskCollection(TaskStore(tmp_path / "tasks.db", tmp_path / "none.json"))
+    tasks.add({"id": 1, "title": "Later", "due_date": "2030-01-20", "completed": False})
+    tasks.add({"id": 2, "title": "Weekly", "due_date": "2029-12-31", "rrule": "FREQ=WEEKLY",
+               "completed": False})
+    tasks.add({"id": 3, "title": "Someday", "completed": False})
+
+    upcoming = tasks.next_open_tasks(5, today="2030-01-10")
+    assert [(t["title"], t.get("due_date")) for t in upcoming] == [
+        ("Weekly", "2030-01-14"),
+        ("Later", "2030-01-20"),
+        ("Someday", None),
+    ]
+    assert [t["title"] for t in tasks.next_open_tasks(1, today="2030-01-10")] == ["Weekly"]
+    tasks.store.close()
@@ -0,0 +1,81 @@
+import pytest
+
+from backend.reminder_store import ReminderPump, ReminderStore
+
+
+class FlakyDeliver:
+    """Records deliveries, raising for the first ``failures`` calls"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def __call__(self, rows, missed):
+        self.calls.append((rows, missed))
+        if len(self.calls) <= self.failures:
+            raise RuntimeError("notification service down")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReminderStore(tmp_path / "reminders.db")
+    yield store
+    store.close()
+
+
+def test_reminders_survive_deliver_raising(store):
+    store.upsert("alice", 1, 100.0, "fp")
+    deliver = FlakyDeliver(failures=1)
+    pump = ReminderPump(store, deliver, clock=lambda: 100.0, misfire_grace=60)
+
+    with pytest.raises(RuntimeError):
+        pump.run_pending()
+    assert store.count() == 1
+    assert store.next_run_at() == 100.0
+
+    assert pump.run_pending() == 1
+    assert deliver.calls[1] == ([("alice", "1", 100.0)], False)
+    assert store.count() == 0
+    assert pump.stats["failed"] == 1 and pump.stats["delivered"] == 1
+
+
+def test_claimed_reminders_are_delivered_again_after_a_crash(store):
+    store.upsert("alice", 1, 100.0, "fp")
+    # A previous run claimed the reminder and stopped before delivering it
+    assert store.claim_due(100.0) == [("alice", "1", 100.0)]
+    assert store.next_run_at() is None
+
+    deliver = FlakyDeliver()
+    pump = ReminderPump(store, deliver, clock=lambda: 110.0, misfire_grace=60)
+    assert pump.recover() == 1
+    assert deliver.calls == [([("alice", "1", 100.0)], True)]
+    assert store.count() == 0
+
+
+def test_rescheduling_a_claimed_reminder_keeps_the_new_one(store):
+    store.upsert("alice", 1, 100.0, "fp")
+    rows = store.claim_due(100.0)
+    # e.g. a recurring task rolled forward while its reminder was delivered
+    store.upsert("alice", 1, 200.0, "fp2")
+    store.ack(rows)
+    assert store.fingerprints("alice") == {"1": "fp2"}
+    assert store.next_run_at() == 200.0
+
+
+def test_reminders_handed_on_stay_claimed_until_acked(store):
+    store.upsert("alice", 1, 100.0, "fp")
+    store.upsert("alice", 2, 100.0, "fp")
+    handed_on = []
+
+    def deliver(rows, missed):
+        handed_on.extend(rows[:1])
+        return handed_on
+
+    pump = ReminderPump(store, deliver, clock=lambda: 100.0, misfire_grace=60)
+    assert pump.run_pending() == 2
+    # The one sent inline is gone; the handed-on one is neither due again nor dropped
+    assert store.count() == 1
+    assert store.next_run_at() is None
+
+    store.release(handed_on)
+    assert store.next_run_at() == 100.0
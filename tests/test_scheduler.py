@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from backend import scheduler as scheduler_module
+from backend.reminder_store import ReminderStore
+from backend.scheduler import TaskScheduler
+from backend.shards import ShardRegistry
+from backend.simulation import (
+    RecordingEmailService,
+    RecordingNotificationService,
+    VirtualClock,
+    run_until,
+)
+
+START = datetime(2030, 1, 1, 9, 0)
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(config, "USERS_DIR", tmp_path / "users")
+    monkeypatch.setattr(config, "ALLOWED_USERS", {"alice", "bob"})
+    monkeypatch.setattr(config, "DISPATCH_WORKERS", 0)
+    pending_file = tmp_path / "pending.json"
+    pending_file.write_text('{"users": []}')
+    registry = ShardRegistry(max_loaded=10, pending_file=pending_file)
+    monkeypatch.setattr(scheduler_module, "shards", registry)
+    return registry
+
+
+def add_task(registry, user_id, task_id, due, **fields):
+    registry.get(user_id).tasks.add({
+        "id": task_id, "title": f"{user_id} {task_id}", "due_date": due.isoformat(),
+        "status": "Pending", **fields,
+    })
+
+
+@pytest.fixture
+def make_scheduler(tmp_path):
+    schedulers = []
+
+    def make():
+        clock = VirtualClock(START)
+        scheduler = TaskScheduler(
+            clock=clock,
+            reminder_store=ReminderStore(tmp_path / "reminders.db"),
+            email_service=RecordingEmailService(clock),
+            notification_service=RecordingNotificationService(clock),
+        )
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.reminders.close()
+
+
+def test_only_the_leader_loads_pending_shards(registry, make_scheduler):
+    for user_id in ("alice", "bob"):
+        add_task(registry, user_id, 1, START + timedelta(hours=1), reminder=30)
+        registry.evict(user_id)
+    loads = registry.stats["loads"]
+
+    scheduler = make_scheduler()
+    assert registry.loaded_users() == []
+
+    scheduler.lead()
+    assert sorted(registry.loaded_users()) == ["alice", "bob"]
+    assert registry.stats["loads"] == loads + 2
+
+
+def test_sync_leaves_unloaded_shards_alone(registry, make_scheduler):
+    for user_id in ("alice", "bob"):
+        add_task(registry, user_id, 1, START + timedelta(hours=1), reminder=30)
+    scheduler = make_scheduler()
+    scheduler.lead()
+    registry.evict("bob")
+    loads = registry.stats["loads"]
+
+    scheduler.sync_shards()
+    assert registry.loaded_users() == ["alice"]
+    assert registry.stats["loads"] == loads
+
+
+def test_evicted_users_are_detached_and_reattached_on_reload(registry, make_scheduler):
+    add_task(registry, "alice", 1, START - timedelta(hours=1))
+    add_task(registry, "alice", 2, START + timedelta(hours=1), reminder=30)
+    scheduler = make_scheduler()
+    scheduler.lead()
+    # The task that went overdue while stopped is reported once
+    assert scheduler.run_pending() == 1
+
+    tasks = registry.get("alice").tasks
+    registry.evict("alice")
+    assert "alice" not in scheduler._syncs
+    assert not any(type(listener).__module__ == "backend.scheduler" for listener in tasks._listeners)
+    # The queued due date still covers the unloaded shard
+    assert len(scheduler.due_timer) == 1
+
+    registry.get("alice")
+    assert "alice" in scheduler._syncs
+    assert scheduler.run_pending() == 0
+    assert scheduler.reminders.count() == 1
+
+
+def test_only_the_leader_feeds_the_due_timer(registry, make_scheduler):
+    add_task(registry, "alice", 1, START + timedelta(hours=1))
+    scheduler = make_scheduler()
+    assert len(scheduler.due_timer) == 0
+
+    scheduler.lead()
+    assert len(scheduler.due_timer) == 1
+
+
+def test_tasks_due_close_together_get_one_notification(registry, make_scheduler, monkeypatch):
+    monkeypatch.setattr(config, "OVERDUE_BATCH_SECONDS", 60)
+    for task_id, seconds in ((1, 0), (2, 5), (3, 30), (4, 600)):
+        add_task(registry, "alice", task_id, START + timedelta(hours=1, seconds=seconds))
+    scheduler = make_scheduler()
+    scheduler.lead()
+
+    run_until(scheduler, scheduler.clock, START + timedelta(hours=2))
+    sent = [title for _, _, title, _ in scheduler.notification_service.sent]
+    assert sent == ["You have 3 overdue tasks", "You have 1 overdue tasks"]
+
+
+class FailingNotificationService:
+    def send_notification(self, title, message):
+        return False
+
+
+def test_reminder_that_no_channel_sent_reports_failure():
+    task = {"id": 1, "title": "Call", "due_date": START.isoformat()}
+    assert scheduler_module.deliver_task_reminder(task, FailingNotificationService(), None) is False
+    clock = VirtualClock(START)
+    assert scheduler_module.deliver_task_reminder(task, RecordingNotificationService(clock), None) is True
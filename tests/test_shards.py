@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+import config
+from backend import shards as shards_module
+from backend.shards import ShardRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(config, "USERS_DIR", tmp_path / "users")
+    monkeypatch.setattr(config, "ALLOWED_USERS", {"alice", "bob", "carol"})
+    return ShardRegistry(
+        max_loaded=1, pending_file=tmp_path / "pending.json", idle_seconds=60, clock=FakeClock()
+    )
+
+
+def test_quiet_loads_never_evict_shards_in_use(registry):
+    registry.get("alice")
+    registry.get("bob")
+    registry.get("carol", touch=False)
+    assert set(registry.loaded_users()) == {"alice", "bob", "carol"}
+    assert registry.stats["evictions"] == 0
+
+    registry.clock.now = 61
+    registry.get("alice")
+    # bob went idle and carol was only loaded quietly
+    assert registry.loaded_users() == ["alice"]
+
+
+def test_unknown_user_gets_no_directory(registry, tmp_path):
+    with pytest.raises(ValueError):
+        registry.get("mallory")
+    assert not (tmp_path / "users" / "mallory").exists()
+
+    (tmp_path / "users" / "dave").mkdir(parents=True)
+    assert registry.get("dave").user_id == "dave"
+
+
+class BlockingSaver:
+    """Stands in for the write-behind saver; flushes wait for ``release``"""
+
+    def __init__(self):
+        self.flushing = threading.Event()
+        self.release = threading.Event()
+
+    def register(self, collection):
+        return collection
+
+    def flush(self, collection):
+        self.flushing.set()
+        self.release.wait(30)
+
+
+def test_evict_flushes_outside_the_registry_lock(registry, monkeypatch):
+    blocking = BlockingSaver()
+    monkeypatch.setattr(shards_module, "saver", blocking)
+    alice = registry.get("alice")
+
+    evicting = threading.Thread(target=registry.evict, args=("alice",))
+    evicting.start()
+    assert blocking.flushing.wait(10)
+    # Another user's session is not held up by alice's flush...
+    loading = threading.Thread(target=registry.get, args=("bob",))
+    loading.start()
+    loading.join(5)
+    assert not loading.is_alive()
+    # ...and alice gets her same collections back, not a second copy
+    assert registry.get("alice").tasks is alice.tasks
+    blocking.release.set()
+    evicting.join(10)
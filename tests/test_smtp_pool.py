@@ -0,0 +1,153 @@
+import smtplib
+from email.mime.text import MIMEText
+
+import pytest
+
+from backend import smtp_pool as smtp_pool_module
+from backend.smtp_pool import SMTPPool
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP; class attributes script the next sessions"""
+
+    sessions = []
+    noop_code = 250
+    drop_next_send = 0
+    refuse_next_send = False
+
+    def __init__(self, host, port, timeout=None):
+        self.calls = ["connect"]
+        self.sent = []
+        self.closed = False
+        FakeSMTP.sessions.append(self)
+
+    def starttls(self):
+        self.calls.append("starttls")
+
+    def login(self, user, password):
+        self.calls.append("login")
+
+    def noop(self):
+        self.calls.append("noop")
+        if FakeSMTP.noop_code is None:
+            raise smtplib.SMTPServerDisconnected("gone")
+        return FakeSMTP.noop_code, b"OK"
+
+    def send_message(self, message):
+        if FakeSMTP.drop_next_send:
+            FakeSMTP.drop_next_send -= 1
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if FakeSMTP.refuse_next_send:
+            FakeSMTP.refuse_next_send = False
+            raise smtplib.SMTPRecipientsRefused({"x@example.com": (550, b"no such user")})
+        self.sent.append(message["Subject"])
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeSMTP.sessions = []
+    FakeSMTP.noop_code = 250
+    FakeSMTP.drop_next_send = 0
+    FakeSMTP.refuse_next_send = False
+    monkeypatch.setattr(smtp_pool_module.smtplib, "SMTP", FakeSMTP)
+    clock = FakeClock()
+    pool = SMTPPool("smtp.example.com", 587, "me", "secret", size=2,
+                    idle_timeout=120, check_after=15, clock=clock)
+    yield pool
+    pool.close()
+
+
+def message(subject):
+    msg = MIMEText("body")
+    msg["Subject"] = subject
+    return msg
+
+
+def sent(pool):
+    return [subject for session in FakeSMTP.sessions for subject in session.sent]
+
+
+def test_session_is_reused_without_logging_in_again(pool):
+    pool.send_message(message("a"))
+    pool.clock.now += 5
+    pool.send_message(message("b"))
+
+    assert len(FakeSMTP.sessions) == 1
+    assert FakeSMTP.sessions[0].calls == ["connect", "starttls", "login"]
+    assert sent(pool) == ["a", "b"]
+    assert pool.get_stats()["reuses"] == 1
+
+
+def test_session_idle_past_the_check_is_replaced_when_noop_fails(pool):
+    pool.send_message(message("a"))
+    pool.clock.now += 30
+    FakeSMTP.noop_code = None
+    pool.send_message(message("b"))
+
+    first, second = FakeSMTP.sessions
+    assert first.calls[-1] == "noop" and first.closed
+    assert second.sent == ["b"]
+    stats = pool.get_stats()
+    assert (stats["failed_checks"], stats["connects"], stats["open"]) == (1, 2, 1)
+
+
+def test_healthy_noop_keeps_the_session(pool):
+    pool.send_message(message("a"))
+    pool.clock.now += 30
+    pool.send_message(message("b"))
+
+    assert len(FakeSMTP.sessions) == 1
+    assert FakeSMTP.sessions[0].calls[-1] == "noop"
+
+
+def test_expired_session_is_closed_without_a_check(pool):
+    pool.send_message(message("a"))
+    pool.clock.now += 121
+    pool.send_message(message("b"))
+
+    first, second = FakeSMTP.sessions
+    assert first.closed and "noop" not in first.calls
+    assert second.sent == ["b"]
+    assert pool.get_stats()["expired"] == 1
+
+
+def test_send_on_a_dropped_session_is_retried_once_on_a_new_one(pool):
+    pool.send_message(message("a"))
+    FakeSMTP.drop_next_send = 1
+    pool.send_message(message("b"))
+
+    assert sent(pool) == ["a", "b"]
+    assert FakeSMTP.sessions[0].closed
+    stats = pool.get_stats()
+    assert (stats["reconnects"], stats["open"], stats["idle"]) == (1, 1, 1)
+
+
+def test_second_drop_raises_and_frees_the_slots(pool):
+    FakeSMTP.drop_next_send = 2
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send_message(message("a"))
+    assert pool.get_stats()["open"] == 0
+
+
+def test_refused_message_keeps_the_session(pool):
+    FakeSMTP.refuse_next_send = True
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send_message(message("a"))
+    pool.send_message(message("b"))
+
+    assert len(FakeSMTP.sessions) == 1
+    assert sent(pool) == ["b"]
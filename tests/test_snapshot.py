@@ -0,0 +1,84 @@
+import json
+import os
+
+import config
+from backend.journal import TaskSnapshotStore, atomic_write_json
+from backend.snapshot import binary_snapshot_path, read_snapshot, write_snapshot
+
+RECORDS = [
+    {"id": 1, "title": "Plain", "priority": "High", "completed": False, "due_date": "2030-01-02"},
+    {"id": 2, "title": "Plain", "priority": "High", "completed": True, "due_date": "2030-01-02"},
+    # Another key order, non-ASCII, a NUL, nested and out-of-range values
+    {"title": "Café ☕", "id": 3, "priority": None, "tags": ["a", {"b": 1}]},
+    {"id": 4, "title": "nul\x00inside", "completed": 1, "big": 2**70, "ratio": 0.5},
+    {"id": "9b2f-uuid", "title": ""},
+    {},
+]
+
+
+def write_json(path, records):
+    atomic_write_json(path, {"tasks": records, "meta": {"next_id": 5}})
+
+
+def test_round_trip_keeps_values_types_and_key_order(tmp_path):
+    json_path = tmp_path / "tasks.json"
+    write_json(json_path, RECORDS)
+    bin_path = binary_snapshot_path(json_path)
+    write_snapshot(bin_path, RECORDS, {"next_id": 5}, json_path)
+
+    records, meta = read_snapshot(bin_path, json_path)
+    assert meta == {"next_id": 5}
+    assert records == RECORDS
+    assert [list(r) for r in records] == [list(r) for r in RECORDS]
+    assert [type(v) for r in records for v in r.values()] == [
+        type(v) for r in RECORDS for v in r.values()
+    ]
+
+
+def test_round_trip_of_many_repeated_strings(tmp_path):
+    records = [{"id": i, "priority": ("Low", "High")[i % 2]} for i in range(1000)]
+    json_path = tmp_path / "tasks.json"
+    write_json(json_path, records)
+    write_snapshot(binary_snapshot_path(json_path), records, {}, json_path)
+    assert read_snapshot(binary_snapshot_path(json_path), json_path)[0] == records
+
+
+def test_stale_or_truncated_snapshot_is_ignored(tmp_path):
+    json_path = tmp_path / "tasks.json"
+    bin_path = binary_snapshot_path(json_path)
+    write_json(json_path, RECORDS)
+    write_snapshot(bin_path, RECORDS, {}, json_path)
+
+    with open(bin_path, "rb") as file:
+        data = file.read()
+    for cut in (len(data) - 1, len(data) // 2, 12):
+        with open(bin_path, "wb") as file:
+            file.write(data[:cut])
+        assert read_snapshot(bin_path, json_path) is None
+
+    with open(bin_path, "wb") as file:
+        file.write(data)
+    assert read_snapshot(bin_path, json_path) is not None
+    # Edited by hand: same file, new contents
+    write_json(json_path, RECORDS[:1])
+    assert read_snapshot(bin_path, json_path) is None
+
+
+def test_store_falls_back_to_json_and_rewrites_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "BINARY_SNAPSHOTS", True)
+    json_path = tmp_path / "tasks.json"
+    bin_path = binary_snapshot_path(json_path)
+    old = [{"id": 1, "title": "old"}]
+    write_json(json_path, old)
+    write_snapshot(bin_path, old, {}, json_path)
+    new = [{"id": 1, "title": "new"}, {"id": 2, "title": "added"}]
+    write_json(json_path, new)
+    os.truncate(bin_path, os.path.getsize(bin_path) - 3)
+
+    store = TaskSnapshotStore(json_path)
+    assert store.all() == new
+    store.close()
+    # The fallback load wrote a current snapshot for next time
+    assert read_snapshot(bin_path, json_path)[0] == new
+    with open(json_path) as file:
+        assert json.load(file)["tasks"] == new
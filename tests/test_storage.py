@@ -0,0 +1,43 @@
+from backend.collection import RecordCollection
+from backend.storage import NoteStore, TaskStore
+
+
+def open_stores(path):
+    db_path = path / "nikassistant.db"
+    return TaskStore(db_path, path / "tasks.json"), NoteStore(db_path, path / "notes.json")
+
+
+def test_other_tables_and_id_allocation_do_not_make_a_store_stale(tmp_path):
+    tasks, notes = open_stores(tmp_path)
+    task_collection = RecordCollection(tasks)
+    note_collection = RecordCollection(notes)
+
+    notes.upsert({"id": 1, "title": "note"})
+    note_collection.next_id()
+    task_collection.next_id()
+    assert task_collection.refresh_if_stale() is False
+
+    tasks.upsert({"id": 1, "title": "task"})
+    assert note_collection.refresh_if_stale() is False
+    tasks.close()
+    notes.close()
+
+
+def test_another_connection_writing_the_table_makes_it_stale(tmp_path):
+    tasks, notes = open_stores(tmp_path)
+    collection = RecordCollection(tasks)
+    token = tasks.change_token()
+
+    other, other_notes = open_stores(tmp_path)
+    other.upsert({"id": 5, "title": "theirs"})
+    assert tasks.change_token() != token
+    assert collection.refresh_if_stale() is True
+    assert collection.get(5)["title"] == "theirs"
+
+    # An external write committed before our own is not hidden by it
+    token = tasks.change_token()
+    other.delete(5)
+    tasks.upsert({"id": 6, "title": "mine"})
+    assert tasks.change_token() != token
+    for store in (tasks, notes, other, other_notes):
+        store.close()
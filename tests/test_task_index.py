@@ -0,0 +1,135 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from backend.aggregates import TaskAggregates
+from backend.recurrence import is_recurring
+from backend.task_index import TaskIndex, is_open_task
+
+START = date(2030, 1, 1)
+
+
+def day(offset):
+    return (START + timedelta(days=offset)).isoformat()
+
+
+def random_task(rng, task_id):
+    task = {
+        "id": task_id,
+        "title": f"task {task_id}",
+        "priority": rng.choice(["Low", "Medium", "High"]),
+        "category": rng.choice(["Work", "Personal", None]),
+        "completed": rng.random() < 0.3,
+    }
+    due = rng.random()
+    if due < 0.6:
+        task["due_date"] = day(rng.randrange(20))
+    elif due < 0.8:
+        task["due_date"] = f"{day(rng.randrange(20))}T{rng.randrange(24):02d}:30:00"
+    if rng.random() < 0.1:
+        task["status"] = "Completed"
+    if rng.random() < 0.15:
+        task["rrule"] = "FREQ=DAILY"
+    return task
+
+
+def dated(tasks):
+    """Tasks the date lists and per-day counts cover"""
+    return [t for t in tasks if t.get("due_date") and not is_recurring(t)]
+
+
+def check_index(index, tasks):
+    open_tasks = [t for t in tasks if is_open_task(t)]
+    keys = lambda selected: sorted(str(t["id"]) for t in selected)
+
+    assert sorted(index.open) == keys(open_tasks)
+    assert sorted(index.recurring) == keys(t for t in open_tasks if is_recurring(t))
+    for priority in ("Low", "Medium", "High"):
+        expected = keys(t for t in open_tasks if t.get("priority") == priority)
+        assert sorted(index.open_by_priority.get(priority, ())) == expected
+    for category in ("Work", "Personal", None):
+        expected = keys(t for t in tasks if t.get("category") == category)
+        assert sorted(index.by_category.get(category, ())) == expected
+
+    for start, end in ((0, 0), (3, 9), (0, 25), (19, 19)):
+        for include_completed in (False, True):
+            expected = sorted(
+                (t["due_date"], str(t["id"])) for t in dated(tasks)
+                if day(start) <= t["due_date"][:10] <= day(end)
+                and (include_completed or is_open_task(t))
+            )
+            assert index.keys_between(day(start), day(end), include_completed) == [k for _, k in expected]
+            assert index.count_between(day(start), day(end), include_completed) == len(expected)
+    for offset in (0, 7, 25):
+        expected = [t for t in dated(open_tasks) if t["due_date"] < day(offset)]
+        assert index.count_before(day(offset)) == len(expected)
+
+
+def check_aggregates(aggregates, tasks, today):
+    dated_tasks = dated(tasks)
+    assert aggregates.total == len(tasks)
+    assert aggregates.completed == sum(1 for t in tasks if not is_open_task(t))
+    for offset in range(21):
+        on_day = [t for t in dated_tasks if t["due_date"][:10] == day(offset)]
+        assert aggregates.due_on(day(offset), include_completed=True) == len(on_day)
+        assert aggregates.due_on(day(offset)) == sum(1 for t in on_day if is_open_task(t))
+    overdue = [t for t in dated_tasks if is_open_task(t) and t["due_date"][:10] < today]
+    assert aggregates.overdue_on(today) == len(overdue)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_index_and_aggregates_match_a_full_scan(seed):
+    rng = random.Random(seed)
+    index = TaskIndex()
+    aggregates = TaskAggregates(today=day(5))
+    tasks = {}
+    today = day(5)
+
+    for step in range(300):
+        action = rng.random()
+        if action < 0.4 or not tasks:
+            task = random_task(rng, rng.randrange(1, 40))
+            old = tasks.get(task["id"])
+            tasks[task["id"]] = task
+            index.on_change(old, task)
+            aggregates.on_change(old, task)
+        elif action < 0.75:
+            old = rng.choice(list(tasks.values()))
+            new = {**old, **{k: v for k, v in random_task(rng, old["id"]).items() if rng.random() < 0.5}}
+            if rng.random() < 0.3:
+                new.pop("due_date", None)
+            tasks[new["id"]] = new
+            index.on_change(old, new)
+            aggregates.on_change(old, new)
+        elif action < 0.9:
+            old = tasks.pop(rng.choice(list(tasks)))
+            index.on_change(old, None)
+            aggregates.on_change(old, None)
+        elif action < 0.95:
+            # Day rollover: forward, backward, or a gap longer than the data
+            today = rng.choice([day(rng.randrange(-3, 25)), day(400), day(-400)])
+        else:
+            index.on_reload(list(tasks.values()))
+            aggregates.on_reload(list(tasks.values()))
+
+        if step % 10 == 0:
+            check_index(index, list(tasks.values()))
+            check_aggregates(aggregates, list(tasks.values()), today)
+
+    check_index(index, list(tasks.values()))
+    check_aggregates(aggregates, list(tasks.values()), today)
+
+
+def test_midnight_rollover_moves_open_tasks_to_overdue():
+    aggregates = TaskAggregates(today=day(0))
+    tasks = [
+        {"id": 1, "due_date": day(0), "completed": False},
+        {"id": 2, "due_date": f"{day(1)}T09:00:00", "completed": False},
+        {"id": 3, "due_date": day(1), "completed": True},
+    ]
+    aggregates.on_reload(tasks)
+    assert aggregates.overdue_on(day(0)) == 0
+    assert aggregates.overdue_on(day(1)) == 1
+    assert aggregates.overdue_on(day(2)) == 2
+    assert aggregates.overdue_on(day(0)) == 0
@@ -0,0 +1,48 @@
+import threading
+
+from backend.collection import RecordCollection
+from backend.journal import TaskSnapshotStore
+from backend.write_behind import WriteBehindSaver
+
+
+class SlowStore(TaskSnapshotStore):
+    """Snapshot store whose first apply waits until ``release`` is set"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+        self.applied = []
+
+    def apply(self, upserts, deletes, reset=False, inserts=()):
+        self.calls += 1
+        if self.calls == 1:
+            self.entered.set()
+            self.release.wait(10)
+        self.applied.append([r["title"] for r in list(inserts) + list(upserts)])
+        return super().apply(upserts, deletes, reset=reset, inserts=inserts)
+
+
+def test_concurrent_flushes_reach_the_store_in_order(tmp_path):
+    store = SlowStore(tmp_path / "tasks.json")
+    collection = RecordCollection(store)
+    saver = WriteBehindSaver(interval_ms=60_000)
+    collection.add({"id": 1, "title": "old"})
+
+    first = threading.Thread(target=saver.flush, args=(collection,))
+    first.start()
+    assert store.entered.wait(10)
+    collection.update(1, title="new")
+    second = threading.Thread(target=saver.flush, args=(collection,))
+    second.start()
+    second.join(0.2)
+    # The newer batch waits for the older one instead of racing past it
+    assert second.is_alive()
+
+    store.release.set()
+    first.join(10)
+    second.join(10)
+    assert store.applied == [["old"], ["new"]]
+    assert store.get(1)["title"] == "new"
+    store.close()
@@ -71,6 +71,11 @@ def render_calendar_grid(cal, events, tasks, year, month):
         with cols[i]:
             st.markdown(f"**{day}**")
     
+    # Group tasks by day once instead of rescanning for every cell
+    tasks_by_day = {}
+    for task in tasks:
+        tasks_by_day.setdefault(task.get('due_date', '')[:10], []).append(task)
+    
     # Render calendar weeks
     for week in cal:
         cols = st.columns(7)
@@ -82,7 +87,7 @@ def render_calendar_grid(cal, events, tasks, year, month):
                     # Check if this day has events or tasks
                     day_str = f"{year}-{month:02d}-{day:02d}"
                     day_events = [e for e in events if day_str in e.get('start', {}).get('date', e.get('start', {}).get('dateTime', ''))]
-                    day_tasks = [t for t in tasks if t.get('due_date') == day_str]
+                    day_tasks = tasks_by_day.get(day_str, [])
                     
                     # Day number
                     st.markdown(f"**{day}**")
@@ -197,7 +202,10 @@ def render_calendar_item(item):
         
         with col3:
             if item['type'] == 'task':
-                if st.button("Complete", key=f"complete_{item['data'].get('id')}"):
+                if 'occurrence_of' in item['data']:
+                    # Completing one occurrence would end the whole series
+                    st.caption("🔁 Repeats")
+                elif st.button("Complete", key=f"complete_{item['data'].get('id')}"):
                     complete_task(item['data'].get('id'))
         
         st.divider()
@@ -267,32 +275,17 @@ def render_add_event_form(cal_service):
                 st.rerun()
 
 def get_tasks_for_month(year, month):
-    """Get tasks for a specific month"""
-    tasks = st.session_state.tasks
-    month_str = f"{year}-{month:02d}"
-    return [task for task in tasks if task.get('due_date', '').startswith(month_str)]
+    """Get tasks for a specific month, with recurring tasks expanded"""
+    return st.session_state.tasks.in_month(year, month)
 
 def get_upcoming_tasks(days):
-    """Get tasks due in the next N days"""
-    tasks = st.session_state.tasks
+    """Get tasks due in the next N days, with recurring tasks expanded"""
     today = datetime.now().date()
     future_date = today + timedelta(days=days)
     
-    upcoming = []
-    for task in tasks:
-        if task.get('completed', False):
-            continue
-        
-        due_date_str = task.get('due_date')
-        if due_date_str:
-            try:
-                due_date = datetime.strptime(due_date_str, '%Y-%m-%d').date()
-                if today <= due_date <= future_date:
-                    upcoming.append(task)
-            except:
-                continue
-    
-    return upcoming
+    return st.session_state.tasks.due_between(
+        today.strftime('%Y-%m-%d'), future_date.strftime('%Y-%m-%d')
+    )
 
 def get_priority_emoji(priority):
     """Get emoji for task priority"""
@@ -304,20 +297,17 @@ def get_priority_emoji(priority):
 
 def complete_task(task_id):
     """Mark a task as completed"""
-    for task in st.session_state.tasks:
-        if task.get('id') == task_id:
-            task['completed'] = True
-            task['completed_at'] = datetime.now().isoformat()
-            st.success("Task completed!")
-            st.rerun()
-            break
+    task = st.session_state.tasks.update(
+        task_id, completed=True, completed_at=datetime.now().isoformat()
+    )
+    if task:
+        st.success("Task completed!")
+        st.rerun()
 
 def create_task_from_event(title, description, due_date, priority, location):
     """Create a task from calendar event"""
-    import uuid
-    
     new_task = {
-        "id": str(uuid.uuid4()),
+        "id": st.session_state.tasks.next_id(),
         "title": title,
         "description": description,
         "due_date": due_date,
@@ -328,5 +318,5 @@ def create_task_from_event(title, description, due_date, priority, location):
         "location": location
     }
     
-    st.session_state.tasks.append(new_task)
+    st.session_state.tasks.add(new_task)
     return True
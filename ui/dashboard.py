@@ -29,16 +29,12 @@ def render_tasks_summary():
     # Get tasks data
     tasks = st.session_state.tasks
     
-    # Calculate statistics
-    total_tasks = len(tasks)
-    completed_tasks = sum(1 for task in tasks if task.get('completed', False))
-    due_today = sum(1 for task in tasks 
-                   if task.get('due_date') == datetime.now().strftime("%Y-%m-%d") 
-                   and not task.get('completed', False))
-    overdue = sum(1 for task in tasks 
-                 if task.get('due_date') and 
-                 task.get('due_date') < datetime.now().strftime("%Y-%m-%d") 
-                 and not task.get('completed', False))
+    # Counts are kept up to date by the collection, no scan needed
+    summary = tasks.summary(datetime.now().strftime("%Y-%m-%d"))
+    total_tasks = summary['total']
+    completed_tasks = summary['completed']
+    due_today = summary['due_today']
+    overdue = summary['overdue']
     
     # Display metrics
     metrics_col1, metrics_col2, metrics_col3, metrics_col4 = st.columns(4)
@@ -56,12 +52,8 @@ def render_tasks_summary():
     if tasks:
         st.subheader("Recent Tasks")
         
-        # Filter and sort tasks
-        active_tasks = [task for task in tasks if not task.get('completed', False)]
-        recent_tasks = sorted(
-            active_tasks, 
-            key=lambda x: x.get('due_date', '9999-12-31')
-        )[:5]
+        # Next open tasks by due date
+        recent_tasks = tasks.next_open_tasks(5)
         
         # Convert to DataFrame for display
         if recent_tasks:
@@ -89,17 +81,10 @@ def render_activity_chart():
     date_counts = {}
     today = datetime.now().date()
     
-    # Initialize last 14 days with zero counts
+    # Count tasks due on each of the last/next 7 days
     for i in range(-7, 7):
         date_key = (today + timedelta(days=i)).strftime("%Y-%m-%d")
-        date_counts[date_key] = 0
-    
-    # Count tasks by date
-    for task in tasks:
-        if 'due_date' in task:
-            date_key = task['due_date']
-            if date_key in date_counts:
-                date_counts[date_key] += 1
+        date_counts[date_key] = tasks.count_due_on(date_key, include_completed=True)
     
     # Convert to DataFrame for Plotly
     chart_data = pd.DataFrame({
@@ -151,7 +136,7 @@ def render_quick_add():
         if submitted and task_title:
             # Create new task
             new_task = {
-                "id": len(st.session_state.tasks) + 1,
+                "id": st.session_state.tasks.next_id(),
                 "title": task_title,
                 "description": "",
                 "due_date": due_date.strftime("%Y-%m-%d"),
@@ -161,7 +146,7 @@ def render_quick_add():
             }
             
             # Add to session state
-            st.session_state.tasks.append(new_task)
+            st.session_state.tasks.add(new_task)
             
             # Show success message
             st.success(f"Added: {task_title}")
@@ -203,13 +188,13 @@ def render_quick_notes():
         if note_text:
             # Create new note
             new_note = {
-                "id": len(st.session_state.notes) + 1,
+                "id": st.session_state.notes.next_id(),
                 "content": note_text,
                 "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
             # Add to session state
-            st.session_state.notes.append(new_note)
+            st.session_state.notes.add(new_note)
             
             # Show success message
             st.success("Note saved!")
@@ -236,18 +221,16 @@ def render_notes_summary():
         st.info("No notes yet. Create your first note!")
         return
     
-    # Calculate statistics
-    total_notes = len(notes)
-    private_notes = sum(1 for note in notes if note.get('is_private', False))
-    categories = set(note.get('category', 'General') for note in notes)
+    # Counts are kept up to date by the collection, no scan needed
+    summary = notes.summary()
     
     # Display metrics
     col1, col2 = st.columns(2)
     
     with col1:
-        st.metric("Total Notes", total_notes)
+        st.metric("Total Notes", summary['total'])
     with col2:
-        st.metric("Categories", len(categories))
+        st.metric("Categories", summary['categories'])
     
     # Show recent notes
     st.write("**Recent Notes:**")
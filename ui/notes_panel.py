@@ -3,7 +3,6 @@ import pandas as pd
 from datetime import datetime
 import json
 import config
-import uuid
 
 def render_notes_panel():
     """Render the notes management panel"""
@@ -107,7 +106,7 @@ def add_note_form():
         if submitted:
             if title and content:
                 new_note = {
-                    "id": str(uuid.uuid4()),
+                    "id": st.session_state.notes.next_id(),
                     "title": title,
                     "content": content,
                     "category": category,
@@ -117,7 +116,7 @@ def add_note_form():
                     "updated_at": datetime.now().isoformat()
                 }
                 
-                st.session_state.notes.append(new_note)
+                st.session_state.notes.add(new_note)
                 st.success("Note added successfully!")
                 st.rerun()
             else:
@@ -192,37 +191,25 @@ def edit_note(note):
 
 def update_note(note_id, title, content, category, tags, is_private):
     """Update an existing note"""
-    for i, note in enumerate(st.session_state.notes):
-        if note.get('id') == note_id:
-            st.session_state.notes[i].update({
-                'title': title,
-                'content': content,
-                'category': category,
-                'tags': tags,
-                'is_private': is_private,
-                'updated_at': datetime.now().isoformat()
-            })
-            st.success("Note updated successfully!")
-            st.rerun()
-            break
+    updated = st.session_state.notes.update(
+        note_id,
+        title=title,
+        content=content,
+        category=category,
+        tags=tags,
+        is_private=is_private,
+        updated_at=datetime.now().isoformat()
+    )
+    if updated:
+        st.success("Note updated successfully!")
+        st.rerun()
 
 def delete_note(note_id):
     """Delete a note"""
-    st.session_state.notes = [note for note in st.session_state.notes if note.get('id') != note_id]
+    st.session_state.notes.remove(note_id)
     st.success("Note deleted successfully!")
     st.rerun()
 
 def get_notes_summary():
     """Get summary statistics for notes"""
-    notes = st.session_state.notes
-    
-    total_notes = len(notes)
-    categories = set(note.get('category', 'General') for note in notes)
-    private_notes = sum(1 for note in notes if note.get('is_private', False))
-    
-    return {
-        'total': total_notes,
-        'categories': len(categories),
-        'private': private_notes,
-        'public': total_notes - private_notes
-    }
+    return st.session_state.notes.summary()
@@ -3,6 +3,17 @@ import pandas as pd
 from datetime import datetime, timedelta
 import json
 import config
+from backend.recurrence import is_recurring, validate_rrule
+
+# Repeat choices in the add task form and the RRULE each one stores
+REPEAT_RULES = {
+    "Does not repeat": "",
+    "Daily": "FREQ=DAILY",
+    "Every weekday": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "Weekly": "FREQ=WEEKLY",
+    "Monthly": "FREQ=MONTHLY",
+    "Custom (RRULE)": "",
+}
 
 def render_task_panel():
     """Render the task management panel"""
@@ -33,17 +44,14 @@ def render_all_tasks():
         st.info("No tasks found. Add some tasks to get started!")
         return
     
-    # Filter for active tasks
-    active_tasks = [task for task in tasks if not task.get('completed', False)]
-    
-    if not active_tasks:
+    if not tasks.open_count():
         st.success("No active tasks! All caught up.")
         return
     
     # Group by priority
-    high_priority = [t for t in active_tasks if t.get('priority') == 'High']
-    medium_priority = [t for t in active_tasks if t.get('priority') == 'Medium']
-    low_priority = [t for t in active_tasks if t.get('priority') == 'Low']
+    high_priority = tasks.open_by_priority('High')
+    medium_priority = tasks.open_by_priority('Medium')
+    low_priority = tasks.open_by_priority('Low')
     
     # Render priority sections
     if high_priority:
@@ -65,11 +73,8 @@ def render_today_tasks():
     # Get tasks
     tasks = st.session_state.tasks
     
-    # Filter for today's tasks that are not completed
-    today_tasks = [
-        task for task in tasks 
-        if task.get('due_date') == today and not task.get('completed', False)
-    ]
+    # Today's tasks that are not completed
+    today_tasks = tasks.due_on(today)
     
     if today_tasks:
         render_task_list(today_tasks)
@@ -81,8 +86,8 @@ def render_completed_tasks():
     # Get tasks
     tasks = st.session_state.tasks
     
-    # Filter for completed tasks
-    completed_tasks = [task for task in tasks if task.get('completed', True)]
+    # Completed tasks
+    completed_tasks = tasks.completed_tasks()
     
     if completed_tasks:
         # Sort by completion date if available
@@ -102,17 +107,21 @@ def render_task_list(tasks, show_completed=False):
             col1, col2, col3 = st.columns([0.1, 3, 0.5])
             
             with col1:
-                # Checkbox for task completion
+                # Checkbox for task completion; a single occurrence of a
+                # recurring task can't be completed without ending the series
                 key = f"task_{task.get('id')}_{i}"
-                completed = st.checkbox("", task.get('completed', False), key=key)
+                completed = st.checkbox(
+                    "", task.get('completed', False), key=key,
+                    disabled='occurrence_of' in task
+                )
                 
                 # Update task completion status
                 if completed != task.get('completed', False):
-                    for t in st.session_state.tasks:
-                        if t.get('id') == task.get('id'):
-                            t['completed'] = completed
-                            t['completed_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            break
+                    st.session_state.tasks.update(
+                        task.get('id'),
+                        completed=completed,
+                        completed_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    )
             
             with col2:
                 # Task details
@@ -126,8 +135,10 @@ def render_task_list(tasks, show_completed=False):
                 
                 # Due date with conditional formatting
                 due_date = task.get('due_date', '')
-                if due_date:
-                    due_date_dt = datetime.strptime(due_date, '%Y-%m-%d').date()
+                if is_recurring(task) and 'occurrence_of' not in task:
+                    st.caption(f"🔁 Repeats ({task.get('rrule')}) from {due_date}")
+                elif due_date:
+                    due_date_dt = datetime.strptime(due_date[:10], '%Y-%m-%d').date()
                     today = datetime.now().date()
                     
                     if due_date_dt < today and not task.get('completed', False):
@@ -179,12 +190,17 @@ def add_task_form():
             if reminder:
                 reminder_time = st.time_input("Reminder Time")
         
+        repeat = st.selectbox("Repeat", list(REPEAT_RULES))
+        custom_rule = ""
+        if repeat == "Custom (RRULE)":
+            custom_rule = st.text_input("RRULE", placeholder="FREQ=WEEKLY;BYDAY=MO,WE")
+        
         submitted = st.form_submit_button("Add Task")
         
         if submitted and title:
             # Create new task
             new_task = {
-                "id": len(st.session_state.tasks) + 1,
+                "id": st.session_state.tasks.next_id(),
                 "title": title,
                 "description": description,
                 "priority": priority,
@@ -193,17 +209,23 @@ def add_task_form():
                 "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
+            # Recurring tasks store an RFC 5545 rule; due_date is the first occurrence
+            rrule = custom_rule.strip() if repeat == "Custom (RRULE)" else REPEAT_RULES[repeat]
+            if rrule:
+                error = validate_rrule(rrule, new_task["due_date"])
+                if error:
+                    st.error(f"Task not added: {error}")
+                    return
+                new_task["rrule"] = rrule
+            
             # Add reminder if set
             if reminder and reminder_time:
                 reminder_dt = datetime.combine(due_date, reminder_time)
                 new_task["reminder"] = reminder_dt.strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Schedule reminder if available
-                if hasattr(st.session_state, 'scheduler'):
-                    st.session_state.scheduler.schedule_reminder(new_task)
             
-            # Add to session state
-            st.session_state.tasks.append(new_task)
+            # Add to session state; the scheduler picks up the reminder from
+            # the collection change
+            st.session_state.tasks.add(new_task)
             
             # Show success message
             st.success(f"Task added: {title}")
@@ -211,7 +233,7 @@ def add_task_form():
 def edit_task(task_id):
     """Edit an existing task"""
     # Find task by ID
-    task = next((t for t in st.session_state.tasks if t.get('id') == task_id), None)
+    task = st.session_state.tasks.get(task_id)
     
     if not task:
         st.error(f"Task with ID {task_id} not found")
@@ -245,11 +267,14 @@ def edit_task(task_id):
         
         if update_submitted:
             # Update task
-            task['title'] = title
-            task['description'] = description
-            task['priority'] = priority
-            task['due_date'] = due_date.strftime("%Y-%m-%d")
-            task['updated_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            st.session_state.tasks.update(
+                task_id,
+                title=title,
+                description=description,
+                priority=priority,
+                due_date=due_date.strftime("%Y-%m-%d"),
+                updated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            )
             
             # Clear edit state
             st.session_state.edit_task_id = None
@@ -273,9 +298,7 @@ def delete_task(task_id):
     with col1:
         if st.button("Yes, Delete"):
             # Remove task
-            st.session_state.tasks = [
-                t for t in st.session_state.tasks if t.get('id') != task_id
-            ]
+            st.session_state.tasks.remove(task_id)
             
             # Clear delete state
             st.session_state.delete_task_id = None
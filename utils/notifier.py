@@ -1,19 +1,226 @@
+import functools
+import heapq
+import itertools
 import logging
 import threading
 import time
 from datetime import datetime
+import config
 from backend.notification_service import NotificationService
 from backend.email_service import EmailService
+from backend.outbox import NotificationOutbox, retry_delay
+from backend.fanout import channel_pool
+from backend.dedup import SUPPRESSED, dedup_cache
+from backend.mobile_batch import mobile_batcher
 
 logger = logging.getLogger("nikassistant.notifier")
 
+# Lower sends first when several notifications are due at once
+PRIORITIES = {'error': 0, 'warning': 1, 'success': 2, 'info': 2}
+
+CHANNELS = ('desktop', 'email', 'mobile')
+
+def notification_channels(notification):
+    """Channels a notification asks for; desktop unless turned off"""
+    return [c for c in CHANNELS if notification.get(c, c == 'desktop')]
+
+def outbox_ids(notification):
+    """Outbox ids a notification (or a digest of several) delivers"""
+    if 'outbox_ids' in notification:
+        return notification['outbox_ids']
+    return [notification['outbox_id']] if 'outbox_id' in notification else []
+
+class TokenBucket:
+    """Allows ``rate`` sends per second on average and up to ``capacity`` at once"""
+
+    def __init__(self, rate, capacity, clock=time.time):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def try_acquire(self):
+        """
+        Take a token if one is available
+
+        Returns:
+            float: 0 if a token was taken, else seconds until the next one
+        """
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class Coalescer:
+    """
+    Folds bursts of notifications into digests.
+
+    The first notification of a kind (same type and channels) goes out at
+    once and opens a window of ``window`` seconds; the ones that follow in
+    that window are held back and sent as one digest when it closes.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._windows = {}
+
+    @staticmethod
+    def key(notification):
+        return (notification.get('type'), *notification_channels(notification))
+
+    def offer(self, notification, now):
+        """
+        Returns:
+            float: When a new window closes if the notification should be
+            sent now, or None if it was folded into the open window
+        """
+        key = self.key(notification)
+        held = self._windows.get(key)
+        if held is not None:
+            held.append(notification)
+            return None
+        self._windows[key] = []
+        return now + self.window
+
+    def close(self, key):
+        """End a window; returns the notifications it held back"""
+        return self._windows.pop(key, [])
+
+class NotificationQueue:
+    """
+    Thread-safe delay queue for notifications.
+
+    Notifications wait in a heap ordered by ``scheduled_time`` until they
+    are due, then move to a second heap ordered by priority (error, then
+    warning, then the rest) and age. ``get_batch`` sleeps on a condition
+    variable until the next scheduled time or a new notification, and
+    returns every due notification in one go.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._delayed = []
+        self._ready = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._delayed) + len(self._ready)
+
+    def put(self, notification):
+        """Queue a notification for its ``scheduled_time`` (epoch seconds)"""
+        entry = (notification.get('scheduled_time', 0), next(self._counter), notification)
+        with self._cond:
+            heapq.heappush(self._delayed, entry)
+            if self._delayed[0] is entry:
+                # Due sooner than anything else: wake the consumer
+                self._cond.notify()
+
+    def _promote(self, now):
+        while self._delayed and self._delayed[0][0] <= now:
+            scheduled_time, seq, notification = heapq.heappop(self._delayed)
+            priority = PRIORITIES.get(notification.get('type'), PRIORITIES['info'])
+            heapq.heappush(self._ready, (priority, scheduled_time, seq, notification))
+
+    def get_batch(self, max_items=None, timeout=None):
+        """
+        Wait for due notifications and return them, most urgent first
+
+        Args:
+            max_items: Return at most this many (default: all that are due)
+            timeout: Give up after this many seconds (default: wait forever)
+
+        Returns:
+            list: Due notifications; empty on timeout or once closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._promote(self.clock())
+                if self._ready:
+                    count = len(self._ready) if max_items is None else min(max_items, len(self._ready))
+                    return [heapq.heappop(self._ready)[3] for _ in range(count)]
+                if self._closed:
+                    return []
+                delay = self._delayed[0][0] - self.clock() if self._delayed else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return []
+                    delay = remaining if delay is None else min(delay, remaining)
+                self._cond.wait(delay)
+
+    def close(self):
+        """Wake the consumer and make ``get_batch`` stop waiting"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
 class SmartNotifier:
-    def __init__(self):
+    def __init__(self, batch_size=100, coalesce_seconds=None, rate_limits=None, clock=time.time,
+                 outbox=None):
+        """
+        Args:
+            batch_size: Most notifications handled (and acknowledged in one
+                outbox commit) per wakeup
+            coalesce_seconds: Digest window (default: config.NOTIFY_COALESCE_SECONDS)
+            rate_limits: Sends per minute by channel (default: config.NOTIFY_RATE_LIMITS)
+            clock: Callable returning epoch seconds
+            outbox: NotificationOutbox to persist notifications in
+                (default: one on config.NOTIFY_OUTBOX_DB, opened on first use)
+        """
         self.notification_service = NotificationService()
         self.email_service = EmailService()
-        self.notification_queue = []
+        self.notification_queue = NotificationQueue(clock)
+        self._outbox = outbox
+        self._outbox_lock = threading.Lock()
+        self.batch_size = batch_size
+        if coalesce_seconds is None:
+            coalesce_seconds = config.NOTIFY_COALESCE_SECONDS
+        self.coalescer = Coalescer(coalesce_seconds) if coalesce_seconds > 0 else None
+        rate_limits = rate_limits or config.NOTIFY_RATE_LIMITS
+        self.rate_limits = {
+            channel: TokenBucket(per_minute / 60, config.NOTIFY_BURST, clock)
+            for channel, per_minute in rate_limits.items()
+        }
+        self.stats = {
+            'sent': dict.fromkeys(CHANNELS, 0),
+            'suppressed': dict.fromkeys(CHANNELS, 0),
+            'saved': dict.fromkeys(CHANNELS, 0),
+            'rate_limited': dict.fromkeys(CHANNELS, 0),
+            'retried': dict.fromkeys(CHANNELS, 0),
+            'gave_up': dict.fromkeys(CHANNELS, 0),
+            'coalesced': 0,
+            'digests': 0,
+        }
+        # Mobile sends of the current batch, settled together once it is handled
+        self._pending_mobile = []
         self.running = False
         self.thread = None
+
+    @property
+    def outbox(self):
+        """
+        The notification outbox, opened on first use
+
+        Opening it creates the database and starts its heartbeat thread,
+        so importing this module (tests, benchmarks, scripts) does neither.
+        """
+        if self._outbox is None:
+            with self._outbox_lock:
+                if self._outbox is None:
+                    self._outbox = NotificationOutbox()
+        return self._outbox
         
     def start(self):
         """Start the notification service"""
@@ -21,6 +228,9 @@ class SmartNotifier:
             return
         
         self.running = True
+        self.notification_queue.reopen()
+        # Resend what a previous run of the app queued but did not deliver
+        self._recover_outbox()
         self.thread = threading.Thread(target=self._process_notifications)
         self.thread.daemon = True
         self.thread.start()
@@ -29,54 +239,255 @@ class SmartNotifier:
     def stop(self):
         """Stop the notification service"""
         self.running = False
+        self.notification_queue.close()
         if self.thread:
             self.thread.join()
+        if self._outbox is not None:
+            self._outbox.commit()
         logger.info("Smart notifier stopped")
     
+    def _recover_outbox(self):
+        """Queue the notifications that runs which are gone left in the outbox"""
+        for notification in self.outbox.recover():
+            self.notification_queue.put(notification)
+        self._next_recover = time.monotonic() + self.outbox.lease_seconds
+
     def _process_notifications(self):
-        """Process notification queue"""
+        """Send notifications as they come due, most urgent first"""
         while self.running:
             try:
-                if self.notification_queue:
-                    notification = self.notification_queue.pop(0)
-                    self._send_notification(notification)
-                time.sleep(1)  # Check every second
+                batch = self.notification_queue.get_batch(
+                    self.batch_size, timeout=self.outbox.lease_seconds
+                )
+                for notification in batch:
+                    self._handle(notification)
+                self._settle_mobile()
+                self.outbox.commit()
+                # Runs that died while holding a lease are taken over once it expires
+                if self.running and time.monotonic() >= self._next_recover:
+                    self._recover_outbox()
             except Exception as e:
                 logger.error(f"Error processing notifications: {e}")
     
-    def _send_notification(self, notification):
-        """Send a single notification"""
-        try:
-            # Send desktop notification
-            if notification.get('desktop', True):
-                self.notification_service.send_desktop_notification(
-                    title=notification['title'],
-                    message=notification['message'],
-                    timeout=notification.get('timeout', 10)
-                )
-            
-            # Send email notification if requested
-            if notification.get('email', False):
-                self.email_service.send_task_reminder_email(
-                    subject=notification['title'],
-                    body=notification['message']
-                )
-            
-            # Send mobile notification if available
-            if notification.get('mobile', False) and self.notification_service.firebase_available:
-                self.notification_service.send_mobile_notification(
-                    title=notification['title'],
-                    message=notification['message']
-                )
-            
+    def _handle(self, notification):
+        """Coalesce a due notification, then rate limit and send it"""
+        if 'window_key' in notification:
+            self._send_digest(notification['window_key'])
+            return
+        if self.coalescer and not notification.get('deferred'):
+            closes_at = self.coalescer.offer(notification, self.notification_queue.clock())
+            if closes_at is None:
+                self.stats['coalesced'] += 1
+                return
+            # Come back when the window closes to send what it held back
+            self.notification_queue.put({
+                'window_key': Coalescer.key(notification),
+                'type': notification.get('type'),
+                'scheduled_time': closes_at,
+            })
+        self._dispatch(notification)
+    
+    def _send_digest(self, key):
+        """Send the notifications a coalescing window held back as one"""
+        held = self.coalescer.close(key)
+        if not held:
+            return
+        if len(held) == 1:
+            self._dispatch(held[0])
+            return
+        first = held[0]
+        lines = "\n".join(f"- {n['title']}" for n in held[:10])
+        if len(held) > 10:
+            lines += f"\n...and {len(held) - 10} more"
+        digest = {
+            **first,
+            'title': f"{len(held)} more {first.get('type', 'info')} notifications",
+            'message': lines,
+            'outbox_ids': [i for n in held for i in outbox_ids(n)],
+        }
+        for channel in notification_channels(first):
+            self.stats['saved'][channel] += len(held) - 1
+        self.stats['digests'] += 1
+        self._dispatch(digest)
+    
+    def _dispatch(self, notification):
+        """Send on each channel with a token available; retry the others later"""
+        allowed, deferred, wait = [], [], 0
+        for channel in notification_channels(notification):
+            bucket = self.rate_limits.get(channel)
+            channel_wait = bucket.try_acquire() if bucket else 0
+            if channel_wait:
+                deferred.append(channel)
+                wait = max(wait, channel_wait)
+                self.stats['rate_limited'][channel] += 1
+            else:
+                allowed.append(channel)
+        if deferred:
+            retry = {**notification, **{c: c in deferred for c in CHANNELS}}
+            retry['deferred'] = True
+            retry['scheduled_time'] = self.notification_queue.clock() + wait
+            self.notification_queue.put(retry)
+        if allowed:
+            self._send_notification(notification, allowed)
+    
+    def _send_notification(self, notification, channels=None):
+        """
+        Send a single notification on the given channels (default: all it asks for)
+
+        The channels are sent concurrently on the shared channel pool,
+        except mobile, which is queued for one FCM batch per round of
+        notifications (see _settle_mobile). Channels that succeed are acknowledged in the outbox; failed or
+        timed out ones are retried with backoff until NOTIFY_MAX_ATTEMPTS.
+
+        Repeats are skipped here rather than in the services: a channel's
+        dedup claim is taken before it is sent and released on any result
+        but success, including a timeout, so the retry is not mistaken for
+        a repeat of a send that never completed.
+        """
+        if channels is None:
+            channels = notification_channels(notification)
+        results = {}
+        claims = {}
+        if notification.get('dedup', True):
+            for channel in channels:
+                key = dedup_cache.key(channel, notification['title'], notification['message'])
+                if dedup_cache.claim(key):
+                    claims[channel] = key
+                else:
+                    logger.debug(f"Duplicate {channel} notification skipped: {notification['title']}")
+                    results[channel] = SUPPRESSED
+            channels = [channel for channel in channels if channel not in results]
+        if 'mobile' in channels and self.notification_service.firebase_available:
+            # Batched with the other mobile sends of this round; see _settle_mobile
+            future = self.notification_service.submit_mobile_notification(
+                title=notification['title'],
+                message=notification['message'],
+                dedup=False
+            )
+            self._pending_mobile.append(
+                (notification, future, time.monotonic(), claims.pop('mobile', None))
+            )
+        elif 'mobile' in channels:
+            results['mobile'] = None
+        results.update(channel_pool.run({
+            channel: functools.partial(self._send_channel, channel, notification)
+            for channel in channels if channel != 'mobile'
+        }))
+        self._release_failed(results, claims)
+        failed = self._record_results(notification, results)
+        if len(failed) < len(results):
             logger.info(f"Notification sent: {notification['title']}")
-            
-        except Exception as e:
-            logger.error(f"Failed to send notification: {e}")
+    
+    @staticmethod
+    def _release_failed(results, claims):
+        """Drop the dedup claims of channels that did not send"""
+        for channel, key in claims.items():
+            if results.get(channel) is False:
+                dedup_cache.release(key)
+    
+    def _settle_mobile(self):
+        """Send the mobile notifications submitted this round as one batch and record them"""
+        pending, self._pending_mobile = self._pending_mobile, []
+        if not pending:
+            return
+        self.notification_service.mobile_batcher.flush()
+        for notification, future, started, claim in pending:
+            results = {'mobile': channel_pool.result('mobile', future, started)}
+            if claim is not None:
+                self._release_failed(results, {'mobile': claim})
+            if not self._record_results(notification, results):
+                logger.info(f"Mobile notification sent: {notification['title']}")
+    
+    def _record_results(self, notification, results):
+        """
+        Acknowledge channels that succeeded; retry the failed ones
+
+        Returns:
+            list: The failed channels
+        """
+        failed = []
+        for channel, ok in results.items():
+            if ok is False:
+                failed.append(channel)
+                continue
+            if ok is SUPPRESSED:
+                self.stats['suppressed'][channel] += 1
+            elif ok:
+                self.stats['sent'][channel] += 1
+            for message_id in outbox_ids(notification):
+                self.outbox.ack(message_id, channel)
+        if failed:
+            self._retry(notification, failed)
+        return failed
+    
+    def _send_channel(self, channel, notification):
+        """
+        Send a notification on the desktop or email channel
+
+        Returns:
+            bool: False if the send failed and should be retried; channels
+            that aren't configured count as done
+        """
+        if channel == 'desktop':
+            ok = self.notification_service.send_desktop_notification(
+                title=notification['title'],
+                message=notification['message'],
+                timeout=notification.get('timeout', 10),
+                dedup=False
+            )
+        elif channel == 'email':
+            if not (self.email_service.email and self.email_service.password):
+                return None
+            ok = self.email_service.send_email(
+                subject=notification['title'],
+                body=notification['message'].replace("\n", "<br>"),
+                dedup=False
+            )
+        else:
+            return None
+        return bool(ok)
+    
+    def _retry(self, notification, channels):
+        """Queue another attempt on failed channels, or give up on them"""
+        now = self.notification_queue.clock()
+        attempts = dict(notification.get('attempts', {}))
+        retry_channels = []
+        for channel in channels:
+            attempts[channel] = attempts.get(channel, 0) + 1
+            if attempts[channel] >= config.NOTIFY_MAX_ATTEMPTS:
+                self.stats['gave_up'][channel] += 1
+                logger.error(f"Giving up on {channel} notification after "
+                             f"{attempts[channel]} attempts: {notification['title']}")
+                for message_id in outbox_ids(notification):
+                    self.outbox.ack(message_id, channel)
+            else:
+                retry_channels.append(channel)
+        # Channels that failed together retry together, after the longest backoff
+        if not retry_channels:
+            return
+        delay = retry_delay(max(attempts[c] for c in retry_channels))
+        retry = {**notification, **{c: c in retry_channels for c in CHANNELS}}
+        retry.update(deferred=True, attempts=attempts, scheduled_time=now + delay)
+        for channel in retry_channels:
+            self.stats['retried'][channel] += 1
+            for message_id in outbox_ids(notification):
+                self.outbox.retry(message_id, channel, attempts[channel], now + delay)
+        self.notification_queue.put(retry)
+    
+    def get_stats(self):
+        """Sends per channel, repeats suppressed, sends saved by digests, deferrals, retries and backlog"""
+        return {
+            **self.stats,
+            'queued': len(self.notification_queue),
+            'outbox': self.outbox.count(),
+            'channels': channel_pool.get_stats(),
+            'dedup': dedup_cache.get_stats(),
+            'mobile_batches': mobile_batcher.get_stats(),
+        }
     
     def add_notification(self, title, message, notification_type="info", 
                         desktop=True, email=False, mobile=False, 
-                        timeout=10, delay=0):
+                        timeout=10, delay=0, dedup=True):
         """
         Add a notification to the queue
         
@@ -89,6 +500,8 @@ class SmartNotifier:
             mobile (bool): Send mobile notification
             timeout (int): Desktop notification timeout
             delay (int): Delay before sending (seconds)
+            dedup (bool): Skip channels that sent the same content within
+                the dedup TTL; False for sends the user asked for
         """
         notification = {
             'title': title,
@@ -98,10 +511,16 @@ class SmartNotifier:
             'email': email,
             'mobile': mobile,
             'timeout': timeout,
-            'scheduled_time': datetime.now().timestamp() + delay
+            'scheduled_time': self.notification_queue.clock() + delay
         }
+        if not dedup:
+            notification['dedup'] = False
+        channels = notification_channels(notification)
+        if not channels:
+            return
+        notification['outbox_id'] = self.outbox.add(notification, channels)
         
-        self.notification_queue.append(notification)
+        self.notification_queue.put(notification)
         logger.debug(f"Notification queued: {title}")
     
     def notify_task_due(self, task):
@@ -150,8 +569,11 @@ class SmartNotifier:
             mobile=True
         )
     
-    def notify_daily_summary(self, summary_data):
+    def notify_daily_summary(self, summary_data=None):
         """Send daily summary notification"""
+        if summary_data is None:
+            summary_data = self._build_daily_summary()
+        
         title = "📊 Daily Summary - NikAssistant"
         
         message = f"Good morning! Here's your daily summary:\n\n" \
@@ -171,6 +593,20 @@ class SmartNotifier:
             mobile=False
         )
     
+    def _build_daily_summary(self):
+        """Build summary data from the shared task and note collections"""
+        from backend.collection import get_task_collection, get_note_collection
+        
+        summary = get_task_collection().summary(datetime.now().strftime("%Y-%m-%d"))
+        
+        return {
+            'total_tasks': summary['total'],
+            'completed_tasks': summary['completed'],
+            'due_today': summary['due_today'],
+            'overdue': summary['overdue'],
+            'total_notes': get_note_collection().summary()['total']
+        }
+    
     def notify_email_summary(self, important_emails):
         """Send notification about important emails"""
         if not important_emails:
@@ -257,8 +693,9 @@ class SmartNotifier:
             }
         ]
         
+        # Sent every time the user asks, even if the last test was a moment ago
         for test_notif in test_notifications:
-            self.add_notification(**test_notif)
+            self.add_notification(**test_notif, dedup=False)
         
         logger.info("Test notifications sent")
 